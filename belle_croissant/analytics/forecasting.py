@@ -0,0 +1,273 @@
+"""Next-day demand forecasts and the bake plan built from them.
+
+Sales come from the rollup tables (``analytics.rollups``) as a products x
+days matrix, so every model is a few NumPy operations over the whole
+catalogue instead of a loop per product:
+
+* ``moving_average`` - mean of the last week;
+* ``weekday_average`` - mean of the same weekday over the last ``SEASON_WEEKS`` weeks;
+* ``smoothing`` - exponential smoothing of the series with the weekday pattern taken out.
+
+Each product gets the model with the lowest mean absolute error over the
+last ``HOLDOUT_DAYS`` days of history, and the plan bakes its forecast plus
+``safety`` times that model's RMSE. ``cached_bake_plan`` keeps the forecasts
+until the rollups are refreshed; ingredient stock is always read fresh.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from inventory.costing import recipe_quantity
+from inventory.models import Ingredient, ProductIngredient
+from products.catalog import catalog_version
+from products.models import Product
+from .models import DailyProductSales, HourlyProductSales, RollupWatermark
+from .rollups import SALES_WATERMARK, _day_ranges, _in_ranges
+
+HISTORY_DAYS = 730
+HOLDOUT_DAYS = 28
+SEASON_WEEKS = 8
+SMOOTHING_ALPHA = 0.3
+BAKE_SAFETY = 0.5
+MODELS = ['moving_average', 'weekday_average', 'smoothing']
+
+
+def daily_demand(since, until):
+    """``(product_ids, matrix)``: units sold of each product (rows) on each day (columns) of ``[since, until)``."""
+    rows = (
+        DailyProductSales.objects.filter(date__gte=since, date__lt=until)
+        .values_list('product_id', 'date')
+        .annotate(quantity=Sum('quantity'))
+        .order_by()
+    )
+    first = since.toordinal()
+    products, days, quantities = [], [], []
+    for product_id, date, quantity in rows.iterator(chunk_size=20000):
+        products.append(product_id)
+        days.append(date.toordinal() - first)
+        quantities.append(quantity)
+    product_ids, rows = np.unique(np.array(products, dtype=np.int64), return_inverse=True)
+    matrix = np.zeros((len(product_ids), (until - since).days))
+    matrix[rows, np.array(days, dtype=np.int64)] = quantities
+    return product_ids, matrix
+
+
+def hourly_shares(product_ids, day, weeks=SEASON_WEEKS):
+    """``(len(product_ids), 24)`` share of each product's sales per local hour on ``day``'s weekday."""
+    dates = [day - timedelta(weeks=week) for week in range(1, weeks + 1)]
+    rows = (
+        HourlyProductSales.objects.filter(_in_ranges('hour', _day_ranges(dates)))
+        .annotate(hour_of_day=ExtractHour('hour'))
+        .values_list('product_id', 'hour_of_day')
+        .annotate(quantity=Sum('quantity'))
+        .order_by()
+    )
+    totals = np.zeros((len(product_ids), 24))
+    index = {product_id: row for row, product_id in enumerate(product_ids.tolist())}
+    for product_id, hour, quantity in rows:
+        if product_id in index:
+            totals[index[product_id], hour] += quantity
+    sums = totals.sum(axis=1, keepdims=True)
+    return np.divide(totals, sums, out=np.zeros_like(totals), where=sums > 0)
+
+
+def weekday_factors(history, weekdays, weeks=SEASON_WEEKS):
+    """``(products, 7)`` weekday demand relative to the mean over the last ``weeks`` weeks; 1 without sales."""
+    window = history[:, -7 * weeks:]
+    window_weekdays = weekdays[history.shape[1] - window.shape[1]:history.shape[1]]
+    overall = window.mean(axis=1, keepdims=True)
+    factors = np.ones((len(history), 7))
+    for weekday in range(7):
+        columns = window[:, window_weekdays == weekday]
+        if columns.shape[1]:
+            np.divide(columns.mean(axis=1, keepdims=True), overall, out=factors[:, weekday:weekday + 1], where=overall > 0)
+    return factors
+
+
+def smoothed_levels(history, weekdays, factors, alpha=SMOOTHING_ALPHA):
+    """Level of the weekday-adjusted series after each day; days a product never sells on leave it alone."""
+    levels = np.empty_like(history)
+    level = history[:, :7].mean(axis=1)
+    for day in range(history.shape[1]):
+        factor = factors[:, weekdays[day]]
+        adjusted = np.divide(history[:, day], factor, out=np.zeros_like(level), where=factor > 0)
+        level = np.where(factor > 0, alpha * adjusted + (1 - alpha) * level, level)
+        levels[:, day] = level
+    return levels
+
+
+def weekday_average(history, target, weeks=SEASON_WEEKS):
+    """Mean of the last ``weeks`` columns of ``history`` falling on the weekday of column ``target``."""
+    latest = target - 7 * ((target - history.shape[1]) // 7 + 1)
+    columns = np.arange(latest, -1, -7)[:weeks]
+    return history[:, columns].mean(axis=1) if len(columns) else np.zeros(len(history))
+
+
+def predict(history, levels, factors, weekdays, target):
+    """Forecasts of every model for column ``target`` from ``history``: ``(models, products)``."""
+    return np.stack([
+        history[:, -7:].mean(axis=1),
+        weekday_average(history, target),
+        levels[:, history.shape[1] - 1] * factors[:, weekdays[target]],
+    ])
+
+
+def forecast(matrix, since, day, holdout=HOLDOUT_DAYS):
+    """Forecast ``day`` for every row of ``matrix`` (history starting on ``since``).
+
+    Returns ``(forecast, model index, mae, rmse)`` arrays, one value per product.
+    """
+    days = matrix.shape[1]
+    target = (day - since).days
+    weekdays = (since.weekday() + np.arange(max(days, target + 1))) % 7
+    holdout = min(holdout, max(days - 14, 0))
+
+    # Backtest: one-step-ahead forecasts of each holdout day, with the weekday pattern fitted before it.
+    errors = np.zeros((len(MODELS), len(matrix), holdout))
+    if holdout:
+        training = matrix[:, :days - holdout]
+        factors = weekday_factors(training, weekdays)
+        levels = smoothed_levels(matrix, weekdays, factors)
+        for step, column in enumerate(range(days - holdout, days)):
+            errors[:, :, step] = predict(matrix[:, :column], levels, factors, weekdays, column) - matrix[:, column]
+    mae = np.abs(errors).mean(axis=2) if holdout else np.zeros((len(MODELS), len(matrix)))
+    best = mae.argmin(axis=0)
+    rows = np.arange(len(matrix))
+
+    factors = weekday_factors(matrix, weekdays)
+    levels = smoothed_levels(matrix, weekdays, factors)
+    predictions = np.maximum(predict(matrix, levels, factors, weekdays, target), 0)
+    rmse = np.sqrt((errors ** 2).mean(axis=2))[best, rows] if holdout else np.zeros(len(matrix))
+    return predictions[best, rows], best, mae[best, rows], rmse
+
+
+def split_by_hour(quantities, shares):
+    """Integer split of ``quantities`` over hours by ``shares`` (largest remainder), vectorized."""
+    exact = quantities[:, None] * shares
+    split = np.floor(exact)
+    missing = (quantities - split.sum(axis=1)).astype(int)
+    order = np.argsort(-(exact - split), axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(24)[None, :].repeat(len(order), axis=0), axis=1)
+    split += (ranks < missing[:, None]) & (shares > 0)
+    return split.astype(int)
+
+
+def decimal(value):
+    return Decimal(f'{value:.2f}')
+
+
+def forecast_products(day, history_days, safety):
+    """``(since, until, products)``: the forecast rows of the bake plan for ``day``."""
+    until = min(day, timezone.localdate())
+    since = until - timedelta(days=history_days)
+
+    product_ids, matrix = daily_demand(since, until)
+    available = set(Product.objects.filter(pk__in=product_ids.tolist(), is_available=True).values_list('pk', flat=True))
+    keep = np.isin(product_ids, list(available))
+    product_ids, matrix = product_ids[keep], matrix[keep]
+
+    predicted, best, mae, rmse = forecast(matrix, since, day)
+    quantities = np.ceil(np.maximum(predicted + safety * rmse, 0) - 1e-9)
+    hourly = split_by_hour(quantities, hourly_shares(product_ids, day))
+    names = dict(Product.objects.filter(pk__in=product_ids.tolist()).values_list('pk', 'name'))
+
+    products = []
+    for row in np.flatnonzero(quantities):
+        products.append({
+            'id': int(product_ids[row]),
+            'name': names[int(product_ids[row])],
+            'quantity': int(quantities[row]),
+            'forecast': decimal(predicted[row]),
+            'model': MODELS[best[row]],
+            'mae': decimal(mae[row]),
+            'hourly': {hour: int(count) for hour, count in enumerate(hourly[row]) if count},
+        })
+    products.sort(key=lambda product: (-product['quantity'], product['id']))
+    return since, until, products
+
+
+def bake_plan(day, since, until, products):
+    return {
+        'date': day,
+        'history': {'since': since, 'until': until - timedelta(days=1)},
+        'products': products,
+        'ingredients': ingredient_requirements(
+            np.array([product['id'] for product in products], dtype=np.int64),
+            np.array([product['quantity'] for product in products], dtype=float),
+        ),
+    }
+
+
+def build_bake_plan(day=None, history_days=HISTORY_DAYS, safety=BAKE_SAFETY):
+    """Quantities to bake on ``day`` (tomorrow by default) and the ingredients they need.
+
+    History ends before today, so a half-finished day does not drag the
+    forecasts down. Unavailable products and products without sales in the
+    history window are left out; days before a product's first sale count as
+    zero sales, so a product launched last week is planned low at first.
+    """
+    day = day or timezone.localdate() + timedelta(days=1)
+    return bake_plan(day, *forecast_products(day, history_days, safety))
+
+
+def cached_bake_plan(day=None, history_days=HISTORY_DAYS, safety=BAKE_SAFETY):
+    """:func:`build_bake_plan` with the forecasts cached until the rollups or the catalogue change."""
+    today = timezone.localdate()
+    day = day or today + timedelta(days=1)
+    watermark = RollupWatermark.objects.filter(name=SALES_WATERMARK).values_list('value', flat=True).first()
+    key = (
+        f'bake-plan:{day}:{today}:{history_days}:{safety}:'
+        f'{watermark.timestamp() if watermark else None}:{catalog_version()}'
+    )
+    forecasts = cache.get(key)
+    if forecasts is None:
+        forecasts = forecast_products(day, history_days, safety)
+        cache.set(key, forecasts, settings.BAKE_PLAN_CACHE_TIMEOUT)
+    return bake_plan(day, *forecasts)
+
+
+def ingredient_requirements(product_ids, quantities):
+    """Recipe needs of baking ``quantities`` of ``product_ids``, in stock units, with the shortfall."""
+    index = {product_id: row for row, product_id in enumerate(product_ids.tolist())}
+    lines = [
+        (index[product_id], ingredient_id, float(amount))
+        for product_id, ingredient_id, amount in (
+            ProductIngredient.objects.annotate(stock_quantity=recipe_quantity())
+            .filter(stock_quantity__isnull=False)
+            .values_list('product_id', 'ingredient_id', 'stock_quantity')
+        )
+        if product_id in index
+    ]
+    if not lines:
+        return []
+    rows, ingredient_ids, amounts = (np.array(column) for column in zip(*lines))
+    ingredients, position = np.unique(ingredient_ids, return_inverse=True)
+    required = np.bincount(position, weights=quantities[rows] * amounts, minlength=len(ingredients))
+
+    stock = {
+        pk: (name, unit, current)
+        for pk, name, unit, current in Ingredient.objects.filter(pk__in=ingredients.tolist())
+        .values_list('pk', 'name', 'unit', 'current_stock')
+    }
+    plan = []
+    for ingredient_id, amount in zip(ingredients.tolist(), required):
+        if not amount:
+            continue
+        name, unit, current = stock[ingredient_id]
+        plan.append({
+            'id': ingredient_id,
+            'name': name,
+            'unit': unit,
+            'required': decimal(amount),
+            'current_stock': current,
+            'shortfall': max(decimal(amount) - current, Decimal('0')),
+        })
+    plan.sort(key=lambda row: (-row['shortfall'], row['id']))
+    return plan
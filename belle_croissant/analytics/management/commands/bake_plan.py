@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from analytics.forecasting import BAKE_SAFETY, HISTORY_DAYS, build_bake_plan
+
+
+class Command(BaseCommand):
+    help = 'План выпечки на завтра (или --date) по прогнозу спроса и нужные для него ингредиенты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='день выпечки, ГГГГ-ММ-ДД')
+        parser.add_argument('--history-days', type=int, default=HISTORY_DAYS)
+        parser.add_argument('--safety', type=float, default=BAKE_SAFETY, help='запас в среднеквадратичных ошибках')
+
+    def handle(self, *args, **options):
+        plan = build_bake_plan(options['date'], options['history_days'], options['safety'])
+        self.stdout.write(f"План выпечки на {plan['date']:%Y-%m-%d}")
+        for product in plan['products']:
+            hours = ', '.join(f'{hour}:00 {count}' for hour, count in product['hourly'].items())
+            self.stdout.write(f"  {product['name']}: {product['quantity']} ({product['model']}) {hours}")
+        self.stdout.write('Ингредиенты:')
+        for ingredient in plan['ingredients']:
+            self.stdout.write(
+                f"  {ingredient['name']}: {ingredient['required']} {ingredient['unit']}, "
+                f"на складе {ingredient['current_stock']}, не хватает {ingredient['shortfall']}"
+            )
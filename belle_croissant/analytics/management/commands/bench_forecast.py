@@ -0,0 +1,87 @@
+import math
+import time
+from datetime import datetime, time as day_time, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analytics.forecasting import HISTORY_DAYS, SEASON_WEEKS, build_bake_plan
+from analytics.models import DailyProductSales, HourlyProductSales
+from belle_croissant.bench import measure, rolled_back
+from inventory.models import Ingredient, ProductIngredient
+from products.models import Category, Product
+
+BATCH_SIZE = 5000
+OPEN_HOURS = range(8, 22)
+
+
+class Command(BaseCommand):
+    help = 'Прогноз спроса и план выпечки на завтра по сводкам продаж за два года'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=HISTORY_DAYS)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            start = time.perf_counter()
+            self.seed(options['products'], options['days'], options['ingredients'])
+            self.stdout.write(f'данные: {time.perf_counter() - start:.1f} с')
+            plan = {}
+            queries, ms = measure(
+                lambda: plan.update(build_bake_plan(history_days=options['days'])), options['repeat']
+            )
+            self.stdout.write(
+                f'план выпечки: {len(plan["products"])} продуктов, {len(plan["ingredients"])} ингредиентов, '
+                f'{queries} запросов, {ms / 1000:.2f} с'
+            )
+
+    def seed(self, products, days, ingredients):
+        rng = np.random.default_rng(42)
+        category = Category.objects.create(name='Bench')
+        products = Product.objects.bulk_create([
+            Product(name=f'P{i}', description='', category=category, price=2, cost=1) for i in range(products)
+        ], batch_size=BATCH_SIZE)
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(name=f'I{i}', unit='kg', current_stock=100, min_stock=0, max_stock=0, cost_per_unit=1)
+            for i in range(ingredients)
+        ])
+        ProductIngredient.objects.bulk_create([
+            ProductIngredient(product=product, ingredient=ingredients[j], quantity=50, unit='g')
+            for product in products
+            for j in rng.choice(len(ingredients), 4, replace=False).tolist()
+        ], batch_size=BATCH_SIZE)
+
+        # Poisson demand around a per-product level with a weekly pattern and a slow trend.
+        today = timezone.localdate()
+        since = today - timedelta(days=days)
+        levels = rng.gamma(2, 10, len(products))[:, None]
+        weekly = rng.uniform(0.6, 1.4, (len(products), 7))
+        weekdays = (since.weekday() + np.arange(days)) % 7
+        trend = 1 + np.linspace(-0.2, 0.2, days)
+        demand = rng.poisson(levels * weekly[:, weekdays] * trend)
+        step = max(1, BATCH_SIZE // len(products))
+        for first in range(0, days, step):
+            DailyProductSales.objects.bulk_create([
+                DailyProductSales(date=since + timedelta(days=day), product_id=product.pk, order_type='in_store',
+                                  quantity=int(demand[row, day]))
+                for day in range(first, min(days, first + step))
+                for row, product in enumerate(products)
+                if demand[row, day]
+            ], batch_size=BATCH_SIZE)
+
+        tz = timezone.get_current_timezone()
+        tomorrow = today + timedelta(days=1)
+        peaks = rng.choice(OPEN_HOURS, len(products))
+        HourlyProductSales.objects.bulk_create([
+            HourlyProductSales(
+                hour=timezone.make_aware(datetime.combine(tomorrow - timedelta(weeks=week), day_time(hour)), tz),
+                product_id=product.pk, order_type='in_store', quantity=math.ceil(levels[row, 0] / (1 + abs(hour - peaks[row]))),
+            )
+            for week in range(1, SEASON_WEEKS + 1)
+            for row, product in enumerate(products)
+            for hour in OPEN_HOURS[::3]
+        ], batch_size=BATCH_SIZE)
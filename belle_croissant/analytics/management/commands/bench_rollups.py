@@ -0,0 +1,126 @@
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import F, Sum
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from analytics.rollups import refresh_rollups
+from analytics.views import SalesReportViewSet
+from belle_croissant.bench import measure, rolled_back
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+
+ITEMS_PER_ORDER = 3
+OPEN_HOURS = range(8, 22)
+
+
+class Command(BaseCommand):
+    help = 'Полный и инкрементальный пересчёт сводок продаж и скорость отчётов по ним'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000000, help='позиций заказов (например, 10000000)')
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--products', type=int, default=60)
+        parser.add_argument('--touched', type=int, default=200, help='заказов, изменённых перед инкрементом')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def seed(self, items, days, products):
+        tz = timezone.get_current_timezone()
+        first_day = timezone.localdate() - timedelta(days=days)
+        hours = [(day, hour) for day in range(days) for hour in OPEN_HOURS]
+        orders_total = items // ITEMS_PER_ORDER
+        order_types = [code for code, _ in Order.ORDER_TYPE_CHOICES]
+        number = 0
+        for slot, (day, hour) in enumerate(hours):
+            count = orders_total * (slot + 1) // len(hours) - orders_total * slot // len(hours)
+            if not count:
+                continue
+            last_pk = Order.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+            Order.objects.bulk_create([
+                Order(order_number=f'R{number + i:010d}', status='completed',
+                      order_type=order_types[(number + i) % len(order_types)],
+                      total_amount=Decimal('7.50'), final_amount=Decimal('7.50'))
+                for i in range(count)
+            ])
+            number += count
+            created_at = timezone.make_aware(
+                datetime.combine(first_day + timedelta(days=day), datetime.min.time()), tz
+            ) + timedelta(hours=hour)
+            orders = Order.objects.filter(pk__gt=last_pk)
+            orders.update(created_at=created_at)
+            OrderItem.objects.bulk_create([
+                OrderItem(order_id=order_id, product=products[(order_id * 7 + line * 13) % len(products)],
+                          quantity=1 + line, unit_price=Decimal('2.50'), total_price=Decimal('2.50') * (1 + line))
+                for order_id in orders.values_list('pk', flat=True)
+                for line in range(ITEMS_PER_ORDER)
+            ], batch_size=5000)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        with rolled_back():
+            user = get_user_model().objects.create_user('bench', password='bench')
+            categories = [Category.objects.create(name=f'Bench {i}') for i in range(6)]
+            products = Product.objects.bulk_create([
+                Product(name=f'Bench {i}', description='', category=categories[i % len(categories)],
+                        price=Decimal('2.50'), cost=Decimal('1.00'))
+                for i in range(options['products'])
+            ])
+            start = time.perf_counter()
+            self.seed(options['items'], options['days'], products)
+            self.stdout.write(f"{options['items']} позиций засеяно за {time.perf_counter() - start:.1f} с")
+
+            start = time.perf_counter()
+            stats = refresh_rollups(lag=timedelta(0))
+            self.stdout.write(
+                f"полный пересчёт: {time.perf_counter() - start:.2f} с, "
+                f"{stats['hours']} час. строк, {stats['days']} дн. строк"
+            )
+
+            touched = Order.objects.order_by('-created_at').values_list('pk', flat=True)[:options['touched']]
+            Order.objects.filter(pk__in=list(touched)).update(status='cancelled', updated_at=timezone.now())
+            start = time.perf_counter()
+            stats = refresh_rollups(now=timezone.now() + timedelta(seconds=1), lag=timedelta(0))
+            self.stdout.write(
+                f"инкремент после {options['touched']} изменённых заказов: "
+                f"{(time.perf_counter() - start) * 1000:.1f} мс, {stats['hours']} час. строк"
+            )
+
+            since = timezone.localdate() - timedelta(days=options['days'])
+
+            def report(name, **params):
+                view = SalesReportViewSet.as_view({'get': name})
+
+                def call():
+                    request = factory.get(f'/api/analytics/sales/{name}/', params, HTTP_HOST='localhost')
+                    force_authenticate(request, user=user)
+                    view(request).render()
+                return call
+
+            def brute_force_products():
+                list(
+                    OrderItem.objects.filter(order__status='completed', order__created_at__date__gte=since)
+                    .values('product_id').annotate(revenue=Sum('total_price'), quantity=Sum('quantity'))
+                    .order_by('-revenue')
+                )
+
+            def brute_force_daily():
+                list(
+                    Order.objects.filter(status='completed', created_at__date__gte=since)
+                    .values(date=F('created_at__date')).annotate(final=Sum('final_amount')).order_by('date')
+                )
+
+            results = [
+                ('daily, сводка', report('daily', since=since)),
+                ('daily, по заказам', brute_force_daily),
+                ('products, сводка', report('products', since=since)),
+                ('products, по позициям', brute_force_products),
+                ('categories, сводка', report('categories', since=since)),
+                ('hourly 7 дней, сводка', report('hourly', since=timezone.localdate() - timedelta(days=7))),
+            ]
+            for label, func in results:
+                queries, ms = measure(func, options['repeat'])
+                self.stdout.write(f'{label:<24} {queries} запр. {ms:>10.2f} мс')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Обновить почасовые и дневные сводки продаж по заказам, изменённым с прошлого запуска'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='пересчитать сводки целиком')
+
+    def handle(self, *args, **options):
+        stats = refresh_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Часов: {stats['hours']}, дней по продуктам: {stats['days']}, "
+            f"дней по заказам: {stats['order_days']}, отметка: {stats['watermark']:%Y-%m-%d %H:%M:%S}"
+        ))
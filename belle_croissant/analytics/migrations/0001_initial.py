@@ -0,0 +1,92 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('order_type', models.CharField(choices=[('in_store', 'В магазине'), ('online', 'Онлайн'), ('delivery', 'Доставка')], max_length=20, verbose_name='Тип заказа')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Общая сумма')),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Скидка')),
+                ('final_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Итоговая сумма')),
+            ],
+            options={
+                'verbose_name': 'Выручка за день',
+                'verbose_name_plural': 'Выручка по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Название')),
+                ('value', models.DateTimeField(verbose_name='Обработано до')),
+            ],
+            options={
+                'verbose_name': 'Отметка обновления',
+                'verbose_name_plural': 'Отметки обновления',
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Час')),
+                ('order_type', models.CharField(choices=[('in_store', 'В магазине'), ('online', 'Онлайн'), ('delivery', 'Доставка')], max_length=20, verbose_name='Тип заказа')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'Продажи продукта за час',
+                'verbose_name_plural': 'Продажи продуктов по часам',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('order_type', models.CharField(choices=[('in_store', 'В магазине'), ('online', 'Онлайн'), ('delivery', 'Доставка')], max_length=20, verbose_name='Тип заказа')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'Продажи продукта за день',
+                'verbose_name_plural': 'Продажи продуктов по дням',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyordersales',
+            constraint=models.UniqueConstraint(fields=('date', 'order_type'), name='daily_orders_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='hourlyproductsales',
+            constraint=models.UniqueConstraint(fields=('hour', 'product', 'order_type'), name='hourly_sales_key'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyproductsales',
+            index=models.Index(fields=['product', 'date'], name='daily_sales_product_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('date', 'product', 'order_type'), name='daily_sales_key'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.db import models
+from orders.models import Order
+from products.models import Product
+
+class HourlyProductSales(models.Model):
+    hour = models.DateTimeField('Час')
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Продукт'
+    )
+    order_type = models.CharField('Тип заказа', max_length=20, choices=Order.ORDER_TYPE_CHOICES)
+    orders_count = models.PositiveIntegerField('Заказов', default=0)
+    quantity = models.PositiveIntegerField('Количество', default=0)
+    revenue = models.DecimalField('Выручка', max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Продажи продукта за час'
+        verbose_name_plural = 'Продажи продуктов по часам'
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'product', 'order_type'], name='hourly_sales_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.product_id} {self.order_type}"
+
+class DailyProductSales(models.Model):
+    date = models.DateField('Дата')
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Продукт'
+    )
+    order_type = models.CharField('Тип заказа', max_length=20, choices=Order.ORDER_TYPE_CHOICES)
+    orders_count = models.PositiveIntegerField('Заказов', default=0)
+    quantity = models.PositiveIntegerField('Количество', default=0)
+    revenue = models.DecimalField('Выручка', max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Продажи продукта за день'
+        verbose_name_plural = 'Продажи продуктов по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product', 'order_type'], name='daily_sales_key'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date'], name='daily_sales_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.product_id} {self.order_type}"
+
+class DailyOrderSales(models.Model):
+    date = models.DateField('Дата')
+    order_type = models.CharField('Тип заказа', max_length=20, choices=Order.ORDER_TYPE_CHOICES)
+    orders_count = models.PositiveIntegerField('Заказов', default=0)
+    total_amount = models.DecimalField('Общая сумма', max_digits=14, decimal_places=2, default=0)
+    discount_amount = models.DecimalField('Скидка', max_digits=14, decimal_places=2, default=0)
+    final_amount = models.DecimalField('Итоговая сумма', max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Выручка за день'
+        verbose_name_plural = 'Выручка по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'order_type'], name='daily_orders_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.order_type}"
+
+class RollupWatermark(models.Model):
+    name = models.CharField('Название', max_length=50, unique=True)
+    value = models.DateTimeField('Обработано до')
+
+    class Meta:
+        verbose_name = 'Отметка обновления'
+        verbose_name_plural = 'Отметки обновления'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
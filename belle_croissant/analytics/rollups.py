@@ -0,0 +1,186 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from belle_croissant.sqlite import atomic_write
+from orders.models import Order, OrderItem
+from .models import DailyOrderSales, DailyProductSales, HourlyProductSales, RollupWatermark
+
+SALES_STATUSES = ['completed']
+SALES_WATERMARK = 'sales'
+INSERT_BATCH_SIZE = 5000
+HOUR = timedelta(hours=1)
+
+
+def _merge_ranges(bounds):
+    """Collapse sorted ``(start, end)`` pairs into as few half-open ranges as possible."""
+    ranges = []
+    for start, end in sorted(bounds):
+        if ranges and ranges[-1][1] >= start:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def _hour_ranges(hours):
+    return _merge_ranges(
+        (start, start + HOUR) for start in (hour.astimezone(dt_timezone.utc) for hour in hours)
+    )
+
+
+def _day_ranges(dates):
+    tz = timezone.get_current_timezone()
+    return _merge_ranges(
+        (timezone.make_aware(datetime.combine(day, time.min), tz),
+         timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz))
+        for day in dates
+    )
+
+
+def _in_ranges(field, ranges):
+    return reduce(or_, (Q(**{f'{field}__gte': start, f'{field}__lt': end}) for start, end in ranges))
+
+
+def _bulk_insert(model, objects):
+    objects = iter(objects)
+    inserted = 0
+    while batch := list(islice(objects, INSERT_BATCH_SIZE)):
+        model.objects.bulk_create(batch)
+        inserted += len(batch)
+    return inserted
+
+
+def _hourly_rows(ranges=None):
+    items = OrderItem.objects.filter(order__status__in=SALES_STATUSES)
+    if ranges is not None:
+        items = items.filter(_in_ranges('order__created_at', ranges))
+    rows = (
+        items.annotate(hour=TruncHour('order__created_at'))
+        .values_list('hour', 'product_id', 'order__order_type')
+        .annotate(
+            orders_count=Count('order_id', distinct=True),
+            quantity=Sum('quantity'),
+            revenue=Sum('total_price'),
+        )
+        .order_by()
+    )
+    for hour, product_id, order_type, orders_count, quantity, revenue in rows.iterator(chunk_size=INSERT_BATCH_SIZE):
+        yield HourlyProductSales(
+            hour=hour, product_id=product_id, order_type=order_type,
+            orders_count=orders_count, quantity=quantity, revenue=revenue
+        )
+
+
+def _daily_product_rows(ranges=None):
+    hourly = HourlyProductSales.objects.all()
+    if ranges is not None:
+        hourly = hourly.filter(_in_ranges('hour', ranges))
+    # An order falls into exactly one hour, so hourly distinct counts add up to daily ones.
+    rows = (
+        hourly.annotate(date=TruncDate('hour'))
+        .values_list('date', 'product_id', 'order_type')
+        .annotate(orders_count=Sum('orders_count'), quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by()
+    )
+    for date, product_id, order_type, orders_count, quantity, revenue in rows.iterator(chunk_size=INSERT_BATCH_SIZE):
+        yield DailyProductSales(
+            date=date, product_id=product_id, order_type=order_type,
+            orders_count=orders_count, quantity=quantity, revenue=revenue
+        )
+
+
+def _daily_order_rows(ranges=None):
+    orders = Order.objects.filter(status__in=SALES_STATUSES)
+    if ranges is not None:
+        orders = orders.filter(_in_ranges('created_at', ranges))
+    rows = (
+        orders.annotate(date=TruncDate('created_at'))
+        .values_list('date', 'order_type')
+        .annotate(
+            orders_count=Count('id'),
+            total=Sum('total_amount'),
+            discount=Sum('discount_amount'),
+            final=Sum('final_amount'),
+        )
+        .order_by()
+    )
+    for date, order_type, orders_count, total, discount, final in rows.iterator(chunk_size=INSERT_BATCH_SIZE):
+        yield DailyOrderSales(
+            date=date, order_type=order_type, orders_count=orders_count,
+            total_amount=total, discount_amount=discount, final_amount=final
+        )
+
+
+def rebuild_rollups():
+    """Recompute every rollup table from scratch."""
+    HourlyProductSales.objects.all().delete()
+    DailyProductSales.objects.all().delete()
+    DailyOrderSales.objects.all().delete()
+    return {
+        'hours': _bulk_insert(HourlyProductSales, _hourly_rows()),
+        'days': _bulk_insert(DailyProductSales, _daily_product_rows()),
+        'order_days': _bulk_insert(DailyOrderSales, _daily_order_rows()),
+    }
+
+
+def refresh_buckets(hours):
+    """Recompute the hourly rows of ``hours`` and the daily rows of the days they fall in."""
+    hour_ranges = _hour_ranges(hours)
+    dates = {timezone.localtime(hour).date() for hour in hours}
+    day_ranges = _day_ranges(dates)
+
+    HourlyProductSales.objects.filter(_in_ranges('hour', hour_ranges)).delete()
+    inserted_hours = _bulk_insert(HourlyProductSales, _hourly_rows(hour_ranges))
+    # Days are rolled up from the hourly table, not from order items.
+    DailyProductSales.objects.filter(date__in=dates).delete()
+    inserted_days = _bulk_insert(DailyProductSales, _daily_product_rows(day_ranges))
+    DailyOrderSales.objects.filter(date__in=dates).delete()
+    inserted_order_days = _bulk_insert(DailyOrderSales, _daily_order_rows(day_ranges))
+    return {'hours': inserted_hours, 'days': inserted_days, 'order_days': inserted_order_days}
+
+
+@atomic_write()
+def refresh_rollups(now=None, lag=None, full=False):
+    """Bring the sales rollups up to date with orders changed since the last run.
+
+    Only the hours containing orders whose ``updated_at`` lies past the stored
+    watermark are recomputed, together with the days those hours belong to.
+    Orders touched within the last ``lag`` (``ANALYTICS_REFRESH_LAG`` seconds)
+    are left for the next run so rows committed late by a concurrent
+    transaction are not skipped. The first run, or ``full=True``, rebuilds
+    everything. Deleted orders do not move the watermark; run a full rebuild
+    after removing orders.
+    """
+    if lag is None:
+        lag = timedelta(seconds=settings.ANALYTICS_REFRESH_LAG)
+    until = (now or timezone.now()) - lag
+    watermarks = RollupWatermark.objects.filter(name=SALES_WATERMARK)
+    if connection.features.has_select_for_update:
+        watermarks = watermarks.select_for_update()
+    watermark = watermarks.first()
+
+    if watermark is None or full:
+        stats = rebuild_rollups()
+    elif watermark.value >= until:
+        return {'hours': 0, 'days': 0, 'order_days': 0, 'watermark': watermark.value}
+    else:
+        hours = set(
+            Order.objects.filter(updated_at__gt=watermark.value, updated_at__lte=until)
+            .annotate(hour=TruncHour('created_at'))
+            .values_list('hour', flat=True)
+            .distinct()
+            .order_by()
+        )
+        stats = refresh_buckets(hours) if hours else {'hours': 0, 'days': 0, 'order_days': 0}
+
+    RollupWatermark.objects.update_or_create(name=SALES_WATERMARK, defaults={'value': until})
+    stats['watermark'] = until
+    return stats
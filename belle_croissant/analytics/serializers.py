@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+from orders.models import Order
+from .forecasting import BAKE_SAFETY, HISTORY_DAYS
+
+SALES_DEFAULT_DAYS = 30
+SALES_MAX_DAYS = 366
+
+class SalesParamsSerializer(serializers.Serializer):
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    order_type = serializers.ChoiceField(choices=Order.ORDER_TYPE_CHOICES, required=False)
+    category = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        until = attrs.setdefault('until', timezone.localdate())
+        since = attrs.setdefault('since', until - timedelta(days=SALES_DEFAULT_DAYS - 1))
+        if since > until:
+            raise serializers.ValidationError({'since': 'Начало периода позже его конца.'})
+        if (until - since).days >= SALES_MAX_DAYS:
+            raise serializers.ValidationError({'since': f'Период не может быть длиннее {SALES_MAX_DAYS} дней.'})
+        return attrs
+
+
+class BakePlanParamsSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    history_days = serializers.IntegerField(min_value=28, max_value=3 * 365, default=HISTORY_DAYS)
+    safety = serializers.FloatField(min_value=0, max_value=3, default=BAKE_SAFETY)
+
+    def validate_date(self, value):
+        if value <= timezone.localdate():
+            raise serializers.ValidationError('План выпечки строится на завтра или позже.')
+        return value
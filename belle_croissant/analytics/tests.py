@@ -0,0 +1,300 @@
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+import numpy as np
+
+from inventory.models import Ingredient, ProductIngredient
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from .forecasting import build_bake_plan, forecast_products, split_by_hour
+from .models import DailyOrderSales, DailyProductSales, HourlyProductSales
+from .rollups import refresh_rollups
+
+NO_LAG = timedelta(0)
+
+
+def brute_force():
+    """Rollups recomputed in Python straight from orders and items."""
+    hourly, daily, orders = defaultdict(lambda: [0, 0, 0]), defaultdict(lambda: [0, 0, 0]), defaultdict(lambda: [0, 0, 0, 0])
+    for order in Order.objects.filter(status='completed').prefetch_related('items'):
+        local = timezone.localtime(order.created_at)
+        hour = local.replace(minute=0, second=0, microsecond=0)
+        row = orders[local.date(), order.order_type]
+        row[0] += 1
+        row[1] += order.total_amount
+        row[2] += order.discount_amount
+        row[3] += order.final_amount
+        for key, bucket in ((hour, hourly), (local.date(), daily)):
+            seen = set()
+            for item in order.items.all():
+                row = bucket[key, item.product_id, order.order_type]
+                if item.product_id not in seen:
+                    row[0] += 1
+                    seen.add(item.product_id)
+                row[1] += item.quantity
+                row[2] += item.total_price
+    return (
+        {key: tuple(value) for key, value in hourly.items()},
+        {key: tuple(value) for key, value in daily.items()},
+        {key: tuple(value) for key, value in orders.items()},
+    )
+
+
+def stored():
+    return (
+        {
+            (timezone.localtime(row.hour), row.product_id, row.order_type): (row.orders_count, row.quantity, row.revenue)
+            for row in HourlyProductSales.objects.all()
+        },
+        {
+            (row.date, row.product_id, row.order_type): (row.orders_count, row.quantity, row.revenue)
+            for row in DailyProductSales.objects.all()
+        },
+        {
+            (row.date, row.order_type): (row.orders_count, row.total_amount, row.discount_amount, row.final_amount)
+            for row in DailyOrderSales.objects.all()
+        },
+    )
+
+
+class RollupTestsMixin:
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Выпечка')
+        cls.other = Category.objects.create(name='Напитки')
+        cls.products = [
+            Product.objects.create(
+                name=f'Продукт {i}', description='', category=category if i < 3 else cls.other,
+                price=Decimal('1.50') + i, cost=Decimal('0.50')
+            )
+            for i in range(5)
+        ]
+        cls.rng = random.Random(11)
+        cls.start = timezone.make_aware(datetime(2026, 3, 1, 7, 0))
+        for i in range(120):
+            cls.make_order(f'A{i}', cls.start + timedelta(minutes=cls.rng.randrange(0, 4 * 24 * 60)))
+
+    @classmethod
+    def make_order(cls, number, created_at, status=None):
+        rng = cls.rng
+        order = Order.objects.create(
+            order_number=number,
+            order_type=rng.choice(Order.ORDER_TYPE_CHOICES)[0],
+            status=status or rng.choice(['completed', 'completed', 'completed', 'cancelled', 'pending']),
+            total_amount=0, final_amount=0
+        )
+        total = Decimal('0')
+        for _ in range(rng.randint(1, 4)):
+            product = rng.choice(cls.products)
+            quantity = rng.randint(1, 5)
+            total += product.price * quantity
+            OrderItem.objects.create(
+                order=order, product=product, quantity=quantity,
+                unit_price=product.price, total_price=product.price * quantity
+            )
+        discount = Decimal(rng.randint(0, 3))
+        Order.objects.filter(pk=order.pk).update(
+            created_at=created_at, total_amount=total, discount_amount=discount, final_amount=total - discount
+        )
+        return order
+
+
+class RollupRefreshTests(RollupTestsMixin, APITestCase):
+    def assertMatchesBruteForce(self):
+        expected, actual = brute_force(), stored()
+        for name, want, got in zip(('hourly', 'daily', 'orders'), expected, actual):
+            self.assertEqual(got, want, name)
+
+    def test_full_and_incremental_refresh_match_brute_force(self):
+        refresh_rollups(lag=NO_LAG)
+        self.assertMatchesBruteForce()
+
+        # Cancel, complete, edit and add orders, then only reprocess what changed.
+        orders = list(Order.objects.order_by('pk'))
+        cancelled = next(order for order in orders if order.status == 'completed')
+        Order.objects.filter(pk=cancelled.pk).update(status='cancelled', updated_at=timezone.now())
+        pending = next(order for order in orders if order.status == 'pending')
+        Order.objects.filter(pk=pending.pk).update(status='completed', updated_at=timezone.now())
+        edited = next(order for order in orders if order.status == 'completed' and order.pk != cancelled.pk)
+        edited_item = edited.items.first()
+        edited_item.quantity += 2
+        edited_item.total_price = edited_item.unit_price * edited_item.quantity
+        edited_item.save()
+        Order.objects.filter(pk=edited.pk).update(updated_at=timezone.now())
+        fresh = self.make_order('NEW', self.start + timedelta(days=5, hours=2), status='completed')
+
+        untouched_hours = set(
+            HourlyProductSales.objects.exclude(
+                hour__in=[timezone.localtime(o.created_at).replace(minute=0, second=0, microsecond=0)
+                          for o in Order.objects.filter(pk__in=[cancelled.pk, pending.pk, edited.pk, fresh.pk])]
+            ).values_list('pk', flat=True)
+        )
+        stats = refresh_rollups(now=timezone.now() + timedelta(seconds=1), lag=NO_LAG)
+        self.assertLessEqual(stats['hours'], 4 * len(self.products) * len(Order.ORDER_TYPE_CHOICES))
+        self.assertMatchesBruteForce()
+        # Rows of hours without changed orders were left in place.
+        self.assertTrue(untouched_hours <= set(HourlyProductSales.objects.values_list('pk', flat=True)))
+
+    def test_watermark_skips_recent_and_already_processed_orders(self):
+        now = timezone.now()
+        refresh_rollups(now=now, lag=NO_LAG)
+        with self.assertNumQueries(3):
+            # savepoint, watermark, release
+            self.assertEqual(refresh_rollups(now=now, lag=NO_LAG)['hours'], 0)
+
+        completed = Order.objects.filter(status='completed').first()
+        Order.objects.filter(pk=completed.pk).update(status='cancelled', updated_at=now + timedelta(seconds=30))
+        # Still within the lag window: left for the next run.
+        refresh_rollups(now=now + timedelta(seconds=40), lag=timedelta(seconds=60))
+        self.assertNotEqual(stored(), brute_force())
+        refresh_rollups(now=now + timedelta(seconds=120), lag=timedelta(seconds=60))
+        self.assertEqual(stored(), brute_force())
+
+
+class SalesReportTests(RollupTestsMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        refresh_rollups(lag=NO_LAG)
+        cls.user = get_user_model().objects.create_user('analyst', password='secret')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.period = {'since': '2026-03-01', 'until': '2026-03-10'}
+
+    def test_reports_agree_with_source_tables(self):
+        completed = Order.objects.filter(status='completed')
+        items = OrderItem.objects.filter(order__status='completed')
+
+        with self.assertNumQueries(1):
+            daily = self.client.get('/api/analytics/sales/daily/', self.period).data
+        self.assertEqual(sum(row['final_amount'] for row in daily), sum(o.final_amount for o in completed))
+        self.assertEqual(sum(row['orders_count'] for row in daily), completed.count())
+
+        products = self.client.get('/api/analytics/sales/products/', self.period).data
+        self.assertEqual(
+            {row['product_id']: row['revenue'] for row in products},
+            {
+                product.pk: sum(item.total_price for item in items if item.product_id == product.pk)
+                for product in self.products if any(item.product_id == product.pk for item in items)
+            }
+        )
+        self.assertEqual(products, sorted(products, key=lambda row: -row['revenue']))
+
+        categories = self.client.get('/api/analytics/sales/categories/', self.period).data
+        self.assertEqual(
+            next(row['revenue'] for row in categories if row['category_id'] == self.other.pk),
+            sum(item.total_price for item in items if item.product.category_id == self.other.pk)
+        )
+        hourly = self.client.get('/api/analytics/sales/hourly/', {**self.period, 'order_type': 'online'}).data
+        self.assertEqual(
+            sum(row['quantity'] for row in hourly),
+            sum(item.quantity for item in items.filter(order__order_type='online'))
+        )
+        order_types = self.client.get('/api/analytics/sales/order-types/', self.period).data
+        self.assertEqual(sum(row['orders_count'] for row in order_types), completed.count())
+
+    def test_invalid_period(self):
+        response = self.client.get('/api/analytics/sales/daily/', {'since': '2026-03-10', 'until': '2026-03-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/analytics/sales/products/', {'order_type': 'x'}).status_code, 400)
+
+
+class BakePlanTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Выпечка')
+        cls.croissant, cls.baguette, cls.retired = (
+            Product.objects.create(name=name, description='', category=category, price=Decimal('2.00'),
+                                   cost=Decimal('0.50'), is_available=available)
+            for name, available in [('Круассан', True), ('Багет', True), ('Эклер', False)]
+        )
+        cls.tomorrow = timezone.localdate() + timedelta(days=1)
+        rows = []
+        for back in range(1, 71):
+            day = cls.tomorrow - timedelta(days=back)
+            if day >= timezone.localdate():
+                continue
+            # Croissants: 10 on the weekday of tomorrow, 2 on the others, split over two order types.
+            busy = day.weekday() == cls.tomorrow.weekday()
+            rows += [
+                DailyProductSales(date=day, product=cls.croissant, order_type='in_store', quantity=6 if busy else 1),
+                DailyProductSales(date=day, product=cls.croissant, order_type='online', quantity=4 if busy else 1),
+                DailyProductSales(date=day, product=cls.baguette, order_type='in_store', quantity=3 + back % 5),
+                DailyProductSales(date=day, product=cls.retired, order_type='in_store', quantity=5),
+            ]
+        DailyProductSales.objects.bulk_create(rows)
+        tz = timezone.get_current_timezone()
+        HourlyProductSales.objects.bulk_create([
+            HourlyProductSales(
+                hour=timezone.make_aware(datetime.combine(cls.tomorrow - timedelta(weeks=week), time(hour)), tz),
+                product=cls.croissant, order_type='in_store', quantity=quantity,
+            )
+            for week in range(1, 9) for hour, quantity in [(8, 3), (12, 1)]
+        ])
+        flour = Ingredient.objects.create(name='Мука', unit='kg', current_stock=Decimal('0.40'),
+                                          min_stock=0, max_stock=10, cost_per_unit=Decimal('1.00'))
+        ProductIngredient.objects.create(product=cls.croissant, ingredient=flour, quantity=100, unit='g')
+        ProductIngredient.objects.create(product=cls.retired, ingredient=flour, quantity=100, unit='g')
+        cls.user = get_user_model().objects.create_user('baker', password='secret')
+
+    def test_plan_follows_weekday_pattern(self):
+        plan = build_bake_plan(self.tomorrow, history_days=69)
+        products = {row['id']: row for row in plan['products']}
+        self.assertNotIn(self.retired.pk, products)
+        croissant = products[self.croissant.pk]
+        self.assertEqual(croissant['forecast'], Decimal('10.00'))
+        self.assertEqual(croissant['quantity'], 10)
+        self.assertIn(croissant['model'], ['weekday_average', 'smoothing'])
+        self.assertEqual(croissant['hourly'], {8: 8, 12: 2})
+        self.assertGreater(products[self.baguette.pk]['quantity'], 0)
+        self.assertEqual(plan['history']['until'], timezone.localdate() - timedelta(days=1))
+
+        # 10 croissants x 100 g; the unavailable product's recipe does not count.
+        [flour] = plan['ingredients']
+        self.assertEqual((flour['required'], flour['shortfall']), (Decimal('1.00'), Decimal('0.60')))
+
+    def test_split_by_hour_keeps_totals(self):
+        rng = np.random.default_rng(3)
+        shares = rng.random((50, 24)) * (rng.random((50, 24)) > 0.5)
+        shares /= shares.sum(axis=1, keepdims=True)
+        quantities = rng.integers(0, 200, 50).astype(float)
+        split = split_by_hour(quantities, shares)
+        self.assertEqual(split.sum(axis=1).tolist(), quantities.astype(int).tolist())
+        self.assertFalse((split[shares == 0]).any())
+        self.assertTrue((np.abs(split - quantities[:, None] * shares) < 1).all())
+
+    def test_endpoint(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/analytics/bake-plan/', {'safety': '1', 'history_days': 69})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['date'], self.tomorrow)
+        self.assertEqual(response.data['products'][0]['id'], self.croissant.pk)
+        today = timezone.localdate().isoformat()
+        self.assertEqual(self.client.get('/api/analytics/bake-plan/', {'date': today}).status_code, 400)
+
+    def test_endpoint_reuses_forecasts_until_rollups_move_on(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        params = {'history_days': 69}
+        with mock.patch('analytics.forecasting.forecast_products', side_effect=forecast_products) as computed:
+            first = self.client.get('/api/analytics/bake-plan/', params).data
+            Ingredient.objects.update(current_stock=Decimal('5.00'))
+            second = self.client.get('/api/analytics/bake-plan/', params).data
+            self.assertEqual(computed.call_count, 1)
+            self.assertEqual(second['products'], first['products'])
+            # Stock is not part of the cached forecast.
+            self.assertEqual(second['ingredients'][0]['shortfall'], Decimal('0'))
+
+            refresh_rollups()
+            self.client.get('/api/analytics/bake-plan/', params)
+            self.client.get('/api/analytics/bake-plan/', {**params, 'safety': '1'})
+            self.assertEqual(computed.call_count, 3)
@@ -0,0 +1,101 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import F, Sum
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .forecasting import cached_bake_plan
+from .models import DailyOrderSales, DailyProductSales, HourlyProductSales
+from .serializers import BakePlanParamsSerializer, SalesParamsSerializer
+
+class SalesReportViewSet(viewsets.ViewSet):
+    """Dashboard reports served from the rollup tables only; see ``analytics.rollups``."""
+
+    def get_params(self):
+        params = SalesParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    def product_sales(self, params):
+        rows = DailyProductSales.objects.filter(date__range=(params['since'], params['until']))
+        if 'order_type' in params:
+            rows = rows.filter(order_type=params['order_type'])
+        if 'category' in params:
+            rows = rows.filter(product__category_id=params['category'])
+        return rows
+
+    @action(detail=False)
+    def daily(self, request):
+        params = self.get_params()
+        rows = DailyOrderSales.objects.filter(date__range=(params['since'], params['until']))
+        if 'order_type' in params:
+            rows = rows.filter(order_type=params['order_type'])
+        rows = rows.values('date').annotate(
+            orders_count=Sum('orders_count'),
+            total_amount=Sum('total_amount'),
+            discount_amount=Sum('discount_amount'),
+            final_amount=Sum('final_amount'),
+        ).order_by('date')
+        return Response(list(rows))
+
+    @action(detail=False)
+    def hourly(self, request):
+        params = self.get_params()
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(params['since'], time.min), tz)
+        end = timezone.make_aware(datetime.combine(params['until'] + timedelta(days=1), time.min), tz)
+        rows = HourlyProductSales.objects.filter(hour__gte=start, hour__lt=end)
+        if 'order_type' in params:
+            rows = rows.filter(order_type=params['order_type'])
+        if 'category' in params:
+            rows = rows.filter(product__category_id=params['category'])
+        rows = rows.values('hour').annotate(
+            quantity=Sum('quantity'), revenue=Sum('revenue')
+        ).order_by('hour')
+        return Response(list(rows))
+
+    @action(detail=False)
+    def products(self, request):
+        rows = self.product_sales(self.get_params()).values(
+            'product_id', product_name=F('product__name'), category_id=F('product__category_id')
+        ).annotate(
+            orders_count=Sum('orders_count'), quantity=Sum('quantity'), revenue=Sum('revenue')
+        ).order_by('-revenue', 'product_id')
+        return Response(list(rows))
+
+    @action(detail=False)
+    def categories(self, request):
+        rows = self.product_sales(self.get_params()).values(
+            category_id=F('product__category_id'), category_name=F('product__category__name')
+        ).annotate(
+            quantity=Sum('quantity'), revenue=Sum('revenue')
+        ).order_by('-revenue', 'category_id')
+        return Response(list(rows))
+
+    @action(detail=False, url_path='order-types')
+    def order_types(self, request):
+        params = self.get_params()
+        rows = DailyOrderSales.objects.filter(
+            date__range=(params['since'], params['until'])
+        ).values('order_type').annotate(
+            orders_count=Sum('orders_count'),
+            total_amount=Sum('total_amount'),
+            discount_amount=Sum('discount_amount'),
+            final_amount=Sum('final_amount'),
+        ).order_by('order_type')
+        return Response(list(rows))
+
+
+class BakePlanView(APIView):
+    """Tomorrow's bake quantities per product and hour, with the ingredients they take; see ``analytics.forecasting``."""
+
+    def get(self, request):
+        params = BakePlanParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(cached_bake_plan(
+            day=params.validated_data.get('date'),
+            history_days=params.validated_data['history_days'],
+            safety=params.validated_data['safety'],
+        ))
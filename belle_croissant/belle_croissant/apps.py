@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class BelleCroissantConfig(AppConfig):
+    name = 'belle_croissant'
+    verbose_name = 'Belle Croissant'
+
+    def ready(self):
+        from .sqlite import connect_sqlite_tuning
+        connect_sqlite_tuning()
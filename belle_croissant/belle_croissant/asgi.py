@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'belle_croissant.settings')
+# Each ASGI request runs its ORM calls on a thread of its own, so a persistent connection
+# would never be reused; keep them per request and pool with PgBouncer (DB_POOLER) instead.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from orders.feed import KitchenFeedApp  # noqa: E402  (needs the app registry)
+
+# The kitchen display feed is streamed without Django's per-request thread.
+application = KitchenFeedApp(django_application)
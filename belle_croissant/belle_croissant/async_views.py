@@ -0,0 +1,108 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .eager_loading import plan_queryset
+
+_query_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_QUERY_THREADS, thread_name_prefix='async-query')
+
+
+def _run_query(func, args):
+    try:
+        return func(*args)
+    finally:
+        # These threads never see request_finished; honour CONN_MAX_AGE and drop broken connections here.
+        close_old_connections()
+
+
+async def gather_queries(*calls):
+    """Run independent ``(func, *args)`` ORM calls concurrently and return their results.
+
+    Each call runs on a thread of a bounded pool with its own database
+    connection, so the calls see separate snapshots: use it only for reads
+    that do not need to agree with each other row for row.
+    """
+    run = sync_to_async(_run_query, thread_sensitive=False, executor=_query_executor)
+    return await asyncio.gather(*(run(func, args) for func, *args in calls))
+
+
+class AsyncReadView(View):
+    """Read-only list/detail endpoint awaiting the ORM instead of blocking a worker thread.
+
+    Answers like a DRF ``ReadOnlyModelViewSet`` with the same serializer:
+    authentication and permission classes, keyset pagination and the JSON
+    renderer come from the DRF settings. The queryset is planned from the
+    serializer (see ``eager_loading``), so serialization never queries
+    lazily; a serializer that does fails with ``SynchronousOnlyOperation``.
+    """
+    queryset = None
+    serializer_class = None
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    renderer = JSONRenderer()
+
+    async def get(self, request, pk=None):
+        try:
+            request = await self.initial(request)
+            data = await (self.list(request) if pk is None else self.retrieve(request, pk))
+        except exceptions.APIException as exc:
+            return self.exception_response(request, exc)
+        return self.render(data)
+
+    async def initial(self, request):
+        request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        # Session and basic authentication read the database.
+        await sync_to_async(lambda: request.user)()
+        for permission in (permission() for permission in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+        return request
+
+    def get_queryset(self):
+        return plan_queryset(self.queryset.all(), self.serializer_class)
+
+    async def list(self, request):
+        paginator = self.pagination_class()
+        rows = await paginator.apaginate_queryset(self.get_queryset(), request, view=self)
+        return paginator.get_paginated_response(self.serializer_class(rows, many=True).data).data
+
+    async def get_object(self, pk, queryset=None):
+        queryset = self.get_queryset() if queryset is None else queryset
+        try:
+            return await queryset.aget(pk=pk)
+        except (ObjectDoesNotExist, ValueError, ValidationError):
+            raise exceptions.NotFound()
+
+    async def retrieve(self, request, pk):
+        return self.serializer_class(await self.get_object(pk)).data
+
+    def render(self, data, status=200):
+        return HttpResponse(self.renderer.render(data), status=status, content_type=self.renderer.media_type)
+
+    def exception_response(self, request, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # As APIView.handle_exception: 401 only when the first authenticator can challenge.
+            header = None
+            authenticators = getattr(request, 'authenticators', None)
+            if authenticators:
+                header = authenticators[0].authenticate_header(request)
+            if header:
+                response = self.render({'detail': exc.detail}, status=401)
+                response['WWW-Authenticate'] = header
+                return response
+            exc.status_code = 403
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return self.render(detail, status=exc.status_code)
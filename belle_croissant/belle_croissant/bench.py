@@ -0,0 +1,28 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def rolled_back(using='default'):
+    """Run a benchmark against the configured database and discard its data."""
+    with transaction.atomic(using=using):
+        yield
+        transaction.set_rollback(True, using=using)
+
+
+def measure(func, repeat=5):
+    """Return (query count, median milliseconds) for ``func``."""
+    # The query log is a bounded deque; a full one would make the count read zero after seeding.
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return len(ctx.captured_queries), statistics.median(timings)
@@ -0,0 +1,86 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_primary_pin'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def read_from_replicas(enabled=True):
+    """Route the ORM reads of this block (and of threads it spawns via asgiref) to replicas."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Reads go to a random ``DATABASE_REPLICAS`` alias inside ``read_from_replicas()``.
+
+    Everything else - writes, reads outside that scope (management commands,
+    background jobs) - uses the primary. Replicas carry the same schema via
+    replication, so migrations only run on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """Let safe-method requests read from replicas.
+
+    Unsafe requests stay on the primary and set a short-lived cookie that
+    keeps the client's reads there for ``DB_REPLICA_PIN_SECONDS``, so a
+    screen reloading right after a write does not read a lagging replica.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = settings.DB_REPLICA_PIN_SECONDS
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with read_from_replicas(self.replica_reads(request)):
+            response = self.get_response(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        with read_from_replicas(self.replica_reads(request)):
+            response = await self.get_response(request)
+        return self.pin(request, response)
+
+    @staticmethod
+    def replica_reads(request):
+        return request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and self.pin_seconds:
+            response.set_cookie(PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
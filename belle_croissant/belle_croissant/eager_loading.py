@@ -0,0 +1,175 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class QueryPlan:
+    select: set = field(default_factory=set)
+    prefetch: list = field(default_factory=list)
+    only: set = field(default_factory=set)
+    # False once a field reads something the plan cannot see (method fields, __str__, properties)
+    can_defer: bool = True
+
+
+def _plan_fields(serializer, model, prefix, plan):
+    meta = getattr(serializer, 'Meta', None)
+    hinted_select = getattr(meta, 'select_related', ())
+    hinted_prefetch = getattr(meta, 'prefetch_related', ())
+    plan.select.update(prefix + name for name in hinted_select)
+    plan.prefetch.extend((prefix + name, None) for name in hinted_prefetch)
+    if hinted_select or hinted_prefetch:
+        plan.can_defer = False
+
+    plan.only.add(prefix + model._meta.pk.name)
+    for serializer_field in serializer.fields.values():
+        if serializer_field.write_only:
+            continue
+        if serializer_field.source == '*':
+            if isinstance(serializer_field, serializers.Serializer):
+                _plan_fields(serializer_field, model, prefix, plan)
+            else:
+                plan.can_defer = False
+            continue
+        _plan_source(serializer_field, model, prefix, serializer_field.source.split('.'), plan)
+
+
+def _plan_source(serializer_field, model, prefix, path, plan):
+    current = model
+    lookup = prefix
+    for position, attr in enumerate(path):
+        last = position == len(path) - 1
+        try:
+            model_field = current._meta.get_field(attr)
+        except FieldDoesNotExist:
+            plan.can_defer = False
+            return
+        name = lookup + attr
+
+        if not model_field.is_relation:
+            plan.only.add(name)
+            return
+
+        if model_field.one_to_many or model_field.many_to_many:
+            plan.prefetch.append((name, _child_queryset(serializer_field, model_field, last)))
+            if not last:
+                plan.can_defer = False
+            return
+
+        if model_field.concrete:
+            plan.only.add(name)
+        if last and isinstance(serializer_field, serializers.RelatedField) and model_field.concrete:
+            # PrimaryKeyRelatedField and friends only need the FK column.
+            if not isinstance(serializer_field, serializers.PrimaryKeyRelatedField):
+                plan.can_defer = False
+            return
+        plan.select.add(name)
+        if last:
+            if isinstance(serializer_field, serializers.Serializer):
+                _plan_fields(serializer_field, model_field.related_model, f'{name}__', plan)
+            else:
+                plan.can_defer = False
+            return
+        current = model_field.related_model
+        lookup = f'{name}__'
+
+
+def _child_queryset(serializer_field, model_field, last):
+    related = model_field.related_model
+    queryset = related._default_manager.all()
+    if last and isinstance(serializer_field, serializers.ListSerializer):
+        child_plan = QueryPlan()
+        _plan_fields(serializer_field.child, related, '', child_plan)
+        if model_field.one_to_many:
+            # Prefetch joins children back to the parent through this column.
+            child_plan.only.add(model_field.field.name)
+        queryset = apply_plan(queryset, child_plan)
+    return queryset
+
+
+def apply_plan(queryset, plan, defer=True):
+    if plan.select:
+        queryset = queryset.select_related(*sorted(plan.select))
+    if plan.prefetch:
+        queryset = queryset.prefetch_related(
+            *(Prefetch(lookup, queryset=child) for lookup, child in plan.prefetch)
+        )
+    if defer and plan.can_defer:
+        queryset = queryset.only(*sorted(plan.only))
+    return queryset
+
+
+@lru_cache(maxsize=None)
+def serializer_plan(serializer_class):
+    """Walk the serializer field tree once and record what it will read."""
+    plan = QueryPlan()
+    _plan_fields(serializer_class(), serializer_class.Meta.model, '', plan)
+    return plan
+
+
+def plan_queryset(queryset, serializer_class, defer=True):
+    return apply_plan(queryset, serializer_plan(serializer_class), defer)
+
+
+class EagerLoadingMixin:
+    """Serializer mixin; ``Meta.select_related``/``Meta.prefetch_related`` add hints
+    for relations read outside declared fields (``__str__``, method fields)."""
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, defer=True):
+        return plan_queryset(queryset, cls, defer)
+
+
+class EagerLoadingViewSetMixin:
+    """Plan the viewset queryset from its serializer and enforce ``query_budget``.
+
+    ``query_budget`` is an int or a ``{action: int}`` dict. It is checked only
+    when ``settings.ENFORCE_QUERY_BUDGETS`` is on (``TEST_RUNNER`` turns it
+    on for ``manage.py test``) and counts queries run by the handler, not by
+    authentication.
+    """
+    query_budget = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return plan_queryset(
+            queryset, self.get_serializer_class(), defer=self.request.method in SAFE_METHODS
+        )
+
+    def get_query_budget(self):
+        if isinstance(self.query_budget, dict):
+            return self.query_budget.get(self.action)
+        return self.query_budget
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        capture = getattr(self, '_query_capture', None)
+        if capture is not None:
+            self._handler_query_start = len(capture)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not settings.ENFORCE_QUERY_BUDGETS or self.query_budget is None:
+            return super().dispatch(request, *args, **kwargs)
+        with CaptureQueriesContext(connection) as capture:
+            self._query_capture = capture
+            self._handler_query_start = 0
+            response = super().dispatch(request, *args, **kwargs)
+        queries = capture.captured_queries[self._handler_query_start:]
+        budget = self.get_query_budget()
+        if budget is not None and len(queries) > budget:
+            raise QueryBudgetExceeded(
+                f'{type(self).__name__}.{self.action}: {len(queries)} queries, budget {budget}\n'
+                + '\n'.join(query['sql'] for query in queries)
+            )
+        return response
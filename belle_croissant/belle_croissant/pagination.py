@@ -0,0 +1,177 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Seek pagination over a unique (field, ..., pk) ordering.
+
+    Instead of ``OFFSET`` each page continues from the ordering values of the
+    last row of the previous one, so deep pages cost the same as the first
+    and no ``COUNT(*)`` is issued unless ``?count=true`` is passed.
+
+    The ordering is taken from ``view.keyset_ordering`` or from the model's
+    ``Meta.ordering`` with the primary key appended as a tie-breaker; ordering
+    fields must be non-nullable and should be backed by a matching index.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request, view)
+        if self.count_requested(request):
+            self.count = queryset.count()
+        return self.page_rows(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, awaiting the ORM."""
+        page = self.page_queryset(queryset, request, view)
+        if self.count_requested(request):
+            self.count = await queryset.acount()
+        return self.page_rows([row async for row in page])
+
+    def page_queryset(self, queryset, request, view):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset, view)
+        self.count = None
+        self.cursor = self.decode_cursor(request, queryset.model)
+        self.reverse = bool(self.cursor and self.cursor['reverse'])
+        ordering = [self.flip(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor:
+            queryset = queryset.filter(self.seek_filter(ordering, self.cursor['position']))
+        return queryset[:self.page_size + 1]
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param) in ('1', 'true')
+
+    def page_rows(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.next_position = self.position(rows[-1]) if rows and (has_more or self.reverse) else None
+        self.previous_position = (
+            self.position(rows[0]) if rows and self.cursor and (has_more or not self.reverse) else None
+        )
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        ordering = getattr(view, 'keyset_ordering', None)
+        if ordering:
+            return list(ordering)
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            ordering.append('-pk' if ordering and ordering[0].startswith('-') else 'pk')
+        return ordering
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def seek_filter(ordering, position):
+        """Lexicographic ``(a, b, ...) > (va, vb, ...)`` honouring each field's direction.
+
+        The redundant bound on the leading field lets the planner turn the
+        ``OR`` chain into an index range seek instead of a full index scan.
+        """
+        clauses = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {ordering[i].lstrip('-'): position[i] for i in range(index)}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': position[index]}))
+        leading = ordering[0]
+        bound = Q(**{f"{leading.lstrip('-')}__{'lte' if leading.startswith('-') else 'gte'}": position[0]})
+        return bound & reduce(lambda left, right: left | right, clauses)
+
+    def position(self, instance):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if name == 'pk':
+                value = instance.pk
+            else:
+                value = getattr(instance, instance._meta.get_field(name).attname)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif not isinstance(value, (int, float, str)):
+                value = str(value)
+            values.append(value)
+        return values
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            reverse, values = bool(payload['r']), payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = []
+            for field, value in zip(self.ordering, values):
+                name = field.lstrip('-')
+                model_field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+                if model_field.is_relation:
+                    model_field = model_field.target_field
+                position.append(model_field.to_python(value))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {'reverse': reverse, 'position': position}
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'r': int(reverse), 'p': position}, separators=(',', ':'))
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, urlsafe_b64encode(payload.encode()).decode('ascii')
+        )
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
@@ -41,13 +41,18 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'corsheaders',
+    'belle_croissant',
     'customers',
     'products',
     'orders',
     'inventory',
+    'monitoring',
+    'analytics',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.PerformanceMetricsMiddleware',
+    'belle_croissant.db_routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -83,13 +88,84 @@ WSGI_APPLICATION = 'belle_croissant.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE=postgresql switches to the production profile below; SQLite stays the default for development.
+DB_ENGINE = config('DB_ENGINE', default='sqlite3')
+# Seconds to keep a connection open across requests (0 reconnects per request, None never closes).
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=lambda value: None if value == 'None' else int(value))
+
+if DB_ENGINE == 'postgresql':
+    DB_POOLER = config('DB_POOLER', default=False, cast=bool)
+
+    def postgres_database(host, port):
+        database = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='belle_croissant'),
+            'USER': config('DB_USER', default='belle_croissant'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': host,
+            'PORT': port,
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            # Ping a reused connection once per request instead of failing on a dropped one.
+            'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+            'OPTIONS': {'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int)},
+        }
+        if DB_POOLER:
+            # PgBouncer in transaction mode hands each transaction to any server connection:
+            # named cursors (QuerySet.iterator()) would not survive between statements.
+            database['DISABLE_SERVER_SIDE_CURSORS'] = True
+        return database
+
+    DATABASES = {'default': postgres_database(config('DB_HOST', default='localhost'), config('DB_PORT', default='5432'))}
+    # Streaming replicas sharing the primary's credentials, e.g. DB_REPLICA_HOSTS=replica1:5432,replica2
+    for number, address in enumerate(config('DB_REPLICA_HOSTS', default='', cast=lambda v: [a for a in v.split(',') if a]), 1):
+        host, _, port = address.strip().partition(':')
+        DATABASES[f'replica_{number}'] = {**postgres_database(host, port or '5432'), 'TEST': {'MIRROR': 'default'}}
+    # LISTEN needs a session of its own, so with a pooler the kitchen feed connects to PostgreSQL directly.
+    KITCHEN_FEED_LISTEN_PARAMS = {
+        key: value for key, value in {
+            'host': config('DB_DIRECT_HOST', default=''),
+            'port': config('DB_DIRECT_PORT', default=''),
+        }.items() if value
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        }
+    }
+    KITCHEN_FEED_LISTEN_PARAMS = {}
+
+# Applied to every SQLite connection (belle_croissant.sqlite). WAL lets cashiers read while one
+# writes; synchronous=NORMAL is durable in WAL except for the last commits on power loss.
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-20000, cast=int),
+    'temp_store': config('SQLITE_TEMP_STORE', default='MEMORY'),
+} if config('SQLITE_TUNING', default=True, cast=bool) else {}
+# Start write transactions (belle_croissant.sqlite.atomic_write) with BEGIN IMMEDIATE.
+SQLITE_IMMEDIATE_TRANSACTIONS = config('SQLITE_IMMEDIATE_TRANSACTIONS', default=True, cast=bool)
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+DATABASE_ROUTERS = ['belle_croissant.db_routers.ReplicaRouter'] if DATABASE_REPLICAS else []
+# After a write, the client's reads stay on the primary this long so it sees its own changes despite replica lag.
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Use a shared backend (file, memcached, redis) when running several workers:
+# locmem caches are per process, so catalog invalidation would not reach the others.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
     }
 }
-
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
 
 
 # Password validation
@@ -121,13 +197,14 @@ USE_TZ = True
 
 
 STATIC_URL = 'static/'
-MEDIA_URL = 'media/'
+# Point at a CDN in front of MEDIA_ROOT in production; image variants have content-hashed names and never change.
+MEDIA_URL = config('MEDIA_URL', default='media/')
 MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'belle_croissant.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
 
     'DEFAULT_PERMISSION_CLASSES': [
@@ -135,4 +212,38 @@ REST_FRAMEWORK = {
     ],
 }
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Per-route request metrics (Server-Timing header and /api/_metrics).
+PERF_METRICS_ENABLED = config('PERF_METRICS_ENABLED', default=True, cast=bool)
+# Set to a shared directory to let /api/_metrics and perf_report merge all workers.
+PERF_METRICS_SNAPSHOT_DIR = config('PERF_METRICS_SNAPSHOT_DIR', default='')
+PERF_METRICS_SNAPSHOT_INTERVAL = config('PERF_METRICS_SNAPSHOT_INTERVAL', default=30, cast=int)
+
+# Fail requests that exceed a viewset's declared query_budget; the test runner below turns it on.
+ENFORCE_QUERY_BUDGETS = config('ENFORCE_QUERY_BUDGETS', default=False, cast=bool)
+TEST_RUNNER = 'belle_croissant.test_runner.TestRunner'
+# Sales rollups skip orders updated within this many seconds so in-flight transactions are not missed.
+ANALYTICS_REFRESH_LAG = config('ANALYTICS_REFRESH_LAG', default=60, cast=int)
+# Bake plan forecasts are cached per parameters and rollup watermark, so they are also dropped by refresh_rollups.
+BAKE_PLAN_CACHE_TIMEOUT = config('BAKE_PLAN_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# Threads (each with its own connection) for concurrent queries of async views (belle_croissant.async_views).
+ASYNC_QUERY_THREADS = config('ASYNC_QUERY_THREADS', default=8, cast=int)
+
+# Order numbers <store>-<yymmdd>-<n> (orders.numbering); every store sharing a database needs its own code.
+ORDER_NUMBER_STORE = config('ORDER_NUMBER_STORE', default='BC')
+# Numbers a process reserves per database round trip; the unused rest is skipped when it exits.
+ORDER_NUMBER_BLOCK_SIZE = config('ORDER_NUMBER_BLOCK_SIZE', default=100, cast=int)
+
+# Product image variants (products.images): bounding boxes in pixels, each rendered as WebP and JPEG.
+PRODUCT_IMAGE_VARIANTS = {'thumb': (160, 160), 'card': (480, 480), 'full': (1600, 1600)}
+# Processes rendering variants after an upload; 0 renders them in the request instead.
+PRODUCT_IMAGE_WORKERS = config('PRODUCT_IMAGE_WORKERS', default=2, cast=int)
+
+# Kitchen display feed (/api/kitchen/feed/, served under ASGI).
+# 'auto' uses LISTEN/NOTIFY on PostgreSQL so every worker sees every change, otherwise in-process only.
+KITCHEN_FEED_BACKEND = config('KITCHEN_FEED_BACKEND', default='auto')
+KITCHEN_FEED_HEARTBEAT = config('KITCHEN_FEED_HEARTBEAT', default=15, cast=int)
+# Streams are closed after this many seconds and the browser reconnects with a fresh snapshot.
+KITCHEN_FEED_MAX_AGE = config('KITCHEN_FEED_MAX_AGE', default=600, cast=int)
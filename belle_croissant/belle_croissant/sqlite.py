@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.signals import connection_created
+
+
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Apply ``SQLITE_PRAGMAS`` to every new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def connect_sqlite_tuning():
+    connection_created.connect(tune_sqlite_connection, dispatch_uid='sqlite-tuning')
+
+
+@contextmanager
+def atomic_write(using=None):
+    """``transaction.atomic()`` for blocks that will write.
+
+    On SQLite a plain ``BEGIN`` is deferred: a transaction that reads first
+    and writes later must upgrade its lock, and when another writer got there
+    first SQLite fails at once with "database is locked" instead of honouring
+    ``busy_timeout``. ``BEGIN IMMEDIATE`` takes the write lock up front, so
+    concurrent writers queue on the busy timeout instead. Nested blocks and
+    other databases get a plain ``atomic()``.
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block or not settings.SQLITE_IMMEDIATE_TRANSACTIONS:
+        with transaction.atomic(using=using):
+            yield
+        return
+    # The outermost atomic() begins the transaction through this backend hook.
+    connection._start_transaction_under_autocommit = lambda: connection.cursor().execute('BEGIN IMMEDIATE')
+    try:
+        with transaction.atomic(using=using):
+            del connection._start_transaction_under_autocommit
+            yield
+    finally:
+        connection.__dict__.pop('_start_transaction_under_autocommit', None)
@@ -0,0 +1,15 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """``manage.py test`` with ``ENFORCE_QUERY_BUDGETS`` switched on for every test."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budgets = override_settings(ENFORCE_QUERY_BUDGETS=True)
+        self.query_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_budgets.disable()
+        super().teardown_test_environment(**kwargs)
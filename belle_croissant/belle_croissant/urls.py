@@ -3,12 +3,38 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework import routers
-from customers.views import CustomerViewSet
+from analytics.views import BakePlanView, SalesReportViewSet
+from customers.views import CustomerAsyncView, CustomerOrdersAsyncView, CustomerViewSet
+from inventory.views import RestockPlanView
+from monitoring.views import MetricsView
+from orders.views import OrderAsyncView, OrderViewSet, kitchen_feed
+from products.views import CatalogView, CategoryViewSet, ProductAsyncView, ProductViewSet
 
 router = routers.DefaultRouter()
 router.register(r'customers', CustomerViewSet)
+router.register(r'orders', OrderViewSet)
+router.register(r'categories', CategoryViewSet)
+router.register(r'products', ProductViewSet)
+router.register(r'analytics/sales', SalesReportViewSet, basename='sales')
+
+# Async read-only twins of the list/detail endpoints; they pay off when served through belle_croissant.asgi.
+async_urlpatterns = [
+    path('customers/', CustomerAsyncView.as_view(), name='customer-list'),
+    path('customers/<int:pk>/', CustomerAsyncView.as_view(), name='customer-detail'),
+    path('customers/<int:pk>/orders/', CustomerOrdersAsyncView.as_view(), name='customer-orders'),
+    path('orders/', OrderAsyncView.as_view(), name='order-list'),
+    path('orders/<int:pk>/', OrderAsyncView.as_view(), name='order-detail'),
+    path('products/', ProductAsyncView.as_view(), name='product-list'),
+    path('products/<int:pk>/', ProductAsyncView.as_view(), name='product-detail'),
+]
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/_metrics', MetricsView.as_view(), name='metrics'),
+    path('api/analytics/bake-plan/', BakePlanView.as_view(), name='bake-plan'),
+    path('api/catalog/', CatalogView.as_view(), name='catalog'),
+    path('api/inventory/restock/', RestockPlanView.as_view(), name='restock-plan'),
+    path('api/kitchen/feed/', kitchen_feed, name='kitchen-feed'),
+    path('api/async/', include((async_urlpatterns, 'async'))),
     path('api/', include(router.urls)),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
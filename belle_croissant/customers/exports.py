@@ -0,0 +1,15 @@
+from .models import Customer
+
+CUSTOMER_EXPORT_COLUMNS = [
+    'id', 'first_name', 'last_name', 'email', 'phone', 'customer_type',
+    'registration_date', 'birth_date', 'is_active', 'loyalty__points', 'loyalty__tier',
+]
+
+
+def customers_export(since=None, until=None):
+    queryset = Customer.objects.order_by('pk')
+    if since:
+        queryset = queryset.filter(registration_date__gte=since)
+    if until:
+        queryset = queryset.filter(registration_date__lt=until)
+    return queryset, CUSTOMER_EXPORT_COLUMNS
@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class SearchDocumentField(models.TextField):
+    """Text column rebuilt from the instance on every ``save()`` and ``bulk_create()``.
+
+    ``document_method`` names the model method returning the value.
+    ``queryset.update()`` bypasses it, like ``auto_now``.
+    """
+
+    def __init__(self, *args, document_method='build_search_document', **kwargs):
+        self.document_method = document_method
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.document_method != 'build_search_document':
+            kwargs['document_method'] = self.document_method
+        for key, value in (('editable', False), ('blank', True), ('default', '')):
+            if kwargs.get(key, not value) == value:
+                kwargs.pop(key, None)
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        build = getattr(model_instance, self.document_method, None)
+        if build is None:
+            # Historical models in migrations have no methods.
+            return super().pre_save(model_instance, add)
+        value = build()
+        setattr(model_instance, self.attname, value)
+        return value
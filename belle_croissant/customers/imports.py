@@ -0,0 +1,102 @@
+from django.contrib.auth.base_user import BaseUserManager
+from django.db import IntegrityError, connection
+from rest_framework.exceptions import ValidationError
+
+from belle_croissant.sqlite import atomic_write
+from .models import Customer, LoyaltyProgram
+from .serializers import EMAIL_TAKEN_MESSAGE, CustomerImportRowSerializer
+
+IMPORT_CHUNK_SIZE = 1000
+DUPLICATE_ROW_MESSAGE = 'Email повторяется в файле (строка {row}).'
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def existing_emails(emails, chunk_size=IMPORT_CHUNK_SIZE):
+    """Emails out of ``emails`` already taken, looked up with one ``IN`` query per chunk."""
+    size = min(chunk_size, connection.features.max_query_params or chunk_size)
+    taken = set()
+    for chunk in _chunks(list(emails), size):
+        taken.update(Customer.objects.filter(email__in=chunk).values_list('email', flat=True))
+    return taken
+
+
+def _insert_chunk(rows):
+    customers = [
+        Customer(**{key: value for key, value in data.items() if key != 'loyalty_points'})
+        for _, data in rows
+    ]
+    Customer.objects.bulk_create(customers)
+    if customers and customers[0].pk is None:
+        pks = dict(
+            Customer.objects.filter(email__in=[customer.email for customer in customers])
+            .values_list('email', 'pk')
+        )
+        for customer in customers:
+            customer.pk = pks[customer.email]
+    LoyaltyProgram.objects.bulk_create([
+        LoyaltyProgram(customer=customer, points=data['loyalty_points'])
+        for customer, (_, data) in zip(customers, rows)
+        if customer.customer_type == 'loyalty'
+    ])
+    return customers
+
+
+def import_customers(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate and insert customer ``rows`` (dicts) in bulk; bad rows are reported, not fatal.
+
+    Emails are deduplicated in memory, checked against the table with chunked
+    ``IN`` lookups and inserted with ``bulk_create`` together with a
+    ``LoyaltyProgram`` for ``customer_type="loyalty"`` rows. Each chunk is
+    inserted in its own savepoint; if a concurrent writer takes one of its
+    emails first, that chunk's taken rows are reported and the rest retried.
+    Returns ``(created customers, [{'row': index, 'errors': {...}}])``.
+    """
+    child = CustomerImportRowSerializer()
+    errors = []
+    valid = []
+    first_row = {}
+    for index, row in enumerate(rows):
+        try:
+            data = child.run_validation(row)
+        except ValidationError as exc:
+            errors.append({'row': index, 'errors': exc.detail})
+            continue
+        data['email'] = BaseUserManager.normalize_email(data['email'])
+        if data['email'] in first_row:
+            message = DUPLICATE_ROW_MESSAGE.format(row=first_row[data['email']])
+            errors.append({'row': index, 'errors': {'email': [message]}})
+            continue
+        first_row[data['email']] = index
+        valid.append((index, data))
+
+    taken = existing_emails(first_row, chunk_size)
+    created = []
+    pending = []
+    for index, data in valid:
+        if data['email'] in taken:
+            errors.append({'row': index, 'errors': {'email': [EMAIL_TAKEN_MESSAGE]}})
+        else:
+            pending.append((index, data))
+
+    for chunk in _chunks(pending, chunk_size):
+        while chunk:
+            try:
+                with atomic_write():
+                    created.extend(_insert_chunk(chunk))
+                break
+            except IntegrityError:
+                raced = existing_emails([data['email'] for _, data in chunk], chunk_size)
+                if not raced:
+                    raise
+                errors.extend(
+                    {'row': index, 'errors': {'email': [EMAIL_TAKEN_MESSAGE]}}
+                    for index, data in chunk if data['email'] in raced
+                )
+                chunk = [(index, data) for index, data in chunk if data['email'] not in raced]
+
+    errors.sort(key=lambda error: error['row'])
+    return created, errors
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from belle_croissant.bench import measure, rolled_back
+from customers.models import Customer
+from customers.serializers import CustomerSerializer
+from customers.stats import rebuild_customer_stats
+from customers.views import CustomerViewSet
+from orders.models import Order
+
+
+def legacy_orders(customer):
+    orders = customer.orders.all()
+    return {
+        'customer': CustomerSerializer(customer).data,
+        'orders_count': orders.count(),
+        'total_spent': sum(order.final_amount for order in orders),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнение /customers/{id}/orders/ до и после агрегации на стороне БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        summary_view = CustomerViewSet.as_view({'get': 'orders'})
+        statuses = [code for code, _ in Order.STATUS_CHOICES]
+
+        self.stdout.write(f"{'orders':>8} {'legacy q':>9} {'legacy ms':>10} {'summary q':>10} {'summary ms':>11} {'list q':>7} {'list ms':>8}")
+        for size in options['sizes']:
+            with rolled_back():
+                user = get_user_model().objects.create_user('bench', password='bench')
+                customer = Customer.objects.create(
+                    first_name='Bench', last_name='Corporate', email='bench@example.com',
+                    phone='+77000000000', customer_type='corporate'
+                )
+                Order.objects.bulk_create(
+                    [
+                        Order(
+                            order_number=f'B{i:09d}', customer=customer,
+                            status=statuses[i % len(statuses)],
+                            total_amount=Decimal('12.50'), final_amount=Decimal('12.50')
+                        )
+                        for i in range(size)
+                    ],
+                    batch_size=1000
+                )
+                rebuild_customer_stats(Customer.objects.filter(pk=customer.pk))
+
+                def call(path):
+                    request = factory.get(path, HTTP_HOST='localhost')
+                    force_authenticate(request, user=user)
+                    response = summary_view(request, pk=customer.pk)
+                    response.render()
+
+                path = f'/api/customers/{customer.pk}/orders/'
+                legacy = measure(lambda: legacy_orders(customer), options['repeat'])
+                summary = measure(lambda: call(path), options['repeat'])
+                listing = measure(lambda: call(path + '?include=orders&page=2'), options['repeat'])
+
+            self.stdout.write(
+                f'{size:>8} {legacy[0]:>9} {legacy[1]:>10.1f} '
+                f'{summary[0]:>10} {summary[1]:>11.1f} {listing[0]:>7} {listing[1]:>8.1f}'
+            )
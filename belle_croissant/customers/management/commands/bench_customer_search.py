@@ -0,0 +1,94 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from belle_croissant.bench import rolled_back
+from customers.models import Customer
+from customers.search import search_customer_ids
+from customers.text import transliterate
+
+SEED_CHUNK = 10000
+FIRST_NAMES = [
+    'Алексей', 'Анна', 'Айгерим', 'Дмитрий', 'Ерлан', 'Жанар', 'Ирина', 'Мария', 'Нурлан', 'Ольга',
+    'Сергей', 'Тимур', 'Әлия', 'Ёлка', 'John', 'Emma', 'Michael', 'Sophia', 'David', 'Olivia',
+]
+LAST_NAME_STEMS = [
+    'Иван', 'Смирн', 'Кузнец', 'Ахмет', 'Сулеймен', 'Ковалёв', 'Поп', 'Жумабай', 'Петр', 'Сокол',
+    'Абдрахман', 'Серік', 'Волк', 'Лебед', 'Козл', 'Новик', 'Морозк', 'Ермек', 'Байжан', 'Тулеген',
+]
+LAST_NAME_ENDINGS = ['ов', 'ова', 'ин', 'ина', 'ев', 'ева', 'улы', 'кызы', 'енко', 'ский']
+LATIN_LAST_NAMES = ['Smith', 'Johnson', 'Brown', 'Garcia', 'Miller', 'Davis', 'Wilson', 'Taylor', 'Moore', 'Clark']
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = 'Задержка поиска клиентов при наборе (p50/p95) против icontains по четырём полям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000000)
+        parser.add_argument('--typed', type=int, default=200, help='сколько клиентов «набрать» посимвольно')
+        parser.add_argument('--naive-queries', type=int, default=20)
+
+    def seed(self, total, rng):
+        for offset in range(0, total, SEED_CHUNK):
+            customers = []
+            for i in range(offset, min(offset + SEED_CHUNK, total)):
+                first = rng.choice(FIRST_NAMES)
+                if first.isascii():
+                    last = rng.choice(LATIN_LAST_NAMES)
+                else:
+                    last = rng.choice(LAST_NAME_STEMS) + rng.choice(LAST_NAME_ENDINGS)
+                customers.append(Customer(
+                    first_name=first, last_name=last,
+                    email=f'{transliterate(first)}.{i}@example.com',
+                    phone=f'+770{rng.randrange(10 ** 8, 10 ** 9)}',
+                ))
+            Customer.objects.bulk_create(customers)
+
+    def typed_queries(self, rng, count):
+        sample = Customer.objects.order_by('?').values_list('first_name', 'last_name', 'phone')[:count]
+        queries = []
+        for first, last, phone in sample:
+            full = f'{first} {last}'
+            queries.extend(full[:length] for length in range(2, len(full) + 1))
+            queries.extend(phone[:length] for length in range(7, len(phone) + 1))
+        rng.shuffle(queries)
+        return queries
+
+    def handle(self, *args, **options):
+        rng = random.Random(14)
+        with rolled_back():
+            start = time.perf_counter()
+            self.seed(options['customers'], rng)
+            self.stdout.write(f"{options['customers']} клиентов засеяно за {time.perf_counter() - start:.1f} с")
+
+            queries = self.typed_queries(rng, options['typed'])
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                search_customer_ids(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f'индекс:    {len(timings)} запросов, p50 {statistics.median(timings):.2f} мс, '
+                f'p95 {percentile(timings, 0.95):.2f} мс, max {max(timings):.2f} мс'
+            )
+
+            naive = []
+            for query in queries[:options['naive_queries']]:
+                start = time.perf_counter()
+                list(Customer.objects.filter(
+                    Q(first_name__icontains=query) | Q(last_name__icontains=query)
+                    | Q(email__icontains=query) | Q(phone__icontains=query)
+                ).values_list('pk', flat=True)[:20])
+                naive.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f'icontains: {len(naive)} запросов, p50 {statistics.median(naive):.2f} мс, '
+                f'p95 {percentile(naive, 0.95):.2f} мс, max {max(naive):.2f} мс'
+            )
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from belle_croissant.bench import rolled_back
+from customers.imports import import_customers
+from customers.models import Customer
+from customers.serializers import CustomerSerializer
+
+
+def make_rows(total, duplicate_every):
+    rows = []
+    for i in range(total):
+        number = i - 1 if duplicate_every and i % duplicate_every == 0 and i else i
+        rows.append({
+            'first_name': 'Импорт', 'last_name': f'Клиент{i}', 'email': f'crm{number}@example.com',
+            'phone': f'8 (701) {i % 10 ** 7:07d}', 'customer_type': 'loyalty' if i % 3 == 0 else 'regular',
+            'loyalty_points': i % 500,
+        })
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Пропускная способность импорта клиентов: сериализатор по одному против пакетного импорта'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--duplicate-every', type=int, default=50, help='каждая N-я строка повторяет email')
+        parser.add_argument('--existing', type=int, default=10000, help='клиентов в базе до импорта')
+        parser.add_argument('--naive-sample', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = make_rows(options['rows'], options['duplicate_every'])
+        with rolled_back():
+            Customer.objects.bulk_create([
+                Customer(first_name='Было', last_name=str(i), email=f'crm{i * 7}@example.com', phone='+77010000000')
+                for i in range(options['existing'])
+            ], batch_size=5000)
+
+            sample = rows[:options['naive_sample']]
+            start = time.perf_counter()
+            with rolled_back():
+                for row in sample:
+                    serializer = CustomerSerializer(data=row)
+                    if serializer.is_valid():
+                        serializer.save()
+            naive = time.perf_counter() - start
+            self.stdout.write(f'CustomerSerializer по одному: {len(sample) / naive:>9.0f} строк/с')
+
+            start = time.perf_counter()
+            created, errors = import_customers(rows)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'import_customers:           {len(rows) / elapsed:>9.0f} строк/с '
+                f'({len(rows)} строк за {elapsed:.1f} с, создано {len(created)}, ошибок {len(errors)})'
+            )
@@ -0,0 +1,83 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from belle_croissant.bench import rolled_back
+from customers.loyalty import TIER_THRESHOLDS, earned_points, run_loyalty
+from customers.models import Customer, CustomerStats, LoyaltyProgram
+from orders.models import Order
+
+SEED_CHUNK = 10000
+
+
+def per_member_save(programs):
+    """The naive job: one aggregate and one save() per member."""
+    for program in programs:
+        amount = sum(
+            order.final_amount for order in
+            Order.objects.filter(customer_id=program.customer_id, status='completed')
+        )
+        program.points += earned_points(amount, program.tier)
+        spend = CustomerStats.objects.filter(customer_id=program.customer_id).values_list('total_spent', flat=True).first()
+        program.tier = next(tier for tier, lower in TIER_THRESHOLDS if (spend or 0) >= lower)
+        program.save()
+
+
+class Command(BaseCommand):
+    help = 'Время ночного начисления баллов на большом числе участников'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=1000000)
+        parser.add_argument('--naive-sample', type=int, default=2000,
+                            help='на скольких участниках мерить save() по одному')
+
+    def seed(self, members):
+        completed_at = timezone.now() - timedelta(hours=1)
+        for offset in range(0, members, SEED_CHUNK):
+            stop = min(offset + SEED_CHUNK, members)
+            customers = Customer.objects.bulk_create([
+                Customer(first_name='Bench', last_name=str(i), email=f'loyal{i}@example.com',
+                         phone='+77010000000', customer_type='loyalty')
+                for i in range(offset, stop)
+            ])
+            LoyaltyProgram.objects.bulk_create([LoyaltyProgram(customer=customer) for customer in customers])
+            amounts = [Decimal(10 + (i * 37) % 3000) for i in range(offset, stop)]
+            CustomerStats.objects.bulk_create([
+                CustomerStats(customer=customer, orders_count=1, total_spent=amount, average_basket=amount)
+                for customer, amount in zip(customers, amounts)
+            ])
+            Order.objects.bulk_create([
+                Order(order_number=f'L{i:09d}', customer=customer, status='completed', completed_at=completed_at,
+                      total_amount=amount, final_amount=amount)
+                for i, customer, amount in zip(range(offset, stop), customers, amounts)
+            ])
+
+    def handle(self, *args, **options):
+        members = options['members']
+        with rolled_back():
+            start = time.perf_counter()
+            self.seed(members)
+            self.stdout.write(f'{members} участников и заказов засеяно за {time.perf_counter() - start:.1f} с')
+
+            sample = list(LoyaltyProgram.objects.order_by('pk')[:options['naive_sample']])
+            start = time.perf_counter()
+            with rolled_back():
+                per_member_save(sample)
+            naive = time.perf_counter() - start
+            self.stdout.write(
+                f'save() по одному: {len(sample)} за {naive:.2f} с, '
+                f'оценка на {members}: {naive / max(len(sample), 1) * members / 60:.1f} мин'
+            )
+
+            start = time.perf_counter()
+            run = run_loyalty(lag=timedelta(0))
+            self.stdout.write(
+                f'run_loyalty: {time.perf_counter() - start:.2f} с, участников {run.members_count}, '
+                f'баллов {run.points}, изменено уровней {run.tiers_changed}'
+            )
+            start = time.perf_counter()
+            run_loyalty(lag=timedelta(0))
+            self.stdout.write(f'повторный запуск без новых заказов: {(time.perf_counter() - start) * 1000:.1f} мс')
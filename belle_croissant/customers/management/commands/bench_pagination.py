@@ -0,0 +1,57 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from belle_croissant.bench import measure, rolled_back
+from belle_croissant.pagination import KeysetPagination
+from customers.models import Customer
+
+SEED_CHUNK = 10000
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = 'Задержка первой и глубокой страницы: PageNumberPagination против keyset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=5000, help='номер глубокой страницы')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        total = options['page'] * PAGE_SIZE
+
+        def paginate(paginator_class, params):
+            paginator = paginator_class()
+            paginator.page_size = PAGE_SIZE
+            request = Request(factory.get('/api/customers/', params, HTTP_HOST='localhost'))
+            return lambda: paginator.paginate_queryset(Customer.objects.all(), request)
+
+        with rolled_back():
+            for offset in range(0, total, SEED_CHUNK):
+                Customer.objects.bulk_create([
+                    Customer(first_name='Bench', last_name=str(i), email=f'bench{i}@example.com', phone='+77010000000')
+                    for i in range(offset, min(offset + SEED_CHUNK, total))
+                ])
+            anchor = (
+                Customer.objects.order_by('-registration_date', '-id')
+                .values_list('registration_date', 'id')[total - PAGE_SIZE - 1]
+            )
+            cursor = urlsafe_b64encode(json.dumps(
+                {'r': 0, 'p': [anchor[0].isoformat(), anchor[1]]}
+            ).encode()).decode('ascii')
+
+            results = [
+                ('page number, page 1', paginate(PageNumberPagination, {})),
+                (f'page number, page {options["page"]}', paginate(PageNumberPagination, {'page': options['page']})),
+                ('keyset, page 1', paginate(KeysetPagination, {})),
+                (f'keyset, page {options["page"]}', paginate(KeysetPagination, {'cursor': cursor})),
+            ]
+            self.stdout.write(f'{total} клиентов, {PAGE_SIZE} на странице')
+            for label, func in results:
+                queries, ms = measure(func, options['repeat'])
+                self.stdout.write(f'{label:<26} {queries} запр. {ms:>9.2f} мс')
@@ -0,0 +1,45 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.imports import IMPORT_CHUNK_SIZE, import_customers
+
+
+class Command(BaseCommand):
+    help = 'Импорт клиентов из JSON- или CSV-выгрузки CRM; ошибочные строки пропускаются'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл .json/.csv или "-" для stdin')
+        parser.add_argument('--format', choices=['json', 'csv'], help='по умолчанию по расширению файла')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--errors', help='записать ошибки построчно (NDJSON) в этот файл')
+
+    def read_rows(self, fh, fmt):
+        if fmt == 'csv':
+            # Empty CSV cells mean "not provided", not an empty string.
+            return [{key: value for key, value in row.items() if value != ''} for row in csv.DictReader(fh)]
+        payload = json.load(fh)
+        return payload.get('customers', []) if isinstance(payload, dict) else payload
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('csv' if options['path'].endswith('.csv') else 'json')
+        if options['path'] == '-':
+            rows = self.read_rows(sys.stdin, fmt)
+        else:
+            with open(options['path'], encoding='utf-8', newline='') as fh:
+                rows = self.read_rows(fh, fmt)
+
+        created, errors = import_customers(rows, options['chunk_size'])
+        if options['errors']:
+            with open(options['errors'], 'w', encoding='utf-8') as fh:
+                for error in errors:
+                    fh.write(json.dumps(error, ensure_ascii=False) + '\n')
+        else:
+            for error in errors[:20]:
+                self.stderr.write(json.dumps(error, ensure_ascii=False))
+        message = f'Импортировано клиентов: {len(created)}, строк с ошибками: {len(errors)}'
+        if rows and not created:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.models import Customer
+from customers.stats import STATS_CHUNK_SIZE, check_customer_stats, rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать статистику клиентов по завершённым заказам или проверить её согласованность'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=STATS_CHUNK_SIZE)
+        parser.add_argument('--check', action='store_true', help='только сравнить с заказами, ничего не меняя')
+        parser.add_argument('--customer', type=int, nargs='+', help='только эти клиенты')
+
+    def handle(self, *args, **options):
+        customers = Customer.objects.all()
+        if options['customer']:
+            customers = customers.filter(pk__in=options['customer'])
+
+        if not options['check']:
+            written = rebuild_customer_stats(customers, options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'Пересчитано клиентов с заказами: {written}'))
+            return
+
+        drifted = 0
+        for customer_id, stored, expected in check_customer_stats(customers, options['chunk_size']):
+            drifted += 1
+            self.stdout.write(f'Клиент {customer_id}: сохранено {stored}, по заказам {expected}')
+        if drifted:
+            raise CommandError(f'Расхождений: {drifted}. Запустите rebuild_customer_stats.')
+        self.stdout.write(self.style.SUCCESS('Статистика клиентов согласована с заказами'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from customers.loyalty import ACCRUAL_CHUNK_SIZE, run_loyalty
+
+
+class Command(BaseCommand):
+    help = 'Ночное начисление баллов за завершённые заказы и пересчёт уровней программы лояльности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=ACCRUAL_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        run = run_loyalty(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Заказы до {run.processed_until:%Y-%m-%d %H:%M:%S}: заказов {run.orders_count}, '
+            f'участников {run.members_count}, баллов {run.points}, изменено уровней {run.tiers_changed}'
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['customer_type', '-registration_date'], name='customer_type_reg_idx'),
+        ),
+    ]
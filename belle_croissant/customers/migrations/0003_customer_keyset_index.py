@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_type_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-registration_date', '-id'], name='customer_reg_keyset_idx'),
+        ),
+    ]
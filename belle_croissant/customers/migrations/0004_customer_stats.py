@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='customers.customer', verbose_name='Клиент')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Завершённых заказов')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма покупок')),
+                ('average_basket', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Средний чек')),
+                ('last_order_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний заказ')),
+            ],
+            options={
+                'verbose_name': 'Статистика клиента',
+                'verbose_name_plural': 'Статистика клиентов',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0004_customer_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoyaltyRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed_until', models.DateTimeField(verbose_name='Заказы завершены до')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Запуск')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('members_count', models.PositiveIntegerField(default=0, verbose_name='Участников с начислениями')),
+                ('points', models.BigIntegerField(default=0, verbose_name='Начислено баллов')),
+                ('tiers_changed', models.PositiveIntegerField(default=0, verbose_name='Изменено уровней')),
+            ],
+            options={
+                'verbose_name': 'Начисление баллов',
+                'verbose_name_plural': 'Начисления баллов',
+                'ordering': ['-processed_until'],
+                'indexes': [models.Index(fields=['-processed_until'], name='loyalty_run_until_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:21
+
+import re
+
+import customers.fields
+from django.db import migrations
+
+# A frozen copy of customers.text.customer_search_text as of this migration, so later
+# changes to the live function do not change what this migration writes.
+WORD = re.compile(r'\w+')
+PHONE_NOISE = re.compile(r'[\s()\-.]')
+NATIONAL_DIGITS = 10
+TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch',
+    'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'ә': 'a', 'ғ': 'g', 'қ': 'q', 'ң': 'n', 'ө': 'o', 'ұ': 'u', 'ү': 'u', 'һ': 'h', 'і': 'i',
+})
+CHUNK_SIZE = 2000
+
+
+def search_text(first_name, last_name, email, phone):
+    tokens = []
+    for name in (first_name, last_name):
+        for word in WORD.findall((name or '').casefold().replace('ё', 'е')):
+            tokens.append(word)
+            latin = word.translate(TRANSLIT)
+            if latin != word:
+                tokens.append(latin)
+    tokens.append((email or '').casefold())
+    digits = PHONE_NOISE.sub('', phone or '')
+    plus = digits.startswith('+')
+    digits = digits.lstrip('+')
+    if not plus and len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    if digits:
+        tokens.append(digits)
+        if len(digits) > NATIONAL_DIGITS:
+            tokens.append(digits[-NATIONAL_DIGITS:])
+    return ' '.join(dict.fromkeys(token for token in tokens if token))
+
+
+def fill_search_document(apps, schema_editor):
+    # Primary key ranges, one bulk_update each: memory stays flat however many customers there are.
+    Customer = apps.get_model('customers', 'Customer')
+    last_pk = 0
+    while True:
+        customers = list(
+            Customer.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('first_name', 'last_name', 'email', 'phone')[:CHUNK_SIZE]
+        )
+        if not customers:
+            return
+        for customer in customers:
+            customer.search_document = search_text(
+                customer.first_name, customer.last_name, customer.email, customer.phone
+            )
+        Customer.objects.bulk_update(customers, ['search_document'], batch_size=CHUNK_SIZE)
+        last_pk = customers[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_loyalty_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='search_document',
+            field=customers.fields.SearchDocumentField(verbose_name='Поисковый текст'),
+        ),
+        # The FTS5 table / trigram index itself is (re)installed by customers.search on post_migrate.
+        migrations.RunPython(fill_search_document, migrations.RunPython.noop),
+    ]
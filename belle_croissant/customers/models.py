@@ -1,5 +1,7 @@
 from django.db import models
 from django.core.validators import EmailValidator, RegexValidator
+from .fields import SearchDocumentField
+from .text import customer_search_text
 
 class Customer(models.Model):
     CUSTOMER_TYPE_CHOICES = [
@@ -26,15 +28,23 @@ class Customer(models.Model):
     birth_date = models.DateField('Дата рождения', null=True, blank=True)
     address = models.TextField('Адрес', blank=True)
     is_active = models.BooleanField('Активен', default=True)
+    search_document = SearchDocumentField('Поисковый текст')
     
     class Meta:
         verbose_name = 'Клиент'
         verbose_name_plural = 'Клиенты'
         ordering = ['-registration_date']
+        indexes = [
+            models.Index(fields=['customer_type', '-registration_date'], name='customer_type_reg_idx'),
+            models.Index(fields=['-registration_date', '-id'], name='customer_reg_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def build_search_document(self):
+        return customer_search_text(self.first_name, self.last_name, self.email, self.phone)
+
 class LoyaltyProgram(models.Model):
     customer = models.OneToOneField(
         Customer,
@@ -60,4 +70,44 @@ class LoyaltyProgram(models.Model):
         verbose_name_plural = 'Программы лояльности'
     
     def __str__(self):
-        return f"{self.customer} - {self.points} баллов"
\ No newline at end of file
+        return f"{self.customer} - {self.points} баллов"
+
+class CustomerStats(models.Model):
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Клиент'
+    )
+    orders_count = models.PositiveIntegerField('Завершённых заказов', default=0)
+    total_spent = models.DecimalField('Сумма покупок', max_digits=14, decimal_places=2, default=0)
+    average_basket = models.DecimalField('Средний чек', max_digits=12, decimal_places=2, default=0)
+    last_order_at = models.DateTimeField('Последний заказ', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Статистика клиента'
+        verbose_name_plural = 'Статистика клиентов'
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.orders_count} заказов, {self.total_spent}"
+
+
+class LoyaltyRun(models.Model):
+    processed_until = models.DateTimeField('Заказы завершены до')
+    started_at = models.DateTimeField('Запуск', auto_now_add=True)
+    orders_count = models.PositiveIntegerField('Заказов', default=0)
+    members_count = models.PositiveIntegerField('Участников с начислениями', default=0)
+    points = models.BigIntegerField('Начислено баллов', default=0)
+    tiers_changed = models.PositiveIntegerField('Изменено уровней', default=0)
+
+    class Meta:
+        verbose_name = 'Начисление баллов'
+        verbose_name_plural = 'Начисления баллов'
+        ordering = ['-processed_until']
+        indexes = [
+            models.Index(fields=['-processed_until'], name='loyalty_run_until_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.processed_until}: {self.points} баллов"
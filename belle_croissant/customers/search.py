@@ -0,0 +1,90 @@
+from django.db import connections
+
+from .models import Customer
+from .text import search_query_tokens
+
+SEARCH_LIMIT = 20
+FTS_TABLE = 'customers_customer_search'
+
+SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        search_document, content='customers_customer', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4 5 6'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON customers_customer BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON customers_customer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_document ON customers_customer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document);
+        INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+    END""",
+]
+POSTGRESQL_INDEX = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS customer_search_trgm_idx ON customers_customer USING gin (search_document gin_trgm_ops)',
+]
+
+
+def install_search_index(using='default'):
+    """Create the backend's search index if missing; safe to run after every migrate.
+
+    SQLite rebuilds a table for most ``ALTER``s and drops its triggers on the
+    way, so they are recreated here rather than in a migration.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        columns = []
+        if Customer._meta.db_table in connection.introspection.table_names(cursor):
+            columns = [
+                column.name for column in
+                connection.introspection.get_table_description(cursor, Customer._meta.db_table)
+            ]
+        if 'search_document' not in columns:
+            # Migrated backwards past the search column.
+            return
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            created = cursor.fetchone() is None
+            for statement in SQLITE_INDEX:
+                cursor.execute(statement)
+            if created:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            for statement in POSTGRESQL_INDEX:
+                cursor.execute(statement)
+
+
+def search_customer_ids(query, limit=SEARCH_LIMIT, using='default'):
+    """Ids of customers matching every token of ``query`` as a prefix, best matches first.
+
+    SQLite answers from the FTS5 table, PostgreSQL from the trigram index
+    (tokens match anywhere in the document there); other backends fall back
+    to ``LIKE`` scans.
+    """
+    tokens = search_query_tokens(query)
+    if not tokens:
+        return []
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s',
+                [match, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    customers = Customer.objects.using(using)
+    for token in tokens:
+        customers = customers.filter(search_document__contains=token)
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        customers = customers.annotate(
+            similarity=TrigramSimilarity('search_document', ' '.join(tokens))
+        ).order_by('-similarity', '-pk')
+    else:
+        customers = customers.order_by('-pk')
+    return list(customers.values_list('pk', flat=True)[:limit])
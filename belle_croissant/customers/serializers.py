@@ -1,24 +1,56 @@
+from collections.abc import Mapping
+
 from rest_framework import serializers
-from .models import Customer, LoyaltyProgram
+from rest_framework.validators import UniqueValidator
+from belle_croissant.eager_loading import EagerLoadingMixin
+from .models import Customer, CustomerStats, LoyaltyProgram
+from .text import normalize_phone
+
+EMAIL_TAKEN_MESSAGE = 'Клиент с таким email уже существует.'
+
+class NormalizedPhoneMixin:
+    def to_internal_value(self, data):
+        # Normalise before the model's RegexValidator sees "8 (701) 123-45-67".
+        if isinstance(data, Mapping) and isinstance(data.get('phone'), str):
+            data = data.copy()
+            data['phone'] = normalize_phone(data['phone'])
+        return super().to_internal_value(data)
 
 class LoyaltyProgramSerializer(serializers.ModelSerializer):
     class Meta:
         model = LoyaltyProgram
         fields = ['points', 'tier', 'joined_date']
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomerStats
+        fields = ['orders_count', 'total_spent', 'average_basket', 'last_order_at']
+
+class CustomerSerializer(NormalizedPhoneMixin, EagerLoadingMixin, serializers.ModelSerializer):
     loyalty = LoyaltyProgramSerializer(read_only=True)
+    stats = CustomerStatsSerializer(read_only=True)
     
     class Meta:
         model = Customer
         fields = [
             'id', 'first_name', 'last_name', 'email', 'phone',
             'customer_type', 'registration_date', 'birth_date',
-            'address', 'is_active', 'loyalty'
+            'address', 'is_active', 'loyalty', 'stats'
         ]
         read_only_fields = ['id', 'registration_date']
-    
-    def validate_email(self, value):
-        if Customer.objects.filter(email=value).exclude(id=self.instance.id if self.instance else None).exists():
-            raise serializers.ValidationError("Клиент с таким email уже существует.")
-        return value
\ No newline at end of file
+        # One uniqueness query per write; the column is unique in the database as well.
+        extra_kwargs = {
+            'email': {'validators': [UniqueValidator(queryset=Customer.objects.all(), message=EMAIL_TAKEN_MESSAGE)]},
+        }
+
+class CustomerImportRowSerializer(NormalizedPhoneMixin, serializers.ModelSerializer):
+    loyalty_points = serializers.IntegerField(min_value=0, default=0)
+
+    class Meta:
+        model = Customer
+        fields = [
+            'first_name', 'last_name', 'email', 'phone', 'customer_type',
+            'birth_date', 'address', 'is_active', 'loyalty_points'
+        ]
+        # Uniqueness is checked for the whole batch by customers.imports.
+        extra_kwargs = {'email': {'validators': []}}
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+
+from orders.models import Order
+from .search import install_search_index
+from .stats import apply_order_changes, order_state
+
+
+def remember_order_state(sender, instance, **kwargs):
+    previous = None
+    if not instance._state.adding and instance.pk is not None:
+        previous = (
+            Order.objects.filter(pk=instance.pk)
+            .values_list('customer_id', 'status', 'final_amount', 'created_at').first()
+        )
+    instance._stats_previous_state = previous
+
+
+def order_saved(sender, instance, **kwargs):
+    apply_order_changes([(getattr(instance, '_stats_previous_state', None), order_state(instance))])
+
+
+def order_deleted(sender, instance, **kwargs):
+    apply_order_changes([(order_state(instance), None)])
+
+
+def connect_stats_signals():
+    # Order.save() runs these in its own transaction. queryset.update()/bulk_create()
+    # bypass them; call apply_order_changes() after those.
+    pre_save.connect(remember_order_state, sender=Order, dispatch_uid='customer-stats-pre-save')
+    post_save.connect(order_saved, sender=Order, dispatch_uid='customer-stats-save')
+    post_delete.connect(order_deleted, sender=Order, dispatch_uid='customer-stats-delete')
+
+
+def search_index_after_migrate(sender, using, **kwargs):
+    install_search_index(using)
+
+
+def connect_search_signals(app_config):
+    post_migrate.connect(search_index_after_migrate, sender=app_config, dispatch_uid='customer-search-index')
@@ -0,0 +1,147 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, NullIf, Round
+
+from belle_croissant.sqlite import atomic_write
+from orders.models import Order
+from .models import CustomerStats
+
+STATS_STATUS = 'completed'
+STATS_CHUNK_SIZE = 1000
+CENT = Decimal('0.01')
+
+
+def order_state(order):
+    """The part of an order that customer statistics depend on."""
+    return (order.customer_id, order.status, order.final_amount, order.created_at)
+
+
+def _stats_deltas(changes):
+    deltas = {}
+    for before, after in changes:
+        if before == after:
+            continue
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None or state[0] is None or state[1] != STATS_STATUS:
+                continue
+            count, total, latest, removed = deltas.get(state[0], (0, Decimal('0'), None, False))
+            if sign > 0:
+                latest = state[3] if latest is None else max(latest, state[3])
+            deltas[state[0]] = (count + sign, total + sign * state[2], latest, removed or sign < 0)
+    return deltas
+
+
+def apply_order_changes(changes):
+    """Update ``CustomerStats`` for ``(before, after)`` pairs of ``order_state()`` tuples.
+
+    ``None`` stands for an order that did not exist before or no longer exists.
+    Counters move with ``UPDATE ... SET x = x + delta``, one statement per
+    affected customer, inside the caller's transaction. When a completed
+    order stops counting, ``last_order_at`` is re-read from the customer's
+    orders through the ``(customer, -created_at)`` index.
+    """
+    deltas = _stats_deltas(changes)
+    if not deltas:
+        return
+    with atomic_write():
+        CustomerStats.objects.bulk_create(
+            [CustomerStats(customer_id=customer_id) for customer_id in deltas], ignore_conflicts=True
+        )
+        for customer_id in sorted(deltas):
+            count, total, latest, removed = deltas[customer_id]
+            if removed:
+                last_order_at = Subquery(
+                    Order.objects.filter(customer_id=OuterRef('customer_id'), status=STATS_STATUS)
+                    .order_by('-created_at').values('created_at')[:1]
+                )
+            elif latest is not None:
+                last_order_at = Greatest(Coalesce('last_order_at', Value(latest)), Value(latest))
+            else:
+                last_order_at = F('last_order_at')
+            # SET expressions all see the pre-update row; "* 1.0" keeps SQLite from integer division.
+            # ROUND() is half away from zero on SQLite and PostgreSQL alike; see average_basket().
+            average = Coalesce(
+                Round(
+                    ExpressionWrapper(
+                        (F('total_spent') + total) * Value(1.0) / NullIf(F('orders_count') + count, Value(0)),
+                        output_field=DecimalField(max_digits=12, decimal_places=2)
+                    ),
+                    2
+                ),
+                Value(Decimal('0'))
+            )
+            CustomerStats.objects.filter(customer_id=customer_id).update(
+                orders_count=F('orders_count') + count,
+                total_spent=F('total_spent') + total,
+                average_basket=average,
+                last_order_at=last_order_at,
+            )
+
+
+def average_basket(total, count):
+    """Rounded the way ``apply_order_changes`` rounds in SQL, so the two never differ by a cent."""
+    return (total / count).quantize(CENT, ROUND_HALF_UP)
+
+
+def compute_customer_stats(customer_ids):
+    """``{customer_id: CustomerStats}`` recomputed from orders with one grouped aggregate."""
+    rows = (
+        Order.objects.filter(customer_id__in=customer_ids, status=STATS_STATUS)
+        .values_list('customer_id')
+        .annotate(Count('id'), Sum('final_amount'), Max('created_at'))
+        .order_by()
+    )
+    return {
+        customer_id: CustomerStats(
+            customer_id=customer_id, orders_count=count, total_spent=total,
+            average_basket=average_basket(total, count), last_order_at=last_order_at
+        )
+        for customer_id, count, total, last_order_at in rows
+    }
+
+
+def _customer_id_chunks(queryset, chunk_size):
+    last_pk = 0
+    while True:
+        chunk = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+def rebuild_customer_stats(customers, chunk_size=STATS_CHUNK_SIZE):
+    """Recompute statistics of ``customers`` (a queryset) chunk by chunk; returns rows written."""
+    written = 0
+    for chunk in _customer_id_chunks(customers, chunk_size):
+        expected = compute_customer_stats(chunk)
+        with atomic_write():
+            CustomerStats.objects.filter(customer_id__in=chunk).delete()
+            CustomerStats.objects.bulk_create(expected.values())
+        written += len(expected)
+    return written
+
+
+def check_customer_stats(customers, chunk_size=STATS_CHUNK_SIZE):
+    """Yield ``(customer_id, stored, expected)`` for every customer whose counters drifted.
+
+    Both sides are ``(orders_count, total_spent, average_basket, last_order_at)``;
+    a missing row means a customer without completed orders.
+    """
+    empty = (0, Decimal('0'), Decimal('0'), None)
+    for chunk in _customer_id_chunks(customers, chunk_size):
+        expected = compute_customer_stats(chunk)
+        stored = {
+            stats.customer_id: stats
+            for stats in CustomerStats.objects.filter(customer_id__in=chunk)
+        }
+        for customer_id in chunk:
+            want = expected.get(customer_id)
+            want = (want.orders_count, want.total_spent, want.average_basket, want.last_order_at) if want else empty
+            have = stored.get(customer_id)
+            have = (have.orders_count, have.total_spent, have.average_basket, have.last_order_at) if have else empty
+            if have != want:
+                yield customer_id, have, want
@@ -1,3 +1,452 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from belle_croissant.eager_loading import QueryBudgetExceeded
+from orders.models import Order
+from orders.services import create_orders_bulk
+from products.models import Category, Product
+from .imports import import_customers
+from .loyalty import run_loyalty
+from .models import Customer, CustomerStats, LoyaltyProgram, LoyaltyRun
+from .search import search_customer_ids
+from .stats import check_customer_stats, rebuild_customer_stats
+from .text import normalize_phone
+from .views import CustomerViewSet
+
+
+class CustomerOrdersSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('cashier', password='secret')
+        self.client.force_authenticate(self.user)
+        self.customer = Customer.objects.create(
+            first_name='Анна', last_name='Иванова', email='anna@example.com',
+            phone='+77011234567', customer_type='corporate'
+        )
+        for number, (order_status, amount) in enumerate([
+            ('completed', '100.00'), ('completed', '50.50'),
+            ('pending', '20.00'), ('cancelled', '10.00'),
+        ]):
+            Order.objects.create(
+                order_number=f'T{number}', customer=self.customer, status=order_status,
+                total_amount=Decimal(amount), final_amount=Decimal(amount)
+            )
+        self.url = f'/api/customers/{self.customer.pk}/orders/'
+
+    def test_summary_reads_materialized_stats(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['orders_count'], 2)
+        self.assertEqual(response.data['total_spent'], Decimal('150.50'))
+        self.assertEqual(response.data['average_basket'], Decimal('75.25'))
+        self.assertEqual(response.data['customer']['stats']['orders_count'], 2)
+        self.assertNotIn('by_status', response.data)
+        self.assertNotIn('orders', response.data)
+
+    def test_status_breakdown_is_aggregated_in_database(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'include': 'status'})
+        self.assertEqual(response.data['by_status']['completed'], {'count': 2, 'total': Decimal('150.50')})
+        self.assertEqual(response.data['by_status']['ready'], {'count': 0, 'total': Decimal('0')})
+
+    def test_summary_for_customer_without_orders(self):
+        customer = Customer.objects.create(
+            first_name='Пётр', last_name='Петров', email='petr@example.com', phone='+77017654321'
+        )
+        response = self.client.get(f'/api/customers/{customer.pk}/orders/')
+        self.assertEqual(response.data['orders_count'], 0)
+        self.assertEqual(response.data['total_spent'], Decimal('0'))
+        self.assertIsNone(response.data['last_order_at'])
+        self.assertIsNone(response.data['customer']['stats'])
+
+    def test_include_orders_returns_paginated_list(self):
+        response = self.client.get(self.url, {'include': 'orders', 'count': 'true'})
+        self.assertEqual(response.data['orders']['count'], 4)
+        self.assertEqual(len(response.data['orders']['results']), 4)
+        self.assertEqual(
+            set(response.data['orders']['results'][0]),
+            {'id', 'order_number', 'order_type', 'status', 'final_amount', 'created_at', 'completed_at'}
+        )
+
+
+class AsyncReadEndpointTests(APITransactionTestCase):
+    # Transactional: the summary view reads on pool threads with their own connections.
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('cashier', password='secret')
+        self.customer = Customer.objects.create(
+            first_name='Анна', last_name='Иванова', email='anna@example.com', phone='+77011234567'
+        )
+        Customer.objects.create(first_name='Борис', last_name='Ким', email='boris@example.com', phone='+77017654321')
+        for number, (order_status, amount) in enumerate([('completed', '100.00'), ('pending', '20.00')]):
+            Order.objects.create(
+                order_number=f'A{number}', customer=self.customer, status=order_status,
+                total_amount=Decimal(amount), final_amount=Decimal(amount)
+            )
+
+    def test_async_endpoints_answer_like_the_viewsets(self):
+        self.assertEqual(self.client.get('/api/async/customers/').status_code, 403)
+        self.client.force_authenticate(self.user)
+        order = Order.objects.first()
+        for path in [
+            'customers/', 'customers/?page_size=1', f'customers/{self.customer.pk}/',
+            f'customers/{self.customer.pk}/orders/?include=status,orders', f'customers/{self.customer.pk}/orders/',
+            'orders/', f'orders/{order.pk}/', 'products/',
+        ]:
+            expected = self.client.get(f'/api/{path}')
+            response = self.client.get(f'/api/async/{path}')
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(
+                json.loads(response.content.decode().replace('/api/async/', '/api/')),
+                json.loads(expected.content), path
+            )
+        self.assertEqual(self.client.get('/api/async/customers/0/').status_code, 404)
+        self.assertEqual(self.client.get('/api/async/customers/0/orders/').status_code, 404)
+        self.assertEqual(self.client.get('/api/async/orders/', {'cursor': 'bogus'}).status_code, 404)
+
+
+class CustomerStatsMaintenanceTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name='Ольга', last_name='Смирнова', email='olga@example.com', phone='+77015550000'
+        )
+
+    def make_order(self, number, amount, order_status='pending'):
+        return Order.objects.create(
+            order_number=number, customer=self.customer, status=order_status,
+            total_amount=Decimal(amount), final_amount=Decimal(amount)
+        )
+
+    def stats(self):
+        stats = CustomerStats.objects.get(customer=self.customer)
+        return stats.orders_count, stats.total_spent, stats.average_basket, stats.last_order_at
+
+    def test_counters_follow_completion_and_cancellation(self):
+        first = self.make_order('M1', '100.00', 'completed')
+        second = self.make_order('M2', '50.00')
+        self.assertEqual(self.stats(), (1, Decimal('100.00'), Decimal('100.00'), first.created_at))
+
+        second.status = 'completed'
+        second.save()
+        third = self.make_order('M3', '50.00', 'completed')
+        self.assertEqual(self.stats(), (3, Decimal('200.00'), Decimal('66.67'), third.created_at))
+
+        third.status = 'cancelled'
+        third.save()
+        self.assertEqual(self.stats(), (2, Decimal('150.00'), Decimal('75.00'), second.created_at))
+
+        first.delete()
+        second.status = 'cancelled'
+        second.save()
+        self.assertEqual(self.stats(), (0, Decimal('0.00'), Decimal('0.00'), None))
+        self.assertEqual(list(check_customer_stats(Customer.objects.all())), [])
+
+    def test_incremental_average_rounds_like_a_rebuild(self):
+        # 5.33 / 2 = 2.665: half a cent rounds up on both paths, as PostgreSQL's numeric does.
+        self.make_order('R1', '2.00', 'completed')
+        self.make_order('R2', '3.33', 'completed')
+        self.assertEqual(self.stats()[2], Decimal('2.67'))
+        self.assertEqual(list(check_customer_stats(Customer.objects.all())), [])
+
+    def test_bulk_created_orders_are_counted(self):
+        create_orders_bulk([
+            {'order_number': f'BK{i}', 'customer': self.customer, 'order_type': 'in_store', 'status': order_status,
+             'discount_amount': Decimal('0'), 'notes': '', 'items': []}
+            for i, order_status in enumerate(['completed', 'completed', 'pending'])
+        ])
+        self.assertEqual(self.stats()[0], 2)
+
+    def test_checker_reports_drift_and_rebuild_repairs_it(self):
+        self.make_order('D1', '30.00', 'completed')
+        self.make_order('D2', '12.00', 'completed')
+        Order.objects.filter(order_number='D2').update(status='cancelled')
+        other = Customer.objects.create(
+            first_name='Иван', last_name='Орлов', email='ivan@example.com', phone='+77015550001'
+        )
+        CustomerStats.objects.create(customer=other, orders_count=5, total_spent=Decimal('10.00'))
+
+        drift = {customer_id for customer_id, _, _ in check_customer_stats(Customer.objects.all(), chunk_size=1)}
+        self.assertEqual(drift, {self.customer.pk, other.pk})
+
+        self.assertEqual(rebuild_customer_stats(Customer.objects.all(), chunk_size=1), 1)
+        self.assertEqual(list(check_customer_stats(Customer.objects.all())), [])
+        self.assertEqual(self.stats()[:3], (1, Decimal('30.00'), Decimal('30.00')))
+        self.assertFalse(CustomerStats.objects.filter(customer=other).exists())
+
+
+class LoyaltyEngineTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.members = []
+        for i, spent in enumerate(['120.00', '640.40', '2500.00']):
+            customer = Customer.objects.create(
+                first_name=f'Участник{i}', last_name='Тест', email=f'm{i}@example.com',
+                phone='+77010000000', customer_type='loyalty'
+            )
+            LoyaltyProgram.objects.create(customer=customer, points=10)
+            Order.objects.create(
+                order_number=f'L{i}', customer=customer, status='completed',
+                completed_at=cls.now - timedelta(hours=1), total_amount=Decimal(spent), final_amount=Decimal(spent)
+            )
+            cls.members.append(customer)
+        cls.outsider = Customer.objects.create(
+            first_name='Гость', last_name='Тест', email='guest@example.com', phone='+77010000000'
+        )
+        Order.objects.create(
+            order_number='G1', customer=cls.outsider, status='completed',
+            completed_at=cls.now - timedelta(hours=1), total_amount=Decimal('99.00'), final_amount=Decimal('99.00')
+        )
+
+    def programs(self):
+        return list(LoyaltyProgram.objects.order_by('customer_id').values_list('points', 'tier'))
+
+    def test_accrual_and_tiers_are_set_based_and_idempotent(self):
+        run = run_loyalty(now=self.now, lag=timedelta(0))
+        self.assertEqual((run.orders_count, run.members_count, run.tiers_changed), (3, 3, 2))
+        # Points use the tier held before recalculation: everyone starts bronze.
+        self.assertEqual(self.programs(), [(130, 'bronze'), (650, 'silver'), (2510, 'gold')])
+
+        with self.assertNumQueries(5):
+            # savepoint, last run, claim, totals, release
+            self.assertEqual(run_loyalty(now=self.now, lag=timedelta(0)), run)
+        self.assertEqual(self.programs(), [(130, 'bronze'), (650, 'silver'), (2510, 'gold')])
+
+        Order.objects.create(
+            order_number='L9', customer=self.members[2], status='completed',
+            completed_at=self.now + timedelta(minutes=1), total_amount=Decimal('10.00'), final_amount=Decimal('10.00')
+        )
+        run = run_loyalty(now=self.now + timedelta(minutes=2), lag=timedelta(0))
+        self.assertEqual((run.orders_count, run.points, run.tiers_changed), (1, 15, 0))
+        self.assertEqual(self.programs()[2], (2525, 'gold'))
+        self.assertEqual(LoyaltyRun.objects.count(), 2)
+
+    def test_back_dated_import_is_accrued_by_the_next_run(self):
+        run_loyalty(now=self.now, lag=timedelta(0))
+        product = Product.objects.create(
+            name='Торт', description='', category=Category.objects.create(name='Торты'),
+            price=Decimal('20.00'), cost=Decimal('8.00')
+        )
+        # A late POS batch: completed well before the last run's window end.
+        create_orders_bulk([{
+            'order_number': 'POS-LATE', 'customer': self.members[0], 'order_type': 'in_store',
+            'status': 'completed', 'discount_amount': Decimal('0.00'), 'notes': '',
+            'completed_at': self.now - timedelta(days=2), 'items': [{'product': product, 'quantity': 2}],
+        }])
+        run = run_loyalty(now=self.now, lag=timedelta(0))
+        self.assertEqual((run.orders_count, run.members_count, run.points), (1, 1, 40))
+        self.assertEqual(self.programs()[0], (170, 'bronze'))
+        self.assertFalse(Order.objects.filter(status='completed', loyalty_accrued_at__isnull=True,
+                                              customer__loyalty__isnull=False).exists())
+
+    def test_members_joining_later_are_not_paid_for_old_orders(self):
+        run_loyalty(now=self.now, lag=timedelta(0))
+        LoyaltyProgram.objects.create(customer=self.outsider)
+        run = run_loyalty(now=self.now + timedelta(minutes=1), lag=timedelta(0))
+        self.assertEqual(run.orders_count, 0)
+        self.assertEqual(LoyaltyProgram.objects.get(customer=self.outsider).points, 0)
+
+    def test_tiers_follow_lifetime_spend_down_as_well(self):
+        run_loyalty(now=self.now, lag=timedelta(0))
+        Order.objects.filter(order_number='L2').update(status='cancelled')
+        rebuild_customer_stats(Customer.objects.filter(pk=self.members[2].pk))
+        run_loyalty(now=self.now + timedelta(minutes=1), lag=timedelta(0))
+        self.assertEqual(self.programs()[2], (2510, 'bronze'))
+
+
+class CustomerSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('cashier', password='secret')
+        people = [
+            ('Алёна', 'Ковалёва', 'alena.k@example.com', '+77011234567'),
+            ('Александр', 'Пушкин', 'pushkin@mail.ru', '+77027654321'),
+            ('John', 'Smith', 'jsmith@example.com', '+14155550100'),
+            ('Жанар', 'Әлиева', 'zhanar@example.kz', '87051112233'),
+        ]
+        cls.customers = Customer.objects.bulk_create([
+            Customer(first_name=first, last_name=last, email=email, phone=phone)
+            for first, last, email, phone in people
+        ])
+        if cls.customers[0].pk is None:
+            cls.customers = list(Customer.objects.order_by('pk'))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def found(self, query):
+        return {Customer.objects.get(pk=pk).last_name for pk in search_customer_ids(query)}
+
+    def test_phone_normalization(self):
+        self.assertEqual(normalize_phone('8 (701) 123-45-67'), '+77011234567')
+        self.assertEqual(normalize_phone('+7 701 123 45 67'), '+77011234567')
+        self.assertEqual(normalize_phone('4155550100'), '4155550100')
+
+    def test_prefix_matching_across_scripts_and_fields(self):
+        self.assertEqual(self.found('ал'), {'Ковалёва', 'Пушкин'})
+        self.assertEqual(self.found('Але'), {'Ковалёва', 'Пушкин'})
+        self.assertEqual(self.found('ковалев'), {'Ковалёва'})
+        self.assertEqual(self.found('alek'), {'Пушкин'})
+        self.assertEqual(self.found('Жан әли'), {'Әлиева'})
+        self.assertEqual(self.found('zhanar'), {'Әлиева'})
+        self.assertEqual(self.found('smi'), {'Smith'})
+        self.assertEqual(self.found('pushkin@mail'), {'Пушкин'})
+        self.assertEqual(self.found(''), set())
+
+    def test_phone_queries_in_any_format(self):
+        self.assertEqual(self.found('+7 (701) 123'), {'Ковалёва'})
+        self.assertEqual(self.found('8701123'), {'Ковалёва'})
+        self.assertEqual(self.found('702 765'), {'Пушкин'})
+        self.assertEqual(self.found('8 705 111 22 33'), {'Әлиева'})
+
+    def test_index_follows_saves_and_deletes(self):
+        customer = self.customers[2]
+        customer.last_name = 'Смит'
+        customer.save()
+        self.assertEqual(self.found('smi'), {'Смит'})
+        self.assertEqual(self.found('смит'), {'Смит'})
+        customer.delete()
+        self.assertEqual(self.found('смит'), set())
+
+    def test_endpoint(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/customers/search/', {'q': 'ал', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertIn(response.data[0]['last_name'], {'Ковалёва', 'Пушкин'})
+        self.assertFalse([q for q in queries.captured_queries if 'LIKE' in q['sql']])
+        self.assertEqual(self.client.get('/api/customers/search/').data, [])
+
+    def test_typed_phone_is_stored_normalized(self):
+        response = self.client.post('/api/customers/', {
+            'first_name': 'Ерлан', 'last_name': 'Серік', 'email': 'erlan@example.kz', 'phone': '8 (777) 000-11-22'
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['phone'], '+77770001122')
+        self.assertEqual(self.found('erlan'), {'Серік'})
+
+
+class CustomerImportTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('crm', password='secret')
+        Customer.objects.create(first_name='Уже', last_name='Есть', email='taken@example.com', phone='+77010000000')
+        self.rows = [
+            {'first_name': 'Анна', 'last_name': 'Первая', 'email': 'anna@Example.COM',
+             'phone': '8 (701) 111-22-33', 'customer_type': 'loyalty', 'loyalty_points': 40},
+            {'first_name': 'Борис', 'last_name': 'Второй', 'email': 'not-an-email', 'phone': '+77010000001'},
+            {'first_name': 'Анна', 'last_name': 'Дубль', 'email': 'anna@example.com', 'phone': '+77010000002'},
+            {'first_name': 'Вера', 'last_name': 'Занята', 'email': 'taken@example.com', 'phone': '+77010000003'},
+            {'first_name': 'Глеб', 'last_name': 'Третий', 'email': 'gleb@example.com', 'phone': '+77010000004'},
+            'not a row',
+        ]
+
+    def test_valid_rows_are_created_and_bad_rows_reported(self):
+        # email IN lookup, savepoint, customers, loyalty programs, release
+        with self.assertNumQueries(5):
+            created, errors = import_customers(self.rows)
+        self.assertEqual([customer.last_name for customer in created], ['Первая', 'Третий'])
+        self.assertEqual([error['row'] for error in errors], [1, 2, 3, 5])
+        self.assertIn('email', errors[0]['errors'])
+        self.assertEqual(errors[1]['errors']['email'], ['Email повторяется в файле (строка 0).'])
+        self.assertEqual(errors[2]['errors']['email'], ['Клиент с таким email уже существует.'])
+
+        anna = Customer.objects.get(email='anna@example.com')
+        self.assertEqual(anna.phone, '+77011112233')
+        self.assertEqual(anna.loyalty.points, 40)
+        self.assertFalse(LoyaltyProgram.objects.filter(customer__email='gleb@example.com').exists())
+        self.assertEqual(search_customer_ids('Третий'), [Customer.objects.get(email='gleb@example.com').pk])
+
+    def test_chunks_do_not_change_the_outcome(self):
+        created, errors = import_customers(self.rows, chunk_size=1)
+        self.assertEqual(len(created), 2)
+        self.assertEqual(len(errors), 4)
+
+    def test_endpoint(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/customers/import/', {'customers': self.rows[:2]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 1)
+
+        response = self.client.post('/api/customers/import/', {'customers': self.rows[:1]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/customers/import/', {}, format='json').status_code, 400)
+
+
+class CustomerKeysetPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('manager', password='secret')
+        Customer.objects.bulk_create([
+            Customer(first_name=f'Имя{i}', last_name='Тест', email=f'c{i}@example.com', phone='+77010000000')
+            for i in range(7)
+        ])
+        # Ties on registration_date must be broken by id.
+        Customer.objects.update(registration_date=timezone.now())
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_pages_cover_every_row_once_in_order(self):
+        expected = list(Customer.objects.order_by('-registration_date', '-id').values_list('id', flat=True))
+        seen = []
+        url = '/api/customers/?page_size=3'
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql'] or 'OFFSET' in q['sql']])
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get('/api/customers/', {'page_size': 3})
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+        self.assertEqual(back.data['next'], first.data['next'])
+
+    def test_count_on_request_and_invalid_cursor(self):
+        response = self.client.get('/api/customers/', {'count': 'true', 'page_size': 2})
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(self.client.get('/api/customers/', {'cursor': 'garbage'}).status_code, 404)
+
+
+class CustomerEagerLoadingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('manager', password='secret')
+        customers = Customer.objects.bulk_create([
+            Customer(first_name=f'Имя{i}', last_name='Тест', email=f'c{i}@example.com',
+                     phone='+77010000000', customer_type='loyalty')
+            for i in range(5)
+        ])
+        LoyaltyProgram.objects.bulk_create([LoyaltyProgram(customer=c, points=10) for c in customers[:3]])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_nested_loyalty_is_joined_not_queried_per_row(self):
+        for url in ('/api/customers/', '/api/customers/loyalty_members/'):
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            rows = response.data['results'] if 'results' in response.data else response.data
+            self.assertEqual(len(rows), 5)
+            self.assertEqual(sum(1 for row in rows if row['loyalty']), 3)
+
+    @override_settings(ENFORCE_QUERY_BUDGETS=True)
+    def test_request_over_budget_fails_in_tests(self):
+        with mock.patch.object(CustomerViewSet, 'query_budget', {'list': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/customers/')
\ No newline at end of file
@@ -0,0 +1,69 @@
+import re
+
+PHONE_NOISE = re.compile(r'[\s()\-.]')
+WORD = re.compile(r'\w+')
+PHONE_QUERY = re.compile(r'^\+?[\d\s()\-.]{3,}$')
+NATIONAL_DIGITS = 10
+# Fewer digits match a large share of all customers, which is useless at the counter.
+MIN_PHONE_QUERY_DIGITS = 6
+
+TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch',
+    'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'ә': 'a', 'ғ': 'g', 'қ': 'q', 'ң': 'n', 'ө': 'o', 'ұ': 'u', 'ү': 'u', 'һ': 'h', 'і': 'i',
+})
+
+
+def normalize_phone(value):
+    """Bring a typed phone number to the ``+?1?\\d{9,15}`` form of ``Customer.phone``.
+
+    Formatting characters are dropped and a leading trunk ``8`` becomes the
+    country code ``+7``: ``8 (701) 123-45-67`` -> ``+77011234567``.
+    """
+    value = PHONE_NOISE.sub('', value or '')
+    plus = value.startswith('+')
+    digits = value.lstrip('+')
+    if not plus and len(digits) == 11 and digits.startswith('8'):
+        digits, plus = '7' + digits[1:], True
+    return ('+' if plus else '') + digits
+
+
+def normalize_word(value):
+    return value.casefold().replace('ё', 'е')
+
+
+def transliterate(value):
+    return normalize_word(value).translate(TRANSLIT)
+
+
+def customer_search_text(first_name, last_name, email, phone):
+    """Space separated search tokens: names (also transliterated), email and phone digits."""
+    tokens = []
+    for name in (first_name, last_name):
+        for word in WORD.findall(normalize_word(name or '')):
+            tokens.append(word)
+            latin = transliterate(word)
+            if latin != word:
+                tokens.append(latin)
+    tokens.append((email or '').casefold())
+    digits = normalize_phone(phone).lstrip('+')
+    if digits:
+        tokens.append(digits)
+        if len(digits) > NATIONAL_DIGITS:
+            # Lets "701 123" match "+77011234567" as the cashier types the local part.
+            tokens.append(digits[-NATIONAL_DIGITS:])
+    return ' '.join(dict.fromkeys(token for token in tokens if token))
+
+
+def search_query_tokens(query):
+    """Tokens of a search box query; a phone-like query becomes one digits token."""
+    query = (query or '').strip()
+    if PHONE_QUERY.match(query):
+        digits = PHONE_NOISE.sub('', query)
+        if digits.startswith('8'):
+            digits = '7' + digits[1:]
+        digits = digits.lstrip('+')
+        return [digits] if len(digits) >= MIN_PHONE_QUERY_DIGITS else []
+    return WORD.findall(normalize_word(query))
@@ -1,25 +1,141 @@
+from decimal import Decimal
+
+from django.db.models import Count, Min, Q, Sum
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from .models import Customer
+from belle_croissant.async_views import AsyncReadView, gather_queries
+from belle_croissant.eager_loading import EagerLoadingViewSetMixin
+from belle_croissant.exports import export_response, parse_export_params
+from orders.models import Order
+from orders.serializers import OrderListSerializer
+from .exports import customers_export
+from .imports import import_customers
+from .models import Customer, CustomerStats
+from .search import SEARCH_LIMIT, search_customer_ids
 from .serializers import CustomerSerializer
 
-class CustomerViewSet(viewsets.ModelViewSet):
+
+def customer_order_summary(customer):
+    """Lifetime figures over completed orders, read from ``CustomerStats`` without touching orders."""
+    try:
+        stats = customer.stats
+    except CustomerStats.DoesNotExist:
+        stats = CustomerStats(customer=customer)
+    return {
+        'orders_count': stats.orders_count,
+        'total_spent': stats.total_spent,
+        'average_basket': stats.average_basket,
+        'last_order_at': stats.last_order_at,
+    }
+
+
+def customer_status_breakdown(customer):
+    aggregates = {'first_order_at': Min('created_at')}
+    for code, _ in Order.STATUS_CHOICES:
+        aggregates[f'{code}_count'] = Count('id', filter=Q(status=code))
+        aggregates[f'{code}_total'] = Sum('final_amount', filter=Q(status=code))
+
+    row = Order.objects.filter(customer=customer).order_by().aggregate(**aggregates)
+    return {
+        'first_order_at': row['first_order_at'],
+        'by_status': {
+            code: {
+                'count': row[f'{code}_count'],
+                'total': row[f'{code}_total'] or Decimal('0'),
+            }
+            for code, _ in Order.STATUS_CHOICES
+        },
+    }
+
+
+class CustomerViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
-    
+    query_budget = {'list': 2, 'retrieve': 1, 'orders': 4, 'loyalty_members': 1, 'search': 2}
+
     @action(detail=True, methods=['get'])
     def orders(self, request, pk=None):
         customer = self.get_object()
-        orders = customer.orders.all()
-        return Response({
-            'customer': CustomerSerializer(customer).data,
-            'orders_count': orders.count(),
-            'total_spent': sum(order.final_amount for order in orders)
-        })
-    
+        data = {'customer': CustomerSerializer(customer).data}
+        data.update(customer_order_summary(customer))
+
+        include = set(request.query_params.get('include', '').split(','))
+        if 'status' in include:
+            data.update(customer_status_breakdown(customer))
+        if 'orders' in include:
+            orders = (
+                Order.objects.filter(customer=customer)
+                .only(*OrderListSerializer.Meta.fields)
+            )
+            page = self.paginate_queryset(orders)
+            serializer = OrderListSerializer(page, many=True)
+            data['orders'] = self.get_paginated_response(serializer.data).data
+
+        return Response(data)
+
     @action(detail=False, methods=['get'])
     def loyalty_members(self, request):
-        members = Customer.objects.filter(customer_type='loyalty')
+        members = self.get_queryset().filter(customer_type='loyalty')
         serializer = self.get_serializer(members, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', SEARCH_LIMIT)), 1), 100)
+        except ValueError:
+            limit = SEARCH_LIMIT
+        ids = search_customer_ids(request.query_params.get('q', ''), limit)
+        found = self.get_queryset().in_bulk(ids) if ids else {}
+        serializer = self.get_serializer([found[pk] for pk in ids if pk in found], many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        rows = request.data.get('customers') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({'customers': ['Ожидается непустой список клиентов.']}, status=status.HTTP_400_BAD_REQUEST)
+        created, errors = import_customers(rows)
+        return Response(
+            {'created': len(created), 'errors': errors},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        fmt, since, until = parse_export_params(request.query_params)
+        queryset, columns = customers_export(since, until)
+        return export_response(request, queryset, columns, fmt, 'customers')
+
+
+class CustomerAsyncView(AsyncReadView):
+    queryset = Customer.objects.all()
+    serializer_class = CustomerSerializer
+
+
+class CustomerOrdersAsyncView(CustomerAsyncView):
+    """Async ``CustomerViewSet.orders``: the customer and each ``include`` part are read concurrently."""
+
+    async def retrieve(self, request, pk):
+        include = set(request.query_params.get('include', '').split(','))
+        calls = [(self.get_queryset().filter(pk=pk).first,)]
+        if 'status' in include:
+            calls.append((customer_status_breakdown, pk))
+        if 'orders' in include:
+            paginator = self.pagination_class()
+            orders = Order.objects.filter(customer_id=pk).only(*OrderListSerializer.Meta.fields)
+            calls.append((paginator.paginate_queryset, orders, request, self))
+        customer, *parts = await gather_queries(*calls)
+        if customer is None:
+            raise NotFound()
+
+        data = {'customer': CustomerSerializer(customer).data}
+        data.update(customer_order_summary(customer))
+        if 'status' in include:
+            data.update(parts.pop(0))
+        if 'orders' in include:
+            page = parts.pop(0)
+            data['orders'] = paginator.get_paginated_response(OrderListSerializer(page, many=True).data).data
+        return data
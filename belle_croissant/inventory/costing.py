@@ -0,0 +1,69 @@
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Round
+
+from belle_croissant.sqlite import atomic_write
+from products.models import Product
+from .models import ProductIngredient, UNIT_FACTORS
+
+
+def recipe_quantity(prefix=''):
+    """Recipe line quantity in its ingredient's stock unit (``kg`` for ``g`` lines and so on).
+
+    ``prefix`` is the path to ``ProductIngredient`` from the queried model.
+    NULL for a unit that does not convert, e.g. ``pcs`` of an ingredient kept in ``kg``.
+    """
+    unit, stock_unit, quantity = f'{prefix}unit', f'{prefix}ingredient__unit', F(f'{prefix}quantity')
+    return Case(
+        When(Q(**{unit: ''}) | Q(**{unit: F(stock_unit)}), then=quantity),
+        *[
+            When(**{unit: source, stock_unit: target}, then=quantity * Value(factor))
+            for (source, target), factor in UNIT_FACTORS.items()
+        ],
+        output_field=DecimalField(max_digits=16, decimal_places=5),
+    )
+
+
+def recipe_cost():
+    """Correlated subquery: the recipe cost of the outer ``Product`` row."""
+    lines = (
+        ProductIngredient.objects.filter(product=OuterRef('pk'))
+        .values('product')
+        .annotate(total=Round(Sum(recipe_quantity() * F('ingredient__cost_per_unit')), 2))
+        .values('total')
+    )
+    return Subquery(lines, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def products_using(ingredient_ids):
+    return ProductIngredient.objects.filter(ingredient_id__in=ingredient_ids).values('product_id')
+
+
+@atomic_write()
+def recompute_costs(products=None):
+    """Set ``cost`` from the recipe and ``margin = price - cost`` for ``products``.
+
+    ``products`` is an iterable or queryset of product ids, all products by
+    default. The whole set is handled by two ``UPDATE`` statements, the
+    recipe sum being a correlated aggregate evaluated by the database.
+    Products without a recipe, or with a line whose unit does not convert,
+    keep their hand-entered cost (see ``forget_recipe_costs`` for products
+    whose last line was deleted). Returns the number of products costed.
+    """
+    targets = Product.objects.all() if products is None else Product.objects.filter(pk__in=products)
+    lines = ProductIngredient.objects.filter(product=OuterRef('pk'))
+    unconvertible = lines.annotate(stock_quantity=recipe_quantity()).filter(stock_quantity__isnull=True)
+    costed = targets.filter(Exists(lines)).exclude(Exists(unconvertible)).update(cost=recipe_cost())
+    # Rounded: SQLite subtracts decimals as floats, and a margin of 0.6199999 would break keyset seeks.
+    targets.update(margin=Round(F('price') - F('cost'), 2))
+    return costed
+
+
+def forget_recipe_costs(products):
+    """Zero the cost of ``products`` left without recipe lines; it was the deleted recipe's, not entered by hand."""
+    lines = ProductIngredient.objects.filter(product=OuterRef('pk'))
+    return Product.objects.filter(pk__in=products).exclude(Exists(lines)).update(cost=0)
+
+
+def recompute_costs_for_ingredients(ingredient_ids):
+    """Incremental ``recompute_costs`` after a price change: only the products whose recipes use them."""
+    return recompute_costs(products_using(ingredient_ids))
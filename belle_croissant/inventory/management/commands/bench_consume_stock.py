@@ -0,0 +1,61 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from belle_croissant.bench import rolled_back
+from inventory.models import Ingredient, ProductIngredient
+from inventory.services import consume_orders
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = 'Время списания ингредиентов для смены из N заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--products', type=int, default=60)
+        parser.add_argument('--ingredients', type=int, default=40)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with rolled_back():
+            category = Category.objects.create(name='Bench')
+            products = Product.objects.bulk_create([
+                Product(name=f'P{i}', description='', category=category, price=Decimal('3.00'), cost=Decimal('1.00'))
+                for i in range(options['products'])
+            ])
+            ingredients = Ingredient.objects.bulk_create([
+                Ingredient(name=f'I{i}', unit='g', current_stock=Decimal('99999999.00'), min_stock=0,
+                           max_stock=Decimal('99999999.00'), cost_per_unit=Decimal('0.01'))
+                for i in range(options['ingredients'])
+            ])
+            ProductIngredient.objects.bulk_create([
+                ProductIngredient(product=product, ingredient=ingredient, quantity=Decimal(rng.randint(5, 200)))
+                for product in products
+                for ingredient in rng.sample(ingredients, 6)
+            ])
+            orders = Order.objects.bulk_create([
+                Order(order_number=f'C{i:09d}', status='completed', total_amount=0, final_amount=0)
+                for i in range(options['orders'])
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=rng.randint(1, 4),
+                          unit_price=Decimal('3.00'), total_price=Decimal('3.00'))
+                for order in orders
+                for product in rng.sample(products, 3)
+            ], batch_size=1000)
+
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                demand = consume_orders(orders)
+            elapsed = (time.perf_counter() - start) * 1000
+
+        self.stdout.write(
+            f'{options["orders"]} заказов, {options["orders"] * 3} позиций -> {len(demand)} ингредиентов: '
+            f'{elapsed:.1f} мс, {len(ctx.captured_queries)} запросов'
+        )
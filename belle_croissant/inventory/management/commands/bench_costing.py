@@ -0,0 +1,73 @@
+import random
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from belle_croissant.bench import measure, rolled_back
+from inventory.costing import recompute_costs, recompute_costs_for_ingredients
+from inventory.models import Ingredient, ProductIngredient
+from products.models import Category, Product
+from products.views import ProductViewSet
+
+UNITS = [('kg', 'g'), ('g', ''), ('l', 'ml'), ('pcs', '')]
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт себестоимости всего каталога, инкремент после смены цены и отчёт по марже'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--lines', type=int, default=4, help='строк рецепта на продукт')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            ingredients = self.seed(options)
+            user = get_user_model().objects.create_user('bench-costing')
+            factory = APIRequestFactory()
+            view = ProductViewSet.as_view({'get': 'margins'})
+
+            def report(**params):
+                request = factory.get('/api/products/margins/', params, HTTP_HOST='localhost')
+                force_authenticate(request, user)
+                response = view(request)
+                response.render()
+                return response
+
+            cursor = parse_qs(urlsplit(report(page_size=50).data['next']).query)['cursor'][0]
+            for label, func in [
+                ('пересчёт всего каталога', recompute_costs),
+                ('после смены цены одного ингредиента', lambda: recompute_costs_for_ingredients([ingredients[0]])),
+                ('отчёт по марже, первая страница', lambda: report(page_size=50)),
+                ('отчёт по марже, следующая страница', lambda: report(page_size=50, cursor=cursor)),
+                ('отчёт, маржа не выше 0', lambda: report(page_size=50, max_margin='0', ordering='-margin')),
+            ]:
+                queries, ms = measure(func, options['repeat'])
+                self.stdout.write(f'{label}: {queries} запросов, {ms:.1f} мс')
+
+    def seed(self, options):
+        rng = random.Random(42)
+        category = Category.objects.create(name='Bench')
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(name=f'I{i}', unit=UNITS[i % len(UNITS)][0], current_stock=0, min_stock=0, max_stock=0,
+                       cost_per_unit=Decimal(rng.randint(1, 500)) / 100)
+            for i in range(options['ingredients'])
+        ])
+        ingredient_ids = [ingredient.pk for ingredient in ingredients]
+        units = {ingredient.pk: UNITS[i % len(UNITS)][1] for i, ingredient in enumerate(ingredients)}
+        products = Product.objects.bulk_create([
+            Product(name=f'P{i}', description='', category=category, price=Decimal(rng.randint(100, 900)) / 100,
+                    cost=0)
+            for i in range(options['products'])
+        ], batch_size=5000)
+        ProductIngredient.objects.bulk_create([
+            ProductIngredient(product_id=product.pk, ingredient_id=ingredient_id,
+                              quantity=Decimal(rng.randint(1, 300)), unit=units[ingredient_id])
+            for product in products
+            for ingredient_id in rng.sample(ingredient_ids, options['lines'])
+        ], batch_size=5000)
+        return ingredient_ids
@@ -0,0 +1,67 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from belle_croissant.bench import rolled_back
+from inventory.models import Ingredient, ProductIngredient
+from inventory.restock import plan_restock
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = 'Время построения плана закупок: set-based против цикла по Ingredient.needs_restock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=50000)
+        parser.add_argument('--orders', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        with rolled_back():
+            category = Category.objects.create(name='Bench')
+            products = Product.objects.bulk_create([
+                Product(name=f'P{i}', description='', category=category, price=Decimal('3.00'), cost=Decimal('1.00'))
+                for i in range(500)
+            ])
+            ingredients = Ingredient.objects.bulk_create([
+                Ingredient(
+                    name=f'I{i}', unit='g', current_stock=Decimal(rng.randint(0, 5000)),
+                    min_stock=Decimal(1000), max_stock=Decimal(8000), cost_per_unit=Decimal('0.02')
+                )
+                for i in range(options['ingredients'])
+            ], batch_size=5000)
+            ProductIngredient.objects.bulk_create([
+                ProductIngredient(product=product, ingredient=ingredient, quantity=Decimal(rng.randint(5, 200)))
+                for product in products
+                for ingredient in rng.sample(ingredients, 8)
+            ], batch_size=5000)
+            orders = Order.objects.bulk_create([
+                Order(order_number=f'R{i:09d}', status='completed', total_amount=0, final_amount=0)
+                for i in range(options['orders'])
+            ], batch_size=5000)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=rng.choice(products), quantity=rng.randint(1, 3),
+                          unit_price=Decimal('3.00'), total_price=Decimal('3.00'))
+                for order in orders
+                for _ in range(3)
+            ], batch_size=5000)
+
+            start = time.perf_counter()
+            legacy = [ingredient for ingredient in Ingredient.objects.all() if ingredient.needs_restock]
+            legacy_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            plan = plan_restock()
+            plan_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            horizon = plan_restock(horizon=7)
+            horizon_ms = (time.perf_counter() - start) * 1000
+
+        self.stdout.write(f'{options["ingredients"]} ингредиентов')
+        self.stdout.write(f'цикл needs_restock (без расчётов): {len(legacy)} шт., {legacy_ms:.0f} мс')
+        self.stdout.write(f'plan_restock: {len(plan)} шт., {plan_ms:.0f} мс')
+        self.stdout.write(f'plan_restock(horizon=7): {len(horizon)} шт., {horizon_ms:.0f} мс')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services import consume_orders
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Списать ингредиенты по завершённым заказам, которые ещё не списаны'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        orders = consumed = 0
+        while True:
+            batch = list(
+                Order.objects.filter(status='completed', stock_consumed_at__isnull=True)
+                .order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            consumed += len(consume_orders(batch))
+            orders += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Заказов: {orders}, списаний по ингредиентам: {consumed}'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inventory.costing import recompute_costs, recompute_costs_for_ingredients
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать себестоимость продуктов по рецептам и маржу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredient', type=int, nargs='+', help='только продукты с этими ингредиентами')
+
+    def handle(self, *args, **options):
+        if options['ingredient']:
+            costed = recompute_costs_for_ingredients(options['ingredient'])
+        else:
+            costed = recompute_costs()
+        self.stdout.write(self.style.SUCCESS(f'Себестоимость пересчитана по рецептам: {costed}'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productingredient',
+            name='unit',
+            field=models.CharField(blank=True, choices=[('kg', 'Килограмм'), ('g', 'Грамм'), ('l', 'Литр'), ('ml', 'Миллилитр'), ('pcs', 'Штуки')], max_length=10, verbose_name='Единица измерения'),
+        ),
+    ]
@@ -1,6 +1,17 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from products.models import Product
 
+# (recipe unit, stock unit) -> multiplier; same units convert 1:1, everything else not at all.
+UNIT_FACTORS = {
+    ('g', 'kg'): Decimal('0.001'),
+    ('kg', 'g'): Decimal('1000'),
+    ('ml', 'l'): Decimal('0.001'),
+    ('l', 'ml'): Decimal('1000'),
+}
+
 class Ingredient(models.Model):
     UNIT_CHOICES = [
         ('kg', 'Килограмм'),
@@ -41,6 +52,8 @@ class ProductIngredient(models.Model):
         verbose_name='Ингредиент'
     )
     quantity = models.DecimalField('Количество', max_digits=10, decimal_places=2)
+    # Blank: the quantity is in the ingredient's own unit.
+    unit = models.CharField('Единица измерения', max_length=10, choices=Ingredient.UNIT_CHOICES, blank=True)
     
     class Meta:
         verbose_name = 'Ингредиент продукта'
@@ -48,4 +61,12 @@ class ProductIngredient(models.Model):
         unique_together = ['product', 'ingredient']
     
     def __str__(self):
-        return f"{self.product.name}: {self.ingredient.name}"
\ No newline at end of file
+        return f"{self.product.name}: {self.ingredient.name}"
+
+    def clean(self):
+        if self.ingredient_id is None:
+            # full_clean() reports the missing ingredient itself.
+            return
+        stock_unit = self.ingredient.unit
+        if self.unit and self.unit != stock_unit and (self.unit, stock_unit) not in UNIT_FACTORS:
+            raise ValidationError({'unit': f'Нельзя пересчитать {self.unit} в {stock_unit}.'})
\ No newline at end of file
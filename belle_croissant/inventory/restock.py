@@ -0,0 +1,78 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.utils import timezone
+
+from orders.models import OrderItem
+from .models import Ingredient
+from .services import demand_by_ingredient
+
+RESTOCK_USAGE_DAYS = 14
+
+reorder_quantity = ExpressionWrapper(
+    F('max_stock') - F('current_stock'), output_field=DecimalField(max_digits=12, decimal_places=2)
+)
+reorder_cost = ExpressionWrapper(
+    (F('max_stock') - F('current_stock')) * F('cost_per_unit'),
+    output_field=DecimalField(max_digits=14, decimal_places=2)
+)
+
+
+def needs_restock():
+    """Set-based equivalent of ``Ingredient.needs_restock`` with reorder amounts computed in SQL."""
+    return Ingredient.objects.filter(current_stock__lte=F('min_stock')).annotate(
+        reorder_quantity=reorder_quantity, reorder_cost=reorder_cost
+    )
+
+
+def daily_usage(days=RESTOCK_USAGE_DAYS, now=None):
+    """Average daily consumption per ingredient over the last ``days`` days of non-cancelled orders."""
+    since = (now or timezone.now()) - timedelta(days=days)
+    items = OrderItem.objects.filter(order__created_at__gte=since).exclude(order__status='cancelled')
+    return {
+        ingredient_id: amount / days
+        for ingredient_id, amount in demand_by_ingredient(items).items()
+    }
+
+
+def plan_restock(days=RESTOCK_USAGE_DAYS, horizon=None, now=None):
+    """Restock plan for the whole catalogue, most urgent first.
+
+    Without ``horizon`` only ingredients at or below ``min_stock`` are
+    returned; with it, ingredients projected to run out within ``horizon``
+    days are included too. Two queries regardless of catalogue size: one
+    grouped consumption aggregate and one ingredient scan with the reorder
+    quantity and cost computed by the database.
+    """
+    usage = daily_usage(days, now)
+    queryset = Ingredient.objects.annotate(reorder_quantity=reorder_quantity, reorder_cost=reorder_cost)
+    if horizon is None:
+        queryset = queryset.filter(current_stock__lte=F('min_stock'))
+    rows = queryset.order_by().values_list(
+        'id', 'name', 'unit', 'current_stock', 'min_stock', 'max_stock',
+        'reorder_quantity', 'reorder_cost'
+    ).iterator(chunk_size=5000)
+
+    plan = []
+    for pk, name, unit, current, minimum, maximum, quantity, cost in rows:
+        rate = usage.get(pk)
+        days_left = max(current, Decimal('0')) / rate if rate else None
+        below_min = current <= minimum
+        if not below_min and (days_left is None or days_left > horizon):
+            continue
+        plan.append({
+            'id': pk,
+            'name': name,
+            'unit': unit,
+            'current_stock': current,
+            'min_stock': minimum,
+            'max_stock': maximum,
+            'below_min': below_min,
+            'reorder_quantity': max(quantity, Decimal('0')),
+            'reorder_cost': max(cost, Decimal('0')),
+            'daily_usage': rate.quantize(Decimal('0.01')) if rate else Decimal('0'),
+            'days_until_stockout': days_left.quantize(Decimal('0.1')) if days_left is not None else None,
+        })
+    plan.sort(key=lambda row: (row['days_until_stockout'] is None, row['days_until_stockout'] or 0, row['id']))
+    return plan
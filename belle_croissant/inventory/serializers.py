@@ -0,0 +1,6 @@
+from rest_framework import serializers
+from .restock import RESTOCK_USAGE_DAYS
+
+class RestockParamsSerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=1, max_value=365, default=RESTOCK_USAGE_DAYS)
+    horizon = serializers.IntegerField(min_value=0, max_value=365, required=False)
@@ -0,0 +1,62 @@
+from django.db import connection
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+from belle_croissant.sqlite import atomic_write
+from orders.models import Order, OrderItem
+from .costing import recipe_quantity
+from .models import Ingredient
+
+
+def demand_by_ingredient(items):
+    """Expand ``items`` (an ``OrderItem`` queryset) through recipes into ``{ingredient_id: amount}`` in stock units."""
+    rows = (
+        items.filter(product__ingredients__isnull=False)
+        .values_list('product__ingredients__ingredient_id')
+        .annotate(amount=Sum(ExpressionWrapper(
+            F('quantity') * recipe_quantity('product__ingredients__'),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )))
+        .order_by()
+    )
+    return dict(rows)
+
+
+def ingredient_demand(order_ids):
+    """Demand vector of the given orders, computed with one aggregate query."""
+    return demand_by_ingredient(OrderItem.objects.filter(order_id__in=order_ids))
+
+
+def _order_ids(orders):
+    return sorted({getattr(order, 'pk', order) for order in orders})
+
+
+@atomic_write()
+def consume_orders(orders):
+    """Deduct recipe ingredients for ``orders`` (instances or ids) from stock.
+
+    Orders already consumed are skipped, so the call is idempotent. Stock is
+    changed with one ``UPDATE ... SET current_stock = current_stock - x`` per
+    ingredient. On PostgreSQL the orders and then the ingredients are locked in
+    primary key order first, so concurrent batches neither double-consume an
+    order nor deadlock on each other. Returns the applied demand vector.
+    """
+    claimed = Order.objects.filter(pk__in=_order_ids(orders), stock_consumed_at__isnull=True)
+    if connection.features.has_select_for_update:
+        claimed = claimed.select_for_update()
+    claimed = list(claimed.order_by('pk').values_list('pk', flat=True))
+    if not claimed:
+        return {}
+
+    demand = ingredient_demand(claimed)
+    if demand and connection.features.has_select_for_update:
+        list(
+            Ingredient.objects.select_for_update().filter(pk__in=demand)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+    for ingredient_id in sorted(demand):
+        Ingredient.objects.filter(pk=ingredient_id).update(
+            current_stock=F('current_stock') - demand[ingredient_id]
+        )
+    Order.objects.filter(pk__in=claimed).update(stock_consumed_at=timezone.now())
+    return demand
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+
+from .costing import forget_recipe_costs, products_using, recompute_costs
+from .models import Ingredient, ProductIngredient
+
+COST_FIELDS = {'cost_per_unit', 'unit'}
+
+
+def ingredient_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or COST_FIELDS & set(update_fields)):
+        recompute_costs(products_using([instance.pk]))
+
+
+def recipe_changed(sender, instance, **kwargs):
+    recompute_costs([instance.product_id])
+
+
+def recipe_deleted(sender, instance, **kwargs):
+    forget_recipe_costs([instance.product_id])
+    recompute_costs([instance.product_id])
+
+
+def connect_costing_signals():
+    # queryset.update()/bulk_create() bypass these; call inventory.costing.recompute_costs() after them.
+    post_save.connect(ingredient_saved, sender=Ingredient, dispatch_uid='costing-ingredient-save')
+    post_save.connect(recipe_changed, sender=ProductIngredient, dispatch_uid='costing-recipe-save')
+    post_delete.connect(recipe_deleted, sender=ProductIngredient, dispatch_uid='costing-recipe-delete')
@@ -1,3 +1,248 @@
-from django.test import TestCase
+import threading
+import time
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import OperationalError, connection
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APITestCase
+
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from .costing import recompute_costs
+from .models import Ingredient, ProductIngredient
+from .restock import needs_restock, plan_restock
+from .services import consume_orders, ingredient_demand
+
+
+def make_recipes():
+    category = Category.objects.create(name='Выпечка')
+    croissant = Product.objects.create(
+        name='Круассан', description='', category=category, price=Decimal('2.50'), cost=Decimal('1.00')
+    )
+    baguette = Product.objects.create(
+        name='Багет', description='', category=category, price=Decimal('1.20'), cost=Decimal('0.40')
+    )
+    flour = Ingredient.objects.create(
+        name='Мука', unit='g', current_stock=Decimal('10000.00'), min_stock=0,
+        max_stock=Decimal('20000.00'), cost_per_unit=Decimal('0.01')
+    )
+    butter = Ingredient.objects.create(
+        name='Масло', unit='g', current_stock=Decimal('5000.00'), min_stock=0,
+        max_stock=Decimal('8000.00'), cost_per_unit=Decimal('0.05')
+    )
+    ProductIngredient.objects.create(product=croissant, ingredient=flour, quantity=Decimal('60.00'))
+    ProductIngredient.objects.create(product=croissant, ingredient=butter, quantity=Decimal('25.50'))
+    ProductIngredient.objects.create(product=baguette, ingredient=flour, quantity=Decimal('250.00'))
+    return croissant, baguette, flour, butter
+
+
+def make_order(number, *lines):
+    order = Order.objects.create(order_number=number, status='completed', total_amount=0, final_amount=0)
+    for product, quantity in lines:
+        OrderItem.objects.create(
+            order=order, product=product, quantity=quantity,
+            unit_price=product.price, total_price=product.price * quantity
+        )
+    return order
+
+
+class IngredientConsumptionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.croissant, cls.baguette, cls.flour, cls.butter = make_recipes()
+        cls.orders = [
+            make_order('S1', (cls.croissant, 2), (cls.baguette, 1)),
+            make_order('S2', (cls.croissant, 4)),
+        ]
+
+    def test_demand_vector_is_aggregated_per_ingredient(self):
+        self.assertEqual(ingredient_demand([order.pk for order in self.orders]), {
+            self.flour.pk: Decimal('610.00'),
+            self.butter.pk: Decimal('153.00'),
+        })
+
+    def test_consumption_updates_once_per_ingredient_and_is_idempotent(self):
+        # savepoint, claim, demand, one UPDATE per ingredient, mark consumed, release
+        with self.assertNumQueries(7):
+            consume_orders(self.orders)
+        self.flour.refresh_from_db()
+        self.butter.refresh_from_db()
+        self.assertEqual(self.flour.current_stock, Decimal('9390.00'))
+        self.assertEqual(self.butter.current_stock, Decimal('4847.00'))
+
+        self.assertEqual(consume_orders(self.orders), {})
+        self.flour.refresh_from_db()
+        self.assertEqual(self.flour.current_stock, Decimal('9390.00'))
+        self.assertFalse(Order.objects.filter(stock_consumed_at__isnull=True).exists())
+
+
+class ConcurrentConsumptionTests(TransactionTestCase):
+    writers = 6
+    orders_per_writer = 10
+
+    def test_parallel_writers_neither_lose_nor_double_count(self):
+        croissant, baguette, flour, butter = make_recipes()
+        batches = [
+            [
+                make_order(f'W{writer}-{i}', (croissant, 1), (baguette, 1)).pk
+                for i in range(self.orders_per_writer)
+            ]
+            for writer in range(self.writers)
+        ]
+        # Every batch is submitted twice to race the idempotency check as well.
+        errors = []
+
+        def writer(order_ids):
+            try:
+                for _ in range(200):
+                    try:
+                        consume_orders(order_ids)
+                        return
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; retry.
+                        time.sleep(0.01)
+                errors.append('gave up')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer, args=(batch,)) for batch in batches + batches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        orders = self.writers * self.orders_per_writer
+        flour.refresh_from_db()
+        butter.refresh_from_db()
+        self.assertEqual(flour.current_stock, Decimal('10000.00') - orders * Decimal('310.00'))
+        self.assertEqual(butter.current_stock, Decimal('5000.00') - orders * Decimal('25.50'))
+
+
+
+class RestockPlanTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.croissant, cls.baguette, cls.flour, cls.butter = make_recipes()
+        Ingredient.objects.filter(pk=cls.butter.pk).update(current_stock=Decimal('100.00'), min_stock=Decimal('500.00'))
+        cls.sugar = Ingredient.objects.create(
+            name='Сахар', unit='kg', current_stock=Decimal('1.00'), min_stock=Decimal('2.00'),
+            max_stock=Decimal('10.00'), cost_per_unit=Decimal('3.00')
+        )
+        # 14 croissants and 7 baguettes over the usage window: flour 2590 g, butter 357 g.
+        make_order('R1', (cls.croissant, 14), (cls.baguette, 7))
+        cls.user = get_user_model().objects.create_user('storekeeper', password='secret')
+
+    def test_restock_filter_runs_in_database(self):
+        self.assertEqual(
+            sorted(needs_restock().values_list('name', 'reorder_quantity', 'reorder_cost')),
+            [('Масло', Decimal('7900.00'), Decimal('395.00')), ('Сахар', Decimal('9.00'), Decimal('27.00'))]
+        )
+        self.assertEqual(
+            {i.name for i in needs_restock()},
+            {i.name for i in Ingredient.objects.all() if i.needs_restock}
+        )
+
+    def test_plan_projects_days_until_stockout(self):
+        with self.assertNumQueries(2):
+            plan = plan_restock(days=14)
+        self.assertEqual([row['name'] for row in plan], ['Масло', 'Сахар'])
+        butter = plan[0]
+        self.assertEqual(butter['daily_usage'], Decimal('25.50'))
+        self.assertEqual(butter['days_until_stockout'], Decimal('3.9'))
+        self.assertIsNone(plan[1]['days_until_stockout'])
+
+        names = [row['name'] for row in plan_restock(days=14, horizon=60)]
+        self.assertEqual(names, ['Масло', 'Мука', 'Сахар'])
+
+    def test_endpoint(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/inventory/restock/', {'horizon': 60})
+        self.assertEqual(len(response.data['items']), 3)
+        self.assertEqual(response.data['total_reorder_cost'], Decimal('395.00') + Decimal('27.00') + Decimal('100.00'))
+        self.assertEqual(self.client.get('/api/inventory/restock/', {'days': 0}).status_code, 400)
+
+class ProductCostingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.croissant, cls.baguette, cls.flour, cls.butter = make_recipes()
+        cls.milk = Ingredient.objects.create(
+            name='Молоко', unit='l', current_stock=Decimal('20.00'), min_stock=0,
+            max_stock=Decimal('40.00'), cost_per_unit=Decimal('1.20')
+        )
+        cls.sugar = Ingredient.objects.create(
+            name='Сахар', unit='kg', current_stock=Decimal('5.00'), min_stock=0,
+            max_stock=Decimal('10.00'), cost_per_unit=Decimal('1.00')
+        )
+        cls.latte = Product.objects.create(
+            name='Латте', description='', category=cls.croissant.category,
+            price=Decimal('3.00'), cost=Decimal('0.50')
+        )
+        ProductIngredient.objects.create(product=cls.latte, ingredient=cls.milk, quantity=Decimal('150.00'), unit='ml')
+        ProductIngredient.objects.create(product=cls.latte, ingredient=cls.sugar, quantity=Decimal('20.00'), unit='g')
+        cls.user = get_user_model().objects.create_user('accountant')
+
+    def costs(self):
+        return dict(Product.objects.values_list('name', 'cost'))
+
+    def test_costs_and_margins_are_recomputed_in_bulk_with_unit_conversion(self):
+        Product.objects.update(cost=0, margin=0)
+        # savepoint, cost UPDATE, margin UPDATE, release
+        with self.assertNumQueries(4):
+            self.assertEqual(recompute_costs(), 3)
+        # 60 g flour + 25.5 g butter; 250 g flour; 150 ml milk + 20 g sugar
+        self.assertEqual(self.costs(), {'Круассан': Decimal('1.88'), 'Багет': Decimal('2.50'), 'Латте': Decimal('0.20')})
+        self.assertEqual(
+            dict(Product.objects.values_list('name', 'margin')),
+            {'Круассан': Decimal('0.62'), 'Багет': Decimal('-1.30'), 'Латте': Decimal('2.80')},
+        )
+
+    def test_price_changes_reprice_only_affected_products(self):
+        self.sugar.cost_per_unit = Decimal('6.00')
+        self.sugar.save()
+        self.assertEqual(self.costs()['Латте'], Decimal('0.30'))
+
+        Product.objects.filter(pk=self.croissant.pk).update(cost=Decimal('9.99'))
+        self.milk.cost_per_unit = Decimal('2.00')
+        self.milk.save()
+        self.assertEqual(self.costs(), {'Круассан': Decimal('9.99'), 'Багет': Decimal('2.50'), 'Латте': Decimal('0.42')})
+
+    def test_deleting_the_last_recipe_line_drops_the_recipe_cost(self):
+        ProductIngredient.objects.filter(product=self.latte, ingredient=self.sugar).delete()
+        self.assertEqual(self.costs()['Латте'], Decimal('0.18'))
+        ProductIngredient.objects.get(product=self.latte).delete()
+        latte = Product.objects.get(pk=self.latte.pk)
+        self.assertEqual((latte.cost, latte.margin), (Decimal('0.00'), latte.price))
+
+    def test_unconvertible_lines_are_rejected_and_keep_the_hand_entered_cost(self):
+        line = ProductIngredient(product=self.latte, ingredient=self.flour, quantity=Decimal('1.00'), unit='ml')
+        with self.assertRaises(ValidationError):
+            line.clean()
+        Product.objects.filter(pk=self.latte.pk).update(cost=Decimal('0.55'))
+        line.save()
+        self.assertEqual(self.costs()['Латте'], Decimal('0.55'))
+
+        with self.assertRaises(ValidationError) as raised:
+            ProductIngredient(product=self.latte, quantity=Decimal('1.00'), unit='ml').full_clean()
+        self.assertIn('ingredient', raised.exception.message_dict)
+
+    def test_consumption_is_counted_in_stock_units(self):
+        order = make_order('C1', (self.latte, 10))
+        self.assertEqual(ingredient_demand([order.pk]), {self.milk.pk: Decimal('1.50'), self.sugar.pk: Decimal('0.20')})
+
+    def test_margin_report(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/products/margins/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['name'], row['margin'], row['margin_percent']) for row in response.data['results']],
+            [('Багет', '-1.30', Decimal('-108.3')), ('Круассан', '0.62', Decimal('24.8'))],
+        )
+        rest = self.client.get(response.data['next'])
+        self.assertEqual([row['name'] for row in rest.data['results']], ['Латте'])
+
+        filtered = self.client.get('/api/products/margins/', {'ordering': '-margin', 'max_margin': '1.00'})
+        self.assertEqual([row['name'] for row in filtered.data['results']], ['Круассан', 'Багет'])
+        self.assertEqual(self.client.get('/api/products/margins/', {'ordering': 'cost'}).status_code, 400)
@@ -1,3 +1,16 @@
-from django.shortcuts import render
+from decimal import Decimal
 
-# Create your views here.
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .restock import plan_restock
+from .serializers import RestockParamsSerializer
+
+class RestockPlanView(APIView):
+    def get(self, request):
+        params = RestockParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        plan = plan_restock(**params.validated_data)
+        return Response({
+            'items': plan,
+            'total_reorder_cost': sum((row['reorder_cost'] for row in plan), Decimal('0')),
+        })
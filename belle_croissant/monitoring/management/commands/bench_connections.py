@@ -0,0 +1,57 @@
+import time
+
+from django.core import signals
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from customers.models import Customer
+
+
+class Command(BaseCommand):
+    help = 'Цена установки соединения: запросы с CONN_MAX_AGE=0 против постоянных соединений и health checks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--max-age', type=int, default=60)
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        connection = connections[alias]
+        self.stdout.write(f'{connection.vendor} ({connection.settings_dict.get("HOST") or connection.settings_dict["NAME"]})')
+        original = {key: connection.settings_dict[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        try:
+            for label, max_age, health_checks in [
+                ('новое соединение на запрос (CONN_MAX_AGE=0)', 0, False),
+                (f'постоянные соединения (CONN_MAX_AGE={options["max_age"]})', options['max_age'], False),
+                ('постоянные + CONN_HEALTH_CHECKS', options['max_age'], True),
+            ]:
+                connection.close()
+                connection.settings_dict.update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=health_checks)
+                connects, per_request = self.measure(alias, options['requests'])
+                self.stdout.write(f'{label}: {per_request:.3f} мс/запрос, соединений открыто {connects}')
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+
+    @staticmethod
+    def measure(alias, requests):
+        """Replay the handler's request_started/request_finished around one primary-key read."""
+        connects = []
+
+        def created(sender, connection, **kwargs):
+            if connection.alias == alias:
+                connects.append(connection)
+
+        connection_created.connect(created)
+        try:
+            start = time.perf_counter()
+            for pk in range(requests):
+                signals.request_started.send(sender=None)
+                Customer.objects.using(alias).filter(pk=pk).exists()
+                signals.request_finished.send(sender=None)
+            elapsed = time.perf_counter() - start
+        finally:
+            connection_created.disconnect(created)
+        return len(connects), elapsed / requests * 1000
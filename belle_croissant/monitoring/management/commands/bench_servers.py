@@ -0,0 +1,174 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from customers.models import Customer
+from customers.stats import apply_order_changes, order_state
+from orders.models import Order
+from products.models import Category, Product
+
+# (name, server, URL prefix of the read endpoints)
+SETUPS = [
+    ('WSGI (gunicorn gthread) + DRF', 'wsgi', '/api/'),
+    ('ASGI (uvicorn) + DRF', 'asgi', '/api/'),
+    ('ASGI (uvicorn) + async', 'asgi', '/api/async/'),
+]
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def read_response(reader):
+    status = await reader.readline()
+    if not status:
+        raise ConnectionError('connection closed')
+    length, chunked = None, False
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+    if chunked:
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    elif length:
+        await reader.readexactly(length)
+    return int(status.split()[1])
+
+
+class Command(BaseCommand):
+    help = 'Запросов в секунду на эндпоинтах чтения: WSGI против ASGI при N одновременных клиентах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--duration', type=float, default=15, help='секунд на конфигурацию')
+        parser.add_argument('--threads', type=int, default=32, help='потоков gunicorn')
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--port', type=int, default=8766)
+
+    def handle(self, *args, **options):
+        for module in ('uvicorn', 'gunicorn'):
+            try:
+                __import__(module)
+            except ImportError:
+                raise CommandError(f'Для сравнения нужен {module}: pip install {module}')
+
+        user = get_user_model().objects.create_user(f'bench-servers-{os.getpid()}')
+        client = Client()
+        client.force_login(user)
+        prefix = f'BS{int(time.time())}-'
+        customer_ids, category = self.seed(prefix, options['customers'])
+        try:
+            for name, interface, api in SETUPS:
+                result = self.measure(interface, api, client.cookies['sessionid'].value, customer_ids, options)
+                self.stdout.write(f'{name}: {result}')
+        finally:
+            Order.objects.filter(order_number__startswith=prefix).delete()
+            Customer.objects.filter(pk__in=customer_ids).delete()
+            Product.objects.filter(category=category).delete()
+            category.delete()
+            client.logout()
+            user.delete()
+
+    def seed(self, prefix, count):
+        rng = random.Random(42)
+        category = Category.objects.create(name=f'{prefix}category')
+        Product.objects.bulk_create([
+            Product(name=f'{prefix}{i}', description='', category=category, price=Decimal('3.00'), cost=Decimal('1.00'))
+            for i in range(50)
+        ])
+        customers = Customer.objects.bulk_create([
+            Customer(first_name='Bench', last_name=f'{i}', email=f'{prefix}{i}@example.com', phone=f'+7701{i:07d}')
+            for i in range(count)
+        ])
+        orders = Order.objects.bulk_create([
+            Order(order_number=f'{prefix}{customer.pk}-{n}', customer=customer,
+                  status=rng.choice(['completed', 'completed', 'pending', 'cancelled']),
+                  total_amount=Decimal('10.00'), final_amount=Decimal('10.00'))
+            for customer in customers
+            for n in range(10)
+        ], batch_size=1000)
+        apply_order_changes((None, order_state(order)) for order in orders)
+        return [customer.pk for customer in customers], category
+
+    def measure(self, interface, api, session_key, customer_ids, options):
+        port = options['port']
+        if interface == 'wsgi':
+            command = ['gunicorn', 'belle_croissant.wsgi:application', '--worker-class', 'gthread',
+                       '--workers', '1', '--threads', str(options['threads']), '--bind', f'127.0.0.1:{port}',
+                       '--backlog', '2048', '--log-level', 'warning']
+        else:
+            command = ['uvicorn', 'belle_croissant.asgi:application', '--port', str(port),
+                       '--backlog', '2048', '--log-level', 'warning']
+        server = subprocess.Popen(
+            [sys.executable, '-m', *command], cwd=settings.BASE_DIR,
+            env={**os.environ, 'DEBUG': 'False', 'PERF_METRICS_ENABLED': 'False'},
+        )
+        try:
+            return asyncio.run(self.load(api, session_key, customer_ids, options))
+        finally:
+            server.terminate()
+            server.wait()
+
+    async def load(self, api, session_key, customer_ids, options):
+        port = options['port']
+        for _ in range(500):
+            try:
+                _, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.close()
+                break
+            except OSError:
+                await asyncio.sleep(0.02)
+        else:
+            raise CommandError('сервер не запустился')
+
+        rng = random.Random(7)
+        paths = [
+            lambda: f'{api}customers/',
+            lambda: f'{api}customers/{rng.choice(customer_ids)}/',
+            lambda: f'{api}customers/{rng.choice(customer_ids)}/orders/?include=status,orders',
+            lambda: f'{api}orders/',
+            lambda: f'{api}products/',
+        ]
+        latencies, errors = [], []
+        warmup_until = time.perf_counter() + 2
+        deadline = warmup_until + options['duration']
+
+        async def client():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                while (now := time.perf_counter()) < deadline:
+                    writer.write((
+                        f'GET {rng.choice(paths)()} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                        f'Cookie: sessionid={session_key}\r\n\r\n'
+                    ).encode())
+                    status = await read_response(reader)
+                    if now >= warmup_until:
+                        latencies.append(time.perf_counter() - now)
+                        if status != 200:
+                            errors.append(status)
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                errors.append(type(exc).__name__)
+            finally:
+                writer.close()
+
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        return (
+            f'{len(latencies) / options["duration"]:.0f} запросов/с, '
+            f'p50 {percentile(latencies, 0.5) * 1000:.0f} мс, p95 {percentile(latencies, 0.95) * 1000:.0f} мс, '
+            f'ошибок {len(errors)}'
+        )
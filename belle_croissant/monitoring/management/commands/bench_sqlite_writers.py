@@ -0,0 +1,122 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from belle_croissant.sqlite import atomic_write
+from customers.models import Customer
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = 'Одновременные кассиры на SQLite: продажи в секунду и ошибки "database is locked" до и после настройки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10, help='секунд на режим')
+        parser.add_argument('--items', type=int, default=3, help='позиций в чеке')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Сравнение имеет смысл только для SQLite')
+        if not settings.SQLITE_PRAGMAS:
+            raise CommandError('SQLITE_TUNING выключен: нечего сравнивать')
+        modes = [
+            ('как поставлялось: журнал отката, отложенный BEGIN', {}, False),
+            ('PRAGMA (WAL, synchronous=NORMAL, ...), отложенный BEGIN', settings.SQLITE_PRAGMAS, False),
+            ('PRAGMA + BEGIN IMMEDIATE', settings.SQLITE_PRAGMAS, True),
+        ]
+        # Every mode gets a fresh database file so WAL (persistent in the file) does not leak into the baseline.
+        database = connections.settings['default']
+        original_name = database['NAME']
+        try:
+            for label, pragmas, immediate in modes:
+                with tempfile.TemporaryDirectory() as directory, \
+                        override_settings(SQLITE_PRAGMAS=pragmas, SQLITE_IMMEDIATE_TRANSACTIONS=immediate):
+                    connection.close()
+                    database['NAME'] = os.path.join(directory, 'bench.sqlite3')
+                    call_command('migrate', verbosity=0)
+                    result = self.run_writers(options)
+                    connection.close()
+                self.stdout.write(f'{label}: {result}')
+        finally:
+            database['NAME'] = original_name
+
+    def run_writers(self, options):
+        category = Category.objects.create(name='Bench')
+        product_ids = [product.pk for product in Product.objects.bulk_create([
+            Product(name=f'P{i}', description='', category=category, price=Decimal('2.50'), cost=Decimal('1.00'))
+            for i in range(50)
+        ])]
+        customer_ids = [customer.pk for customer in Customer.objects.bulk_create([
+            Customer(first_name='Bench', last_name=f'{i}', email=f'bench{i}@example.com', phone=f'+7701{i:07d}')
+            for i in range(200)
+        ])]
+        connection.close()
+
+        latencies, locked = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def cashier(number):
+            rng = random.Random(number)
+            done, errors, sale = [], 0, 0
+            try:
+                while time.perf_counter() < deadline:
+                    sale += 1
+                    start = time.perf_counter()
+                    try:
+                        with atomic_write():
+                            # Read first, write later: the pattern that makes deferred transactions fail.
+                            prices = dict(
+                                Product.objects.filter(pk__in=rng.sample(product_ids, options['items']))
+                                .values_list('pk', 'price')
+                            )
+                            total = sum(prices.values())
+                            order = Order(
+                                order_number=f'B{number}-{sale}', customer_id=rng.choice(customer_ids),
+                                status='completed', total_amount=total, final_amount=total,
+                            )
+                            order.save()
+                            OrderItem.objects.bulk_create([
+                                OrderItem(order=order, product_id=pk, quantity=1, unit_price=price, total_price=price)
+                                for pk, price in prices.items()
+                            ])
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        errors += 1
+                        continue
+                    done.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(done)
+                    locked.append(errors)
+
+        threads = [threading.Thread(target=cashier, args=(number,)) for number in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if not latencies:
+            return f'ни одной продажи, ошибок блокировки {sum(locked)}'
+        return (
+            f'{len(latencies) / options["duration"]:.0f} продаж/с, ошибок блокировки {sum(locked)}, '
+            f'p50 {percentile(latencies, 0.5) * 1000:.1f} мс, p95 {percentile(latencies, 0.95) * 1000:.1f} мс'
+        )
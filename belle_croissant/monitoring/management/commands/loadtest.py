@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict, deque
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils.crypto import get_random_string
+
+from customers.models import Customer
+from monitoring.management.commands.bench_servers import percentile, read_response
+from orders.models import Order
+from orders.numbering import allocate_order_numbers
+from products.models import Product
+
+# (operation, weight): roughly a shop day seen by the API; reads dominate, checkouts and the kitchen write.
+WORKLOAD = [
+    ('catalog', 15),
+    ('product_list', 10),
+    ('product_detail', 10),
+    ('customer_detail', 8),
+    ('customer_orders', 8),
+    ('customer_search', 5),
+    ('order_list', 10),
+    ('sales_daily', 3),
+    ('sales_products', 3),
+    ('margins', 2),
+    ('restock', 1),
+    ('create_order', 10),
+    ('transition', 10),
+]
+STEPS = ['preparing', 'ready', 'completed']
+
+
+class Command(BaseCommand):
+    help = (
+        'Смешанная нагрузка на API локального сервера (каталог, клиенты, заказы, отчёты, оформление и '
+        'смена статусов): запросов в секунду и перцентили задержки по операциям. Данные: seed_data'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='адрес запущенного сервера')
+        parser.add_argument('--serve', choices=['wsgi', 'asgi'],
+                            help='запустить gunicorn (wsgi) или uvicorn (asgi) на порту из --url')
+        parser.add_argument('--threads', type=int, default=32, help='потоков gunicorn для --serve wsgi')
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=30, help='секунд измерения')
+        parser.add_argument('--warmup', type=float, default=3, help='секунд прогрева, не попадают в отчёт')
+        parser.add_argument('--transition-orders', type=int, default=2000,
+                            help='заказов в статусе pending для смены статусов')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        address = urlsplit(options['url'])
+        if address.scheme != 'http' or not address.hostname:
+            raise CommandError('--url: нужен адрес вида http://host:port')
+        products = list(Product.objects.filter(is_available=True).values_list('pk', flat=True))
+        customers = list(Customer.objects.values_list('pk', 'last_name'))
+        if not products or not customers:
+            raise CommandError('Нет продуктов или клиентов: сначала manage.py seed_data')
+
+        marker = f'loadtest-{os.getpid()}-{int(time.time())}'
+        user = get_user_model().objects.create_user(marker)
+        client = Client()
+        client.force_login(user)
+        pending = Order.objects.bulk_create([
+            Order(order_number=number, status='pending', notes=marker,
+                  total_amount=Decimal('0.00'), final_amount=Decimal('0.00'))
+            for number in allocate_order_numbers(options['transition_orders'])
+        ])
+        server = self.serve(address, options) if options['serve'] else None
+        try:
+            stats, elapsed = asyncio.run(self.run(
+                address, client.cookies['sessionid'].value, marker, products, customers,
+                [order.pk for order in pending], options,
+            ))
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+            Order.objects.filter(notes=marker).delete()
+            client.logout()
+            user.delete()
+        self.report(stats, elapsed)
+
+    def serve(self, address, options):
+        port = str(address.port or 80)
+        if options['serve'] == 'wsgi':
+            command = ['gunicorn', 'belle_croissant.wsgi:application', '--worker-class', 'gthread',
+                       '--workers', '1', '--threads', str(options['threads']), '--bind', f'{address.hostname}:{port}',
+                       '--backlog', '2048', '--log-level', 'warning']
+        else:
+            command = ['uvicorn', 'belle_croissant.asgi:application', '--host', address.hostname, '--port', port,
+                       '--backlog', '2048', '--log-level', 'warning']
+        try:
+            __import__(command[0])
+        except ImportError:
+            raise CommandError(f'Для --serve {options["serve"]} нужен {command[0]}: pip install {command[0]}')
+        return subprocess.Popen(
+            [sys.executable, '-m', *command], cwd=settings.BASE_DIR,
+            env={**os.environ, 'DEBUG': 'False', 'PERF_METRICS_ENABLED': 'False'},
+        )
+
+    async def run(self, address, session_key, marker, products, customers, pending, options):
+        host, port = address.hostname, address.port or 80
+        for _ in range(500):
+            try:
+                _, writer = await asyncio.open_connection(host, port)
+                writer.close()
+                break
+            except OSError:
+                await asyncio.sleep(0.02)
+        else:
+            raise CommandError(f'Сервер {options["url"]} не отвечает')
+
+        # Session auth with a matching CSRF cookie/header pair, as the browser front end sends it.
+        csrf_token = get_random_string(32)
+        cookie = f'sessionid={session_key}; csrftoken={csrf_token}'
+        # Each pending order goes through STEPS in turn; an order is out of the queue while its request runs.
+        transitions = deque((pk, 0) for pk in pending)
+        operations, weights = zip(*WORKLOAD)
+
+        def build(operation, rng):
+            if operation == 'transition' and not transitions:
+                operation = 'order_list'
+            customer_id, last_name = rng.choice(customers)
+            if operation == 'catalog':
+                return operation, 'GET', '/api/catalog/', None
+            if operation == 'product_list':
+                return operation, 'GET', f'/api/products/?page={rng.randint(1, 5)}', None
+            if operation == 'product_detail':
+                return operation, 'GET', f'/api/products/{rng.choice(products)}/', None
+            if operation == 'customer_detail':
+                return operation, 'GET', f'/api/customers/{customer_id}/', None
+            if operation == 'customer_orders':
+                return operation, 'GET', f'/api/customers/{customer_id}/orders/?include=status,orders', None
+            if operation == 'customer_search':
+                return operation, 'GET', f'/api/customers/search/?q={last_name[:4]}', None
+            if operation == 'order_list':
+                return operation, 'GET', '/api/orders/', None
+            if operation == 'sales_daily':
+                return operation, 'GET', '/api/analytics/sales/daily/', None
+            if operation == 'sales_products':
+                return operation, 'GET', '/api/analytics/sales/products/', None
+            if operation == 'margins':
+                return operation, 'GET', '/api/products/margins/?ordering=margin', None
+            if operation == 'restock':
+                return operation, 'GET', '/api/inventory/restock/', None
+            if operation == 'create_order':
+                order = {
+                    'customer': customer_id if rng.random() < 0.5 else None, 'status': 'pending', 'notes': marker,
+                    'items': [
+                        {'product': product, 'quantity': rng.randint(1, 3)}
+                        for product in rng.sample(products, min(len(products), rng.randint(1, 4)))
+                    ],
+                }
+                return operation, 'POST', '/api/orders/bulk/', {'orders': [order]}
+            pk, step = transitions.popleft()
+            return (operation, (pk, step)), 'POST', f'/api/orders/{pk}/transition/', {'status': STEPS[step]}
+
+        stats = defaultdict(lambda: {'latencies': [], 'errors': defaultdict(int)})
+        start = time.perf_counter()
+        measure_from = start + options['warmup']
+        deadline = measure_from + options['duration']
+
+        async def session(index):
+            rng = random.Random(options['seed'] * 100003 + index)
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                while (now := time.perf_counter()) < deadline:
+                    operation, method, path, body = build(rng.choices(operations, weights)[0], rng)
+                    request = f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nCookie: {cookie}\r\n'
+                    if body is not None:
+                        payload = json.dumps(body).encode()
+                        request += (
+                            f'Content-Type: application/json\r\nX-CSRFToken: {csrf_token}\r\n'
+                            f'Content-Length: {len(payload)}\r\n'
+                        )
+                    writer.write(request.encode() + b'\r\n' + (payload if body is not None else b''))
+                    status = await read_response(reader)
+                    if isinstance(operation, tuple):
+                        operation, (pk, step) = operation
+                        if status == 200 and step + 1 < len(STEPS):
+                            transitions.append((pk, step + 1))
+                    if now >= measure_from:
+                        stats[operation]['latencies'].append(time.perf_counter() - now)
+                        if status >= 400:
+                            stats[operation]['errors'][status] += 1
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                stats['connection']['errors'][type(exc).__name__] += 1
+            finally:
+                writer.close()
+
+        await asyncio.gather(*(session(i) for i in range(options['clients'])))
+        return stats, min(time.perf_counter(), deadline) - measure_from
+
+    def report(self, stats, elapsed):
+        total = sum(len(row['latencies']) for row in stats.values())
+        errors = sum(sum(row['errors'].values()) for row in stats.values())
+        every = [latency for row in stats.values() for latency in row['latencies']]
+        if not every:
+            raise CommandError('Ни один запрос не завершился за время измерения')
+        self.stdout.write(
+            f'всего: {total / elapsed:.0f} запросов/с, p50 {percentile(every, 0.5) * 1000:.1f} мс, '
+            f'p95 {percentile(every, 0.95) * 1000:.1f} мс, p99 {percentile(every, 0.99) * 1000:.1f} мс, '
+            f'ошибок {errors}'
+        )
+        for operation, _ in WORKLOAD + [('connection', 0)]:
+            row = stats.get(operation)
+            if not row:
+                continue
+            latencies = row['latencies']
+            line = f'  {operation}: {len(latencies)}'
+            if latencies:
+                line += (
+                    f', {len(latencies) / elapsed:.1f}/с, p50 {percentile(latencies, 0.5) * 1000:.1f} мс, '
+                    f'p95 {percentile(latencies, 0.95) * 1000:.1f} мс, p99 {percentile(latencies, 0.99) * 1000:.1f} мс'
+                )
+            if row['errors']:
+                line += ', ошибки ' + ', '.join(f'{code}: {count}' for code, count in sorted(row['errors'].items(), key=str))
+            self.stdout.write(line)
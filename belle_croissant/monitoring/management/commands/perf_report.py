@@ -0,0 +1,67 @@
+import base64
+import json
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.metrics import load_snapshots, merge_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Самые медленные эндпоинты и повторяющиеся запросы по собранным метрикам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='адрес /api/_metrics работающего сервера')
+        parser.add_argument('--user', help='логин администратора для --url (Basic auth)')
+        parser.add_argument('--password', default='')
+        parser.add_argument('--snapshot-dir', default=settings.PERF_METRICS_SNAPSHOT_DIR,
+                            help='каталог снимков воркеров (PERF_METRICS_SNAPSHOT_DIR)')
+        parser.add_argument('--sort', choices=['p95', 'p99', 'p50', 'db', 'queries'], default='p95')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--duplicates', type=int, default=3, help='повторов на эндпоинт')
+
+    def handle(self, *args, **options):
+        routes = self.load(options)
+        if not routes:
+            self.stdout.write('Метрик пока нет.')
+            return
+
+        def sort_key(item):
+            data = item[1]
+            if options['sort'] == 'db':
+                return data['db_ms']['p95'] or 0
+            if options['sort'] == 'queries':
+                return data['queries']['p95'] or 0
+            return data['latency_ms'][options['sort']] or 0
+
+        ranked = sorted(routes.items(), key=sort_key, reverse=True)[:options['limit']]
+        self.stdout.write(
+            f"{'endpoint':<44} {'req':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'db p95':>7} {'ser p95':>7} "
+            f"{'q p95':>6} {'avg KB':>7}"
+        )
+        for route, data in ranked:
+            latency = data['latency_ms']
+            size = (data['avg_response_bytes'] or 0) / 1024
+            self.stdout.write(
+                f"{route[:44]:<44} {data['requests']:>6} {latency['p50']:>7g} {latency['p95']:>7g} "
+                f"{latency['p99']:>7g} {data['db_ms']['p95']:>7g} {(data.get('serialize_ms') or {}).get('p95') or 0:>7g} "
+                f"{data['queries']['p95']:>6g} {size:>7.1f}"
+            )
+            for sql, extra in list(data['duplicate_queries'].items())[:options['duplicates']]:
+                self.stdout.write(f'    x{extra:<6} {sql[:140]}')
+
+    def load(self, options):
+        if options['url']:
+            request = urllib.request.Request(options['url'], headers={'Accept': 'application/json'})
+            if options['user']:
+                token = base64.b64encode(f"{options['user']}:{options['password']}".encode()).decode()
+                request.add_header('Authorization', f'Basic {token}')
+            try:
+                with urllib.request.urlopen(request) as response:
+                    return json.load(response)['routes']
+            except OSError as exc:
+                raise CommandError(f'Не удалось получить метрики: {exc}')
+        if not options['snapshot_dir']:
+            raise CommandError('Укажите --url или --snapshot-dir (PERF_METRICS_SNAPSHOT_DIR).')
+        return merge_snapshots(load_snapshots(options['snapshot_dir']))
@@ -0,0 +1,367 @@
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as day_time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max
+from django.utils import timezone
+
+from analytics.rollups import rebuild_rollups
+from belle_croissant.sqlite import atomic_write
+from customers.loyalty import run_loyalty
+from customers.models import Customer, LoyaltyProgram
+from customers.stats import rebuild_customer_stats
+from inventory.costing import recompute_costs
+from inventory.models import Ingredient, ProductIngredient
+from orders.models import Order, OrderItem
+from orders.numbering import format_order_number
+from products.catalog import bump_catalog_version
+from products.models import Category, Product
+
+# Per unit of --scale; --scale 100 is 200k customers, 3.3M orders and about 10M order items.
+CUSTOMERS_PER_SCALE = 2000
+ITEMS_PER_SCALE = 100000
+PRODUCTS_PER_SCALE = 10
+BASE_PRODUCTS = 50
+ITEMS_PER_ORDER = 3
+# Picks per order; repeat picks of a popular product merge into one line, leaving about ITEMS_PER_ORDER.
+PICKS_PER_ORDER = 3.25
+BATCH_SIZE = 2000
+
+SEED_STORE = 'SEED'
+SEED_EMAIL_DOMAIN = 'seed.belle-croissant.test'
+
+# Popularity of the n-th most popular product (and of regular customers) falls as 1 / n ** exponent.
+PRODUCT_POPULARITY_EXPONENT = 1.1
+CUSTOMER_LOYALTY_EXPONENT = 0.8
+CUSTOMER_ORDER_SHARE = 0.55
+CANCELLED_SHARE = 0.04
+# Morning, lunch and evening rushes: (hour, spread in hours, share of the day's orders).
+PEAKS = [(8.5, 0.9, 0.45), (13.0, 1.0, 0.35), (18.0, 1.3, 0.20)]
+OPENING_HOURS = (7, 21)
+WEEKDAY_TRAFFIC = [0.9, 0.9, 0.95, 1.0, 1.1, 1.35, 1.2]
+YEARLY_GROWTH = 0.2
+ORDER_TYPES = [('in_store', 0.7), ('online', 0.2), ('delivery', 0.1)]
+QUANTITIES = [(1, 0.62), (2, 0.2), (3, 0.09), (4, 0.05), (6, 0.04)]
+CUSTOMER_TYPES = [('regular', 0.7), ('loyalty', 0.25), ('corporate', 0.05)]
+DISCOUNTS = {'loyalty': Decimal('0.05'), 'corporate': Decimal('0.10')}
+
+# (category, product name prefix)
+CATEGORIES = [
+    ('Круассаны', 'Круассан'), ('Хлеб', 'Хлеб'), ('Пирожные', 'Пирожное'), ('Торты', 'Торт'),
+    ('Печенье', 'Печенье'), ('Сэндвичи', 'Сэндвич'), ('Кофе', 'Кофе'), ('Чай и напитки', 'Напиток'),
+]
+FLAVOURS = [
+    'классика', 'миндаль', 'шоколад', 'ваниль', 'ягоды', 'карамель', 'орех', 'фисташка',
+    'лимон', 'мёд', 'сыр', 'злаки', 'рожь', 'пряности', 'малина',
+]
+# (name, stock unit, recipe line unit, line quantity range, cost per stock unit range)
+INGREDIENTS = [
+    ('Мука пшеничная', 'kg', 'g', (40, 250), (0.6, 1.2)),
+    ('Мука ржаная', 'kg', 'g', (40, 200), (0.7, 1.3)),
+    ('Масло сливочное', 'kg', 'g', (10, 120), (7.0, 11.0)),
+    ('Сахар', 'kg', 'g', (5, 80), (0.8, 1.4)),
+    ('Яйца', 'pcs', '', (1, 3), (0.15, 0.3)),
+    ('Молоко', 'l', 'ml', (20, 250), (0.9, 1.5)),
+    ('Сливки', 'l', 'ml', (10, 120), (3.0, 5.0)),
+    ('Дрожжи', 'kg', 'g', (1, 8), (4.0, 8.0)),
+    ('Соль', 'kg', 'g', (1, 5), (0.3, 0.6)),
+    ('Шоколад', 'kg', 'g', (10, 60), (9.0, 15.0)),
+    ('Миндаль', 'kg', 'g', (5, 40), (12.0, 18.0)),
+    ('Ягоды', 'kg', 'g', (10, 80), (6.0, 12.0)),
+    ('Сыр', 'kg', 'g', (15, 60), (8.0, 14.0)),
+    ('Ваниль', 'kg', 'g', (1, 3), (80.0, 200.0)),
+    ('Кофе в зёрнах', 'kg', 'g', (7, 18), (18.0, 30.0)),
+    ('Чай', 'kg', 'g', (2, 6), (15.0, 40.0)),
+    ('Мёд', 'kg', 'g', (5, 30), (6.0, 10.0)),
+    ('Орехи', 'kg', 'g', (5, 40), (10.0, 16.0)),
+]
+MALE_NAMES = ['Иван', 'Алексей', 'Дмитрий', 'Сергей', 'Павел', 'Михаил', 'Андрей', 'Никита', 'Артём']
+FEMALE_NAMES = ['Анна', 'Мария', 'Елена', 'Ольга', 'Дарья', 'Софья', 'Наталья', 'Екатерина', 'Ирина']
+LAST_NAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+              'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов', 'Егоров']
+
+_plan = None
+
+
+# auto_now/auto_now_add fields that get their values from the generated history.
+HISTORICAL_FIELDS = [
+    (Order, 'created_at'), (Order, 'updated_at'), (Customer, 'registration_date'), (LoyaltyProgram, 'joined_date'),
+]
+
+
+@contextmanager
+def historical_timestamps():
+    """Let ``bulk_create`` keep the given values of ``HISTORICAL_FIELDS`` instead of the current time."""
+    fields = [model._meta.get_field(name) for model, name in HISTORICAL_FIELDS]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def zipf_cdf(count, exponent, rng):
+    """Cumulative popularity of ``count`` items whose ranks are shuffled by ``rng``."""
+    weights = 1 / np.arange(1, count + 1) ** exponent
+    return np.cumsum(rng.permutation(weights / weights.sum()))
+
+
+def sample(cdf, rng, size):
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side='right'), len(cdf) - 1)
+
+
+def choices(options, rng, size):
+    values, weights = zip(*options)
+    return np.array(values)[rng.choice(len(values), size, p=weights)]
+
+
+def orders_per_day(total, first_day, days):
+    weekdays = (first_day.weekday() + np.arange(days)) % 7
+    weights = np.array(WEEKDAY_TRAFFIC)[weekdays] * (1 + YEARLY_GROWTH * np.arange(days) / 365)
+    bounds = np.floor(total * np.cumsum(weights) / weights.sum()).astype(np.int64)
+    return np.diff(bounds, prepend=0)
+
+
+def order_times(rng, count):
+    """Seconds after opening of ``count`` orders, sorted, clustered around ``PEAKS``."""
+    hours, spreads, shares = (np.array(column) for column in zip(*PEAKS))
+    peak = rng.choice(len(PEAKS), count, p=shares)
+    seconds = rng.normal(hours[peak], spreads[peak]) * 3600
+    opens, closes = (hour * 3600 for hour in OPENING_HOURS)
+    outside = (seconds < opens) | (seconds >= closes)
+    seconds[outside] = rng.uniform(opens, closes, outside.sum())
+    return np.sort(seconds) - opens
+
+
+def seed_day(day_index):
+    """Generate and insert the orders and items of one day; deterministic for a given seed and day."""
+    plan = _plan
+    rng = np.random.default_rng([plan['seed'], day_index])
+    day = plan['first_day'] + timedelta(days=day_index)
+    count = int(plan['orders'][day_index])
+    first_pk = plan['first_pk'] + int(plan['orders'][:day_index].sum())
+    # Clocks change at night, so every order of the day shares the UTC offset of the opening hour.
+    opening = timezone.make_aware(datetime.combine(day, day_time(OPENING_HOURS[0])))
+    products, product_count = plan['products'], len(plan['products'])
+
+    # Items: Zipf-popular products, merged when an order picks the same product twice.
+    lines = 1 + rng.poisson(PICKS_PER_ORDER - 1, count)
+    keys = np.repeat(np.arange(count), lines) * product_count + sample(plan['product_cdf'], rng, int(lines.sum()))
+    keys, position = np.unique(keys, return_inverse=True)
+    quantities = np.bincount(position, weights=choices(QUANTITIES, rng, len(position))).astype(np.int64)
+    item_orders, item_products = keys // product_count, keys % product_count
+    line_cents = quantities * plan['price_cents'][item_products]
+    order_cents = np.bincount(item_orders, weights=line_cents, minlength=count).astype(np.int64)
+
+    customers = np.where(
+        rng.random(count) < CUSTOMER_ORDER_SHARE, sample(plan['customer_cdf'], rng, count), -1
+    )
+    created = order_times(rng, count)
+    preparation = rng.integers(3, 25, count) * 60
+    cancelled = rng.random(count) < CANCELLED_SHARE
+    order_types = choices(ORDER_TYPES, rng, count)
+
+    orders = []
+    for i in range(count):
+        created_at = opening + timedelta(seconds=float(created[i]))
+        finished_at = created_at + timedelta(seconds=int(preparation[i]))
+        customer = int(customers[i])
+        total = Decimal(int(order_cents[i])) / 100
+        discount = Decimal('0')
+        if customer >= 0 and plan['customer_types'][customer] in DISCOUNTS:
+            discount = (total * DISCOUNTS[plan['customer_types'][customer]]).quantize(Decimal('0.01'))
+        orders.append(Order(
+            id=first_pk + i, order_number=format_order_number(SEED_STORE, day, i + 1),
+            customer_id=plan['customer_ids'][customer] if customer >= 0 else None,
+            order_type=str(order_types[i]), status='cancelled' if cancelled[i] else 'completed',
+            total_amount=total, discount_amount=discount, final_amount=total - discount,
+            created_at=created_at, updated_at=finished_at,
+            completed_at=None if cancelled[i] else finished_at,
+            # History: its ingredients are long gone, inventory.services must not consume them again.
+            stock_consumed_at=None if cancelled[i] else finished_at,
+        ))
+    items = [
+        OrderItem(
+            order_id=first_pk + int(order), product_id=products[product], quantity=int(quantity),
+            unit_price=plan['prices'][product], total_price=Decimal(int(cents)) / 100,
+        )
+        for order, product, quantity, cents in zip(
+            item_orders.tolist(), item_products.tolist(), quantities.tolist(), line_cents.tolist()
+        )
+    ]
+    # A transaction per batch: bulk_create builds its SQL before the INSERT takes SQLite's
+    # single write lock, so workers build in parallel and only queue for the inserts.
+    for model, objects in ((Order, orders), (OrderItem, items)):
+        for start in range(0, len(objects), BATCH_SIZE):
+            model.objects.bulk_create(objects[start:start + BATCH_SIZE])
+    return len(orders), len(items)
+
+
+def start_worker(plan):
+    global _plan
+    _plan = plan
+
+
+class Command(BaseCommand):
+    help = (
+        'Синтетические данные для нагрузочных тестов: клиенты, каталог с рецептами и история заказов '
+        '(--scale 1 = 100 тыс. позиций заказов), одинаковые при одинаковом --seed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1)
+        parser.add_argument('--days', type=int, default=365, help='дней истории заказов, до вчерашнего')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='процессов, генерирующих заказы')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='не пересчитывать себестоимость, статистику клиентов, сводки и баллы')
+
+    def handle(self, *args, **options):
+        if options['scale'] < 1 or options['days'] < 1:
+            raise CommandError('--scale и --days должны быть положительными')
+        if Customer.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').exists():
+            raise CommandError('Данные seed_data уже есть в базе; сгенерируйте их в пустой базе')
+        rng = np.random.default_rng(options['seed'])
+        first_day = timezone.localdate() - timedelta(days=options['days'])
+
+        start = time.perf_counter()
+        with historical_timestamps():
+            products = self.seed_catalog(rng, options['scale'])
+            customers = self.seed_customers(rng, options['scale'], first_day)
+        self.stdout.write(
+            f'каталог и клиенты: {len(products)} продуктов, {len(customers)} клиентов '
+            f'за {time.perf_counter() - start:.1f} с'
+        )
+
+        plan = self.plan(rng, options, first_day, products, customers)
+        start = time.perf_counter()
+        with historical_timestamps():
+            orders, items = self.seed_orders(plan, options['days'], options['workers'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'заказы: {orders} заказов, {items} позиций за {elapsed:.1f} с ({items / elapsed:.0f} позиций/с)'
+        )
+        if connection.vendor == 'postgresql':
+            # Order ids were given explicitly, so the sequence still points at the first of them.
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Order]):
+                    cursor.execute(sql)
+
+        if not options['skip_derived']:
+            self.rebuild_derived()
+        bump_catalog_version()
+
+    def seed_catalog(self, rng, scale):
+        with atomic_write():
+            categories = Category.objects.bulk_create([Category(name=name) for name, _ in CATEGORIES])
+            count = BASE_PRODUCTS + PRODUCTS_PER_SCALE * scale
+            prices = np.round(np.clip(rng.lognormal(1.2, 0.5, count), 0.8, 25), 1)
+            products = []
+            for i in range(count):
+                category = i % len(CATEGORIES)
+                flavour = FLAVOURS[i // len(CATEGORIES) % len(FLAVOURS)]
+                price = Decimal(f'{prices[i]:.2f}')
+                cost = Decimal(f'{prices[i] * 0.35:.2f}')
+                products.append(Product(
+                    name=f'{CATEGORIES[category][1]} «{flavour}» №{i + 1}', description='Сгенерировано seed_data',
+                    category=categories[category], price=price, cost=cost, margin=price - cost,
+                    is_available=bool(rng.random() > 0.05), preparation_time=int(rng.integers(2, 30)),
+                ))
+            products = Product.objects.bulk_create(products, batch_size=BATCH_SIZE)
+            ingredients = Ingredient.objects.bulk_create([
+                Ingredient(
+                    name=name, unit=unit, current_stock=Decimal(int(rng.integers(20, 500))),
+                    min_stock=Decimal('10'), max_stock=Decimal('500'),
+                    cost_per_unit=Decimal(f'{rng.uniform(*cost):.2f}'),
+                )
+                for name, unit, _, _, cost in INGREDIENTS
+            ])
+            ProductIngredient.objects.bulk_create([
+                ProductIngredient(
+                    product=product, ingredient=ingredients[j], unit=INGREDIENTS[j][2],
+                    quantity=Decimal(int(rng.integers(*INGREDIENTS[j][3], endpoint=True))),
+                )
+                for product in products
+                for j in rng.choice(len(INGREDIENTS), int(rng.integers(3, 8)), replace=False).tolist()
+            ], batch_size=BATCH_SIZE)
+        return products
+
+    def seed_customers(self, rng, scale, first_day):
+        tz = timezone.get_current_timezone()
+        # A third registered before the order history starts, the rest during it.
+        span = (timezone.localdate() - first_day).days * 1.5
+        first = datetime.combine(first_day, day_time.min) - timedelta(days=span / 3)
+        customers, programs = [], []
+        count = CUSTOMERS_PER_SCALE * scale
+        types = choices(CUSTOMER_TYPES, rng, count)
+        registered = np.sort(rng.uniform(0, span * 86400, count))
+        for i in range(count):
+            registration = timezone.make_aware(first + timedelta(seconds=float(registered[i])), tz)
+            female = rng.random() < 0.5
+            names = FEMALE_NAMES if female else MALE_NAMES
+            last_name = LAST_NAMES[rng.integers(len(LAST_NAMES))]
+            customers.append(Customer(
+                first_name=names[rng.integers(len(names))], last_name=f'{last_name}а' if female else last_name,
+                email=f'customer{i + 1}@{SEED_EMAIL_DOMAIN}', phone=f'+7900{i + 1:07d}',
+                customer_type=str(types[i]), registration_date=registration,
+            ))
+        with atomic_write():
+            customers = Customer.objects.bulk_create(customers, batch_size=BATCH_SIZE)
+            LoyaltyProgram.objects.bulk_create([
+                LoyaltyProgram(customer=customer, joined_date=customer.registration_date)
+                for customer in customers if customer.customer_type == 'loyalty'
+            ], batch_size=BATCH_SIZE)
+        return customers
+
+    def plan(self, rng, options, first_day, products, customers):
+        """Everything ``seed_day`` needs, handed to the worker processes."""
+        prices = [product.price for product in products]
+        return {
+            'seed': options['seed'],
+            'first_day': first_day,
+            'first_pk': (Order.objects.aggregate(last=Max('pk'))['last'] or 0) + 1,
+            'orders': orders_per_day(
+                options['scale'] * ITEMS_PER_SCALE // ITEMS_PER_ORDER, first_day, options['days']
+            ),
+            'products': [product.pk for product in products],
+            'prices': prices,
+            'price_cents': np.array([int(price * 100) for price in prices]),
+            'product_cdf': zipf_cdf(len(products), PRODUCT_POPULARITY_EXPONENT, rng),
+            'customer_ids': [customer.pk for customer in customers],
+            'customer_types': [customer.customer_type for customer in customers],
+            'customer_cdf': zipf_cdf(len(customers), CUSTOMER_LOYALTY_EXPONENT, rng),
+        }
+
+    def seed_orders(self, plan, days, workers):
+        start_worker(plan)
+        if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            results = map(seed_day, range(days))
+            return tuple(map(sum, zip(*results)))
+        context = multiprocessing.get_context('fork')
+        # Children must open connections of their own rather than share the parent's file handle or socket.
+        connections.close_all()
+        with context.Pool(workers, initializer=start_worker, initargs=(plan,)) as pool:
+            results = list(pool.imap_unordered(seed_day, range(days)))
+        return tuple(map(sum, zip(*results)))
+
+    def rebuild_derived(self):
+        # bulk_create skipped the signals keeping these in step; rebuild them the way their commands do.
+        for label, func in [
+            ('себестоимость по рецептам', recompute_costs),
+            ('статистика клиентов', lambda: rebuild_customer_stats(Customer.objects.all())),
+            ('сводки продаж', rebuild_rollups),
+            ('баллы лояльности', lambda: run_loyalty(lag=timedelta(0))),
+        ]:
+            start = time.perf_counter()
+            func()
+            self.stdout.write(f'{label}: {time.perf_counter() - start:.1f} с')
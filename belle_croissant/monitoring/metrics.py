@@ -0,0 +1,227 @@
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+# Fixed 1-2-5 bucket bounds keep histograms cheap to update and mergeable across workers.
+MS_BUCKETS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+QUERY_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500]
+MAX_DUPLICATES_PER_ROUTE = 50
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    def __init__(self, bounds, counts=None, total=0.0, maximum=0.0):
+        self.bounds = bounds
+        self.counts = counts or [0] * (len(bounds) + 1)
+        self.total = total
+        self.maximum = maximum
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (the observed max for the overflow bucket)."""
+        n = self.count
+        if not n:
+            return None
+        rank = q * n
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.maximum
+        return self.maximum
+
+    def to_dict(self):
+        n = self.count
+        return {
+            'count': n,
+            'mean': self.total / n if n else None,
+            'max': self.maximum,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': self.bounds,
+            'counts': self.counts,
+            'sum': self.total,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(list(data['buckets']), list(data['counts']), data['sum'], data['max'])
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram(MS_BUCKETS)
+        self.db_time = Histogram(MS_BUCKETS)
+        self.render_time = Histogram(MS_BUCKETS)
+        self.serialize_time = Histogram(MS_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.response_bytes = 0
+        self.duplicates = {}
+
+    def record(self, total_ms, db_ms, render_ms, serialize_ms, queries, size, duplicates):
+        self.latency.add(total_ms)
+        self.db_time.add(db_ms)
+        self.render_time.add(render_ms)
+        self.serialize_time.add(serialize_ms)
+        self.queries.add(queries)
+        self.response_bytes += size
+        for sql, extra in duplicates.items():
+            if sql in self.duplicates or len(self.duplicates) < MAX_DUPLICATES_PER_ROUTE:
+                self.duplicates[sql] = self.duplicates.get(sql, 0) + extra
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.db_time.merge(other.db_time)
+        self.render_time.merge(other.render_time)
+        self.serialize_time.merge(other.serialize_time)
+        self.queries.merge(other.queries)
+        self.response_bytes += other.response_bytes
+        for sql, extra in other.duplicates.items():
+            self.duplicates[sql] = self.duplicates.get(sql, 0) + extra
+
+    def to_dict(self):
+        requests = self.latency.count
+        return {
+            'requests': requests,
+            'latency_ms': self.latency.to_dict(),
+            'db_ms': self.db_time.to_dict(),
+            'render_ms': self.render_time.to_dict(),
+            'serialize_ms': self.serialize_time.to_dict(),
+            'queries': self.queries.to_dict(),
+            'avg_response_bytes': self.response_bytes / requests if requests else None,
+            'response_bytes': self.response_bytes,
+            'duplicate_queries': dict(sorted(self.duplicates.items(), key=lambda item: -item[1])),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.latency = Histogram.from_dict(data['latency_ms'])
+        stats.db_time = Histogram.from_dict(data['db_ms'])
+        stats.render_time = Histogram.from_dict(data['render_ms'])
+        if 'serialize_ms' in data:
+            # Absent from snapshots written before serializer timing existed.
+            stats.serialize_time = Histogram.from_dict(data['serialize_ms'])
+        stats.queries = Histogram.from_dict(data['queries'])
+        stats.response_bytes = data['response_bytes']
+        stats.duplicates = dict(data['duplicate_queries'])
+        return stats
+
+
+class MetricsRegistry:
+    """Per-process, thread-safe aggregate of request metrics keyed by route."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.started = time.time()
+        self.last_dump = time.monotonic()
+
+    def record(self, route, **values):
+        with self.lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteStats()
+            stats.record(**values)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'since': self.started,
+                'routes': {route: stats.to_dict() for route, stats in self.routes.items()},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+            self.started = time.time()
+
+    def dump_due(self, interval):
+        """Claim this worker's next snapshot write if ``interval`` seconds have passed since the last."""
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_dump < interval:
+                return False
+            self.last_dump = now
+            return True
+
+    def dump(self, directory):
+        """Write this worker's snapshot to ``directory``; a failed write is logged, never raised."""
+        path = Path(directory)
+        target = path / f'{os.getpid()}.json'
+        tmp = path / f'{os.getpid()}-{threading.get_ident()}.tmp'
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(self.snapshot()))
+            tmp.replace(target)
+        except OSError:
+            logger.warning('Could not write the metrics snapshot to %s', directory, exc_info=True)
+            with contextlib.suppress(OSError):
+                tmp.unlink()
+
+    def maybe_dump(self, directory, interval):
+        """Write this worker's snapshot to ``directory`` at most once per ``interval`` seconds."""
+        if self.dump_due(interval):
+            self.dump(directory)
+
+
+def merge_snapshots(snapshots):
+    routes = {}
+    for snapshot in snapshots:
+        for route, data in snapshot['routes'].items():
+            stats = RouteStats.from_dict(data)
+            if route in routes:
+                routes[route].merge(stats)
+            else:
+                routes[route] = stats
+    return {route: stats.to_dict() for route, stats in routes.items()}
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def load_snapshots(directory):
+    """Snapshots of the live workers; files left by exited workers are removed."""
+    snapshots = []
+    for path in sorted(Path(directory).glob('*.json')):
+        try:
+            if pid_alive(int(path.stem)):
+                snapshots.append(json.loads(path.read_text()))
+            else:
+                path.unlink()
+        except (OSError, ValueError):
+            # Replaced or pruned concurrently, or not a snapshot at all.
+            continue
+    return snapshots
+
+
+registry = MetricsRegistry()
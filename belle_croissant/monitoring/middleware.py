@@ -0,0 +1,162 @@
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+from .metrics import registry
+
+_collector = ContextVar('perf_metrics_collector', default=None)
+
+
+class QueryCollector:
+    """``execute_wrapper`` hook counting and timing every SQL statement of one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = {}
+        self.render_started = None
+        self.render_time = 0.0
+        self.serializing = False
+        self.serialize_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    def render_finished(self, response):
+        if self.render_started is not None:
+            self.render_time = time.perf_counter() - self.render_started
+
+
+def timed_serializer_data(data):
+    """``BaseSerializer.data`` adding the outermost build of each representation to the request's collector.
+
+    ``Serializer.data`` and ``ListSerializer.data`` both go through it; queries
+    run by lazy relations while serializing count in SQL time as well.
+    """
+    def getter(serializer):
+        collector = _collector.get()
+        if collector is None or collector.serializing:
+            return data.fget(serializer)
+        collector.serializing = True
+        start = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            collector.serializing = False
+            collector.serialize_time += time.perf_counter() - start
+
+    getter.timed = True
+    return property(getter)
+
+
+class PerformanceMetricsMiddleware:
+    """Record per-route query count, SQL time, serializer and render time and response size.
+
+    Numbers are added to the ``Server-Timing`` header and aggregated in the
+    in-process :data:`monitoring.metrics.registry`, exposed at ``/api/_metrics``.
+    Async-capable, so it does not force async views under ASGI onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERF_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.snapshot_dir = settings.PERF_METRICS_SNAPSHOT_DIR
+        self.snapshot_interval = settings.PERF_METRICS_SNAPSHOT_INTERVAL
+        if not getattr(BaseSerializer.data.fget, 'timed', False):
+            BaseSerializer.data = timed_serializer_data(BaseSerializer.data)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collector, start = self.start(request)
+        token = _collector.set(collector)
+        try:
+            with self.collecting(collector):
+                response = self.get_response(request)
+        finally:
+            _collector.reset(token)
+        response = self.finish(request, response, collector, start)
+        if self.snapshot_dir:
+            registry.maybe_dump(self.snapshot_dir, self.snapshot_interval)
+        return response
+
+    async def __acall__(self, request):
+        collector, start = self.start(request)
+        # Copied into the threads running this request's sync code, serializers included.
+        token = _collector.set(collector)
+        # Connections are per thread: hook the ones of the thread that runs this
+        # request's sync code (views, ORM calls), not the event loop's.
+        stack = await sync_to_async(self.collecting)(collector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _collector.reset(token)
+        response = self.finish(request, response, collector, start)
+        if self.snapshot_dir and registry.dump_due(self.snapshot_interval):
+            # File I/O stays off the event loop.
+            await sync_to_async(registry.dump, thread_sensitive=False)(self.snapshot_dir)
+        return response
+
+    @staticmethod
+    def start(request):
+        collector = request._query_collector = QueryCollector()
+        return collector, time.perf_counter()
+
+    @staticmethod
+    def collecting(collector):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(collector))
+        return stack
+
+    def finish(self, request, response, collector, start):
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = collector.db_time * 1000
+        render_ms = collector.render_time * 1000
+        serialize_ms = collector.serialize_time * 1000
+
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.2f};desc="{collector.queries} queries", serialize;dur={serialize_ms:.2f}, '
+            f'render;dur={render_ms:.2f}, total;dur={total_ms:.2f}'
+        )
+        registry.record(
+            self.route(request),
+            total_ms=total_ms,
+            db_ms=db_ms,
+            render_ms=render_ms,
+            serialize_ms=serialize_ms,
+            queries=collector.queries,
+            size=0 if response.streaming else len(response.content),
+            duplicates={sql: count - 1 for sql, count in collector.statements.items() if count > 1},
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        collector = getattr(request, '_query_collector', None)
+        if collector is not None:
+            collector.render_started = time.perf_counter()
+            response.add_post_render_callback(collector.render_finished)
+        return response
+
+    @staticmethod
+    def route(request):
+        match = request.resolver_match
+        return f'{request.method} {match.view_name if match else "<unresolved>"}'
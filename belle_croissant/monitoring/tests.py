@@ -0,0 +1,196 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from belle_croissant.db_routers import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, read_from_replicas
+from customers.models import Customer
+from orders.models import Order, OrderItem
+from products.catalog import get_catalog
+from products.models import Product
+
+from .management.commands import seed_data
+from .metrics import Histogram, MetricsRegistry, load_snapshots, merge_snapshots, registry
+
+
+class HistogramTests(TestCase):
+    def test_percentiles_use_bucket_upper_bounds(self):
+        histogram = Histogram([1, 10, 100])
+        for value in [0.5] * 90 + [50] * 9 + [500]:
+            histogram.add(value)
+        self.assertEqual(histogram.percentile(0.5), 1)
+        self.assertEqual(histogram.percentile(0.95), 100)
+        self.assertEqual(histogram.percentile(0.999), 500)
+
+    def test_snapshots_from_workers_merge(self):
+        first, second = MetricsRegistry(), MetricsRegistry()
+        values = dict(total_ms=5, db_ms=1, render_ms=1, serialize_ms=1, queries=2, size=100, duplicates={'SELECT 1': 1})
+        first.record('GET customer-list', **values)
+        second.record('GET customer-list', **values)
+        merged = merge_snapshots([first.snapshot(), second.snapshot()])['GET customer-list']
+        self.assertEqual(merged['requests'], 2)
+        self.assertEqual(merged['response_bytes'], 200)
+        self.assertEqual(merged['duplicate_queries'], {'SELECT 1': 2})
+
+
+class MetricsSnapshotTests(TestCase):
+    def setUp(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = Path(temporary.name)
+        self.registry = MetricsRegistry()
+        self.registry.record('GET customer-list', total_ms=5, db_ms=1, render_ms=1, serialize_ms=1, queries=2, size=100, duplicates={})
+
+    def test_concurrent_dumps_write_once_per_interval(self):
+        self.registry.last_dump = 0
+        with mock.patch.object(Path, 'replace', autospec=True, side_effect=Path.replace) as replace:
+            threads = [threading.Thread(target=self.registry.maybe_dump, args=(self.directory, 60)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(replace.call_count, 1)
+        self.assertEqual([path.name for path in self.directory.iterdir()], [f'{os.getpid()}.json'])
+
+    def test_failed_dump_is_logged_not_raised(self):
+        self.registry.last_dump = 0
+        with mock.patch.object(Path, 'write_text', side_effect=PermissionError('read-only')), \
+                self.assertLogs('monitoring.metrics', 'WARNING'):
+            self.registry.maybe_dump(self.directory, 60)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_snapshots_of_exited_workers_are_pruned(self):
+        exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True)
+        for pid in [os.getpid(), int(exited.stdout)]:
+            (self.directory / f'{pid}.json').write_text(json.dumps({**self.registry.snapshot(), 'pid': pid}))
+        self.assertEqual([snapshot['pid'] for snapshot in load_snapshots(self.directory)], [os.getpid()])
+        self.assertEqual([path.name for path in self.directory.iterdir()], [f'{os.getpid()}.json'])
+
+
+class PerformanceMetricsMiddlewareTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.user = get_user_model().objects.create_user('admin', password='secret', is_staff=True)
+
+    def test_server_timing_and_route_aggregation(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            response = self.client.get('/api/customers/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+$')
+
+        metrics = self.client.get('/api/_metrics').data['routes']
+        route = metrics['GET customer-list']
+        self.assertEqual(route['requests'], 2)
+        self.assertEqual(route['queries']['p50'], 1)
+        self.assertGreater(route['response_bytes'], 0)
+        self.assertIsNotNone(route['latency_ms']['p99'])
+        self.assertEqual(route['serialize_ms']['count'], 2)
+        self.assertGreater(route['serialize_ms']['sum'], 0)
+
+    def test_metrics_endpoint_requires_admin(self):
+        self.client.force_authenticate(get_user_model().objects.create_user('cashier', password='secret'))
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'], DB_REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.routed = []
+
+        def view(request):
+            self.routed.append((self.router.db_for_read(Customer), self.router.db_for_write(Customer)))
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+        self.factory = RequestFactory()
+
+    def test_reads_of_safe_requests_go_to_replicas_until_a_write_pins_the_client(self):
+        self.middleware(self.factory.get('/api/customers/'))
+        response = self.middleware(self.factory.post('/api/customers/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        pinned = self.factory.get('/api/customers/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        self.middleware(pinned)
+
+        self.assertIn(self.routed[0][0], ['replica_1', 'replica_2'])
+        self.assertEqual(self.routed[1:], [('default', 'default'), ('default', 'default')])
+        self.assertEqual([choice[1] for choice in self.routed], ['default'] * 3)
+        # Outside a request (commands, jobs) nothing is routed to replicas.
+        self.assertEqual(self.router.db_for_read(Customer), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_1', 'customers'))
+        self.assertTrue(self.router.allow_migrate('default', 'customers'))
+
+    def test_catalog_is_built_from_the_primary(self):
+        cache.clear()
+        with read_from_replicas(), mock.patch(
+            'products.catalog.build_catalog', side_effect=lambda: {'db': self.router.db_for_read(Product)}
+        ):
+            _, body = get_catalog()
+            self.assertIn(self.router.db_for_read(Product), ['replica_1', 'replica_2'])
+        self.assertEqual(json.loads(body), {'db': 'default'})
+
+
+class SeedDataTests(TestCase):
+    def setUp(self):
+        command = seed_data.Command()
+        rng = np.random.default_rng(1)
+        self.first_day = timezone.localdate() - timedelta(days=2)
+        with seed_data.historical_timestamps():
+            products = command.seed_catalog(rng, 1)
+            customers = command.seed_customers(rng, 1, self.first_day)
+        self.plan = command.plan(rng, {'seed': 1, 'scale': 1, 'days': 2}, self.first_day, products, customers)
+        self.plan['orders'] = np.array([40, 60])
+        seed_data.start_worker(self.plan)
+
+    def seed(self, *days):
+        with seed_data.historical_timestamps():
+            return [seed_data.seed_day(day) for day in days]
+
+    def rows(self):
+        return (
+            list(Order.objects.order_by('pk').values_list('pk', 'order_number', 'created_at', 'customer', 'final_amount')),
+            list(OrderItem.objects.order_by('order', 'product').values_list('order', 'product', 'quantity', 'total_price')),
+        )
+
+    def test_days_are_deterministic_and_consistent(self):
+        with transaction.atomic():
+            [(orders, items), _] = self.seed(0, 1)
+            first = self.rows()
+            transaction.set_rollback(True)
+        self.assertEqual(orders, 40)
+        self.assertEqual(len(first[0]), 100)
+        self.assertEqual(sum(1 for item in first[1] if item[0] < first[0][40][0]), items)
+
+        self.seed(1, 0)
+        self.assertEqual(self.rows(), first)
+        for order in Order.objects.annotate(items_total=Sum('items__total_price')):
+            self.assertEqual(order.total_amount, order.items_total)
+            self.assertEqual(order.final_amount, order.total_amount - order.discount_amount)
+            self.assertIn(timezone.localtime(order.created_at).hour, range(*seed_data.OPENING_HOURS))
+            self.assertEqual(order.stock_consumed_at, order.completed_at)
+        self.assertEqual(
+            Order.objects.filter(created_at__date=self.first_day).earliest('created_at').order_number,
+            f'{seed_data.SEED_STORE}-{self.first_day:%y%m%d}-00001',
+        )
+
+    def test_refuses_to_seed_twice(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_data', stdout=StringIO())
@@ -0,0 +1,30 @@
+import os
+
+from django.conf import settings
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import load_snapshots, merge_snapshots, registry
+
+
+def collect_metrics():
+    """This worker's live metrics merged with the snapshots other workers dumped."""
+    snapshots = [registry.snapshot()]
+    if settings.PERF_METRICS_SNAPSHOT_DIR:
+        snapshots += [
+            snapshot for snapshot in load_snapshots(settings.PERF_METRICS_SNAPSHOT_DIR)
+            if snapshot['pid'] != os.getpid()
+        ]
+    return {'workers': len(snapshots), 'routes': merge_snapshots(snapshots)}
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(collect_metrics())
+
+    def delete(self, request):
+        registry.reset()
+        return Response(status=204)
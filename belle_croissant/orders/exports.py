@@ -0,0 +1,28 @@
+from .models import Order, OrderItem
+
+ORDER_EXPORT_COLUMNS = [
+    'id', 'order_number', 'customer_id', 'order_type', 'status', 'total_amount',
+    'discount_amount', 'final_amount', 'created_at', 'completed_at',
+]
+ORDER_ITEM_EXPORT_COLUMNS = [
+    'id', 'order_id', 'order__order_number', 'product_id', 'product__name',
+    'quantity', 'unit_price', 'total_price',
+]
+
+
+def orders_export(since=None, until=None):
+    queryset = Order.objects.order_by('pk')
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset, ORDER_EXPORT_COLUMNS
+
+
+def order_items_export(since=None, until=None):
+    queryset = OrderItem.objects.order_by('pk')
+    if since:
+        queryset = queryset.filter(order__created_at__gte=since)
+    if until:
+        queryset = queryset.filter(order__created_at__lt=until)
+    return queryset, ORDER_ITEM_EXPORT_COLUMNS
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core import signals
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.http.cookie import parse_cookie
+from django.urls import reverse
+from django.utils.asyncio import aclosing
+
+from .models import ACTIVE_STATUSES, Order
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'kitchen_orders'
+EVENT_FIELDS = ['id', 'order_number', 'order_type', 'status', 'customer_id', 'created_at', 'updated_at']
+# Events a subscriber may lag behind before it is disconnected; the screen reconnects
+# and starts again from a fresh snapshot.
+QUEUE_SIZE = 1000
+_CLOSED = object()
+
+
+def order_event(order, kind):
+    event = {field: getattr(order, field) for field in EVENT_FIELDS}
+    event['event'] = kind
+    return json.loads(json.dumps(event, cls=DjangoJSONEncoder))
+
+
+class Subscription:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def offer(self, events):
+        # Runs on the subscriber's event loop.
+        try:
+            for event in events:
+                self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_CLOSED)
+
+
+class LocalBroker:
+    """In-process fan-out of order events to the feeds of this worker.
+
+    Subscribers are asyncio queues on the serving event loop; publishers may run
+    in any thread. Events are published after the writing transaction commits.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, events):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, events)
+            except RuntimeError:
+                # The loop has been closed; the subscription is gone with it.
+                self.unsubscribe(subscription)
+
+    def send(self, events, using='default'):
+        transaction.on_commit(lambda: self.publish(events), using=using)
+
+
+class PostgresBroker(LocalBroker):
+    """Fan-out across workers through ``LISTEN/NOTIFY``.
+
+    ``pg_notify`` runs inside the writing transaction, so PostgreSQL delivers
+    the event only if it commits. One listener thread per worker forwards the
+    notifications to the local subscribers.
+    """
+
+    def __init__(self, using='default'):
+        super().__init__()
+        self.using = using
+        self.listener = None
+
+    def subscribe(self):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name='kitchen-feed-listener', daemon=True)
+                self.listener.start()
+        return super().subscribe()
+
+    def send(self, events, using=None):
+        # One statement for the whole batch, however many orders a bulk import brings.
+        with connections[using or self.using].cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload',
+                [CHANNEL, [json.dumps(event) for event in events]],
+            )
+
+    def listen(self):
+        wrapper = connections[self.using]
+        while True:
+            try:
+                # KITCHEN_FEED_LISTEN_PARAMS bypasses a transaction pooler, which cannot hold a LISTEN.
+                params = {**wrapper.get_connection_params(), **settings.KITCHEN_FEED_LISTEN_PARAMS}
+                conn = wrapper.get_new_connection(params)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    events = [json.loads(notify.payload) for notify in conn.notifies]
+                    conn.notifies.clear()
+                    if events:
+                        super().publish(events)
+            except Exception:
+                logger.exception('Kitchen feed listener lost its connection; reconnecting')
+                time.sleep(1)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        backend = settings.KITCHEN_FEED_BACKEND
+        if backend == 'auto':
+            backend = 'postgres' if connections['default'].vendor == 'postgresql' else 'local'
+        _broker = PostgresBroker() if backend == 'postgres' else LocalBroker()
+    return _broker
+
+
+def publish_order_events(orders, kind):
+    if kind == 'created':
+        # Orders imported already completed or cancelled never reach a kitchen screen.
+        orders = [order for order in orders if order.status in ACTIVE_STATUSES]
+    events = [order_event(order, kind) for order in orders]
+    if events:
+        get_broker().send(events)
+
+
+def sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+def active_orders():
+    return list(Order.objects.filter(status__in=ACTIVE_STATUSES).order_by('created_at', 'id').values(*EVENT_FIELDS))
+
+
+async def order_stream(heartbeat=None, max_age=None):
+    """Server-sent events for a kitchen screen: a snapshot of active orders, then changes.
+
+    The stream waits on a queue instead of holding a thread. It ends after
+    ``max_age`` seconds (the browser reconnects) so connections dropped behind
+    a proxy do not linger.
+    """
+    heartbeat = heartbeat or settings.KITCHEN_FEED_HEARTBEAT
+    deadline = time.monotonic() + (max_age or settings.KITCHEN_FEED_MAX_AGE)
+    broker = get_broker()
+    # Subscribe before reading the snapshot so nothing committed in between is missed.
+    subscription = broker.subscribe()
+    try:
+        # sync_order_stream() sends the snapshot in, read on its own thread.
+        snapshot = yield 'retry: 3000\n\n'
+        if snapshot is None:
+            snapshot = await sync_to_async(active_orders)()
+        yield sse('snapshot', snapshot)
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if event is _CLOSED:
+                break
+            yield sse(event['event'], event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def sync_order_stream(**kwargs):
+    """:func:`order_stream` as a plain generator, for WSGI servers.
+
+    Django collects an async iterator into a list before a WSGI server sees
+    it, so nothing would reach the screen until the stream ended. Here the
+    stream runs on a private event loop in the worker thread, one chunk per
+    step, and the snapshot is read on the request's own connection.
+    """
+    loop = asyncio.new_event_loop()
+    stream = order_stream(**kwargs)
+    try:
+        yield loop.run_until_complete(anext(stream))
+        step = stream.asend(active_orders())
+        while True:
+            try:
+                chunk = loop.run_until_complete(step)
+            except StopAsyncIteration:
+                break
+            yield chunk
+            step = anext(stream)
+    finally:
+        loop.run_until_complete(stream.aclose())
+        loop.close()
+
+
+def session_user(session_key):
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    return get_user(SimpleNamespace(session=session))
+
+
+class KitchenFeedApp:
+    """ASGI wrapper serving the kitchen feed outside Django's request cycle.
+
+    Django 4.2's ASGI handler keeps an executor thread per request for as long
+    as the response streams, so every open screen would pin one. Here a stream
+    is only a coroutine: the session lookup and the snapshot run on asgiref's
+    shared thread-sensitive executor, and a client disconnect ends the stream
+    at once. All other requests go to ``app``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.path = None
+
+    async def __call__(self, scope, receive, send):
+        if self.path is None:
+            self.path = reverse('kitchen-feed')
+        if scope['type'] != 'http' or scope['path'] != self.path:
+            return await self.app(scope, receive, send)
+        # close_old_connections() and friends, as Django's own handler does.
+        await sync_to_async(signals.request_started.send)(sender=self.__class__, scope=scope)
+        try:
+            await self.serve(scope, receive, send)
+        finally:
+            await sync_to_async(signals.request_finished.send)(sender=self.__class__)
+
+    async def serve(self, scope, receive, send):
+        if scope['method'] != 'GET':
+            return await self.reply(send, 405, {'detail': 'Метод не разрешен.'}, [(b'allow', b'GET')])
+        headers = dict(scope['headers'])
+        session_key = parse_cookie(headers.get(b'cookie', b'').decode('latin-1')).get(settings.SESSION_COOKIE_NAME)
+        user = await sync_to_async(session_user)(session_key)
+        if not user.is_authenticated:
+            return await self.reply(send, 403, {'detail': 'Учетные данные не были предоставлены.'})
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            async with aclosing(order_stream()) as stream:
+                while True:
+                    chunk = asyncio.ensure_future(anext(stream))
+                    await asyncio.wait([chunk, disconnected], return_when=asyncio.FIRST_COMPLETED)
+                    if disconnected.done():
+                        # Let the cancellation unwind the generator before aclosing() closes it.
+                        chunk.cancel()
+                        await asyncio.wait([chunk])
+                        return
+                    try:
+                        body = chunk.result()
+                    except StopAsyncIteration:
+                        break
+                    await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    async def reply(send, status, data, headers=()):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'), *headers]})
+        await send({'type': 'http.response.body', 'body': json.dumps(data).encode()})
@@ -0,0 +1,59 @@
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from belle_croissant.bench import rolled_back
+from belle_croissant.exports import iter_export
+from orders.exports import orders_export
+from orders.models import Order
+
+SEED_CHUNK = 10000
+
+
+class Command(BaseCommand):
+    help = 'Пиковая память потоковой выгрузки заказов при росте объёма'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000, 5000000])
+        parser.add_argument('--as', dest='fmt', choices=['ndjson', 'csv'], default='ndjson')
+        parser.add_argument('--baseline-max', type=int, default=100000,
+                            help='до какого объёма мерить list(values_list()) для сравнения')
+
+    def seed(self, start, stop):
+        for offset in range(start, stop, SEED_CHUNK):
+            Order.objects.bulk_create([
+                Order(order_number=f'E{i:010d}', status='completed',
+                      total_amount=Decimal('9.90'), final_amount=Decimal('9.90'))
+                for i in range(offset, min(offset + SEED_CHUNK, stop))
+            ])
+
+    def handle(self, *args, **options):
+        # tracemalloc peaks are reset per size; ru_maxrss would only grow and include the seeding.
+        self.stdout.write(f"{'rows':>9} {'stream s':>9} {'stream peak MiB':>16} {'list peak MiB':>14}")
+        with rolled_back():
+            seeded = 0
+            for size in sorted(options['sizes']):
+                self.seed(seeded, size)
+                seeded = size
+                queryset, columns = orders_export()
+
+                tracemalloc.start()
+                start = time.perf_counter()
+                written = 0
+                for chunk in iter_export(queryset, columns, options['fmt']):
+                    written += len(chunk)
+                elapsed = time.perf_counter() - start
+                stream_peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                list_peak = '-'
+                if size <= options['baseline_max']:
+                    tracemalloc.start()
+                    rows = list(queryset.values_list(*columns))
+                    list_peak = f'{tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f}'
+                    tracemalloc.stop()
+                    del rows
+
+                self.stdout.write(f'{size:>9} {elapsed:>9.2f} {stream_peak / 2 ** 20:>16.1f} {list_peak:>14}')
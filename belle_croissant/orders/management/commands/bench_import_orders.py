@@ -0,0 +1,81 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from belle_croissant.bench import rolled_back
+from orders.models import Order, OrderItem
+from orders.serializers import BulkOrderSerializer
+from products.models import Category, Product
+
+
+def save_row_by_row(payload):
+    for data in payload:
+        order = Order.objects.create(
+            order_number=data['order_number'], order_type=data['order_type'],
+            status='completed', total_amount=0, final_amount=0
+        )
+        total = Decimal('0')
+        for item in data['items']:
+            product = Product.objects.get(pk=item['product'])
+            line = product.price * item['quantity']
+            OrderItem.objects.create(
+                order=order, product=product, quantity=item['quantity'],
+                unit_price=product.price, total_price=line
+            )
+            total += line
+        order.total_amount = order.final_amount = total
+        order.save()
+
+
+class Command(BaseCommand):
+    help = 'Пропускная способность импорта заказов: bulk_create против save() по одному'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--items', type=int, default=3, help='позиций в заказе')
+        parser.add_argument('--legacy-orders', type=int, default=500,
+                            help='сколько заказов прогнать построчно (для оценки скорости)')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            category = Category.objects.create(name='Bench')
+            products = Product.objects.bulk_create([
+                Product(name=f'P{i}', description='', category=category,
+                        price=Decimal('1.50') + i, cost=Decimal('0.50'))
+                for i in range(50)
+            ])
+            product_ids = [product.pk for product in products]
+
+            def payload(prefix, count):
+                return [
+                    {
+                        'order_number': f'{prefix}{i:09d}',
+                        'order_type': 'in_store',
+                        'items': [
+                            {'product': product_ids[(i + j) % len(product_ids)], 'quantity': j + 1}
+                            for j in range(options['items'])
+                        ],
+                    }
+                    for i in range(count)
+                ]
+
+            legacy = payload('L', options['legacy_orders'])
+            start = time.perf_counter()
+            save_row_by_row(legacy)
+            legacy_rate = len(legacy) / (time.perf_counter() - start)
+
+            bulk = {'orders': payload('B', options['orders'])}
+            start = time.perf_counter()
+            serializer = BulkOrderSerializer(data=bulk)
+            serializer.is_valid(raise_exception=True)
+            validated = time.perf_counter()
+            serializer.save()
+            finished = time.perf_counter()
+
+        bulk_rate = options['orders'] / (finished - start)
+        self.stdout.write(f'save() по одному: {legacy_rate:,.0f} заказов/с '
+                          f'(10k заказов ≈ {10000 / legacy_rate:.1f} с)')
+        self.stdout.write(f'bulk: {options["orders"]} заказов за {finished - start:.2f} с '
+                          f'(валидация {validated - start:.2f} с, запись {finished - validated:.2f} с), '
+                          f'{bulk_rate:,.0f} заказов/с')
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from orders.models import Order
+from orders.transitions import TransitionConflict, transition_order
+
+PATH = ['pending', 'preparing', 'ready', 'completed']
+
+
+class Command(BaseCommand):
+    help = 'Гонка N экранов кухни за одни и те же заказы: пропускная способность и конфликты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=8)
+
+    def handle(self, *args, **options):
+        # Threads need committed rows on their own connections, so the data is removed afterwards
+        # instead of being rolled back.
+        prefix = f'BT{int(time.time())}-'
+        order_ids = [order.pk for order in Order.objects.bulk_create([
+            Order(order_number=f'{prefix}{i}', total_amount=Decimal('1.00'), final_amount=Decimal('1.00'))
+            for i in range(options['orders'])
+        ])]
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def screen():
+            local = Counter()
+            try:
+                for order_id in order_ids:
+                    for expected, target in zip(PATH, PATH[1:]):
+                        while True:
+                            try:
+                                transition_order(order_id, target, expected)
+                                local['ok'] += 1
+                            except TransitionConflict:
+                                local['conflict'] += 1
+                            except OperationalError:
+                                local['retry'] += 1
+                                time.sleep(0.001)
+                                continue
+                            break
+            finally:
+                connection.close()
+                with lock:
+                    outcomes.update(local)
+
+        threads = [threading.Thread(target=screen) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            finished = Order.objects.filter(pk__in=order_ids, status='completed').count()
+        finally:
+            Order.objects.filter(order_number__startswith=prefix).delete()
+
+        attempts = outcomes['ok'] + outcomes['conflict']
+        self.stdout.write(
+            f'{options["threads"]} потоков x {len(order_ids)} заказов: {attempts / elapsed:.0f} попыток/с, '
+            f'успешно {outcomes["ok"]} (ожидалось {len(order_ids) * (len(PATH) - 1)}), '
+            f'конфликтов {outcomes["conflict"]}, повторов из-за блокировок {outcomes["retry"]}, '
+            f'завершено {finished}'
+        )
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from belle_croissant.exports import EXPORT_FORMATS, iter_export, parse_export_params
+from customers.exports import customers_export
+from orders.exports import order_items_export, orders_export
+
+DATASETS = {
+    'orders': orders_export,
+    'items': order_items_export,
+    'customers': customers_export,
+}
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка заказов, позиций или клиентов в NDJSON/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument('--as', dest='fmt', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--since', help='ГГГГ-ММ-ДД, включительно')
+        parser.add_argument('--until', help='ГГГГ-ММ-ДД, не включая')
+        parser.add_argument('--output', '-o', default='-', help='файл или "-" для stdout')
+
+    def handle(self, *args, **options):
+        params = {key: options[key] for key in ('since', 'until') if options[key]}
+        params['as'] = options['fmt']
+        try:
+            fmt, since, until = parse_export_params(params)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+        queryset, columns = DATASETS[options['dataset']](since, until)
+
+        if options['output'] == '-':
+            out = sys.stdout
+        else:
+            out = open(options['output'], 'w', encoding='utf-8', newline='')
+        try:
+            for chunk in iter_export(queryset, columns, fmt):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
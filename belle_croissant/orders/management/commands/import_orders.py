@@ -0,0 +1,32 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from orders.serializers import BulkOrderSerializer
+
+
+class Command(BaseCommand):
+    help = 'Импорт пакета заказов из JSON-файла (формат /api/orders/bulk/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON-файл или "-" для stdin')
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            payload = json.load(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as fh:
+                payload = json.load(fh)
+        if isinstance(payload, list):
+            payload = {'orders': payload}
+
+        serializer = BulkOrderSerializer(data=payload)
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors, ensure_ascii=False, indent=2))
+        try:
+            orders = serializer.save()
+        except ValidationError as exc:
+            raise CommandError(json.dumps(exc.detail, ensure_ascii=False, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Импортировано заказов: {len(orders)}'))
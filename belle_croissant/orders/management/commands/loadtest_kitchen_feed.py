@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils.crypto import get_random_string
+
+from orders.models import Order
+
+STEPS = ['preparing', 'ready', 'completed']
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def process_status(pid):
+    """Threads and resident memory (MB) of ``pid`` from /proc (Linux only)."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            fields = dict(line.split(':', 1) for line in status)
+    except OSError:
+        return '?', '?'
+    return fields['Threads'].strip(), f'{int(fields["VmRSS"].split()[0]) / 1024:.1f}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест ленты кухни: uvicorn в отдельном процессе, N открытых SSE-подключений, '
+        'смена статусов через /api/orders/{id}/transition/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500)
+        parser.add_argument('--orders', type=int, default=30, help='каждый заказ проходит три статуса')
+        parser.add_argument('--interval', type=float, default=0.05, help='пауза между сменами статуса, с')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('Для нагрузочного теста нужен uvicorn: pip install uvicorn')
+
+        user = get_user_model().objects.create_user(f'loadtest-kitchen-{os.getpid()}')
+        client = Client()
+        client.force_login(user)
+        prefix = f'LT{int(time.time())}-'
+        orders = Order.objects.bulk_create([
+            Order(order_number=f'{prefix}{i}', total_amount=Decimal('1.00'), final_amount=Decimal('1.00'))
+            for i in range(options['orders'])
+        ])
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'belle_croissant.asgi:application', '--port', str(options['port']),
+             '--log-level', 'warning', '--backlog', str(max(2048, options['clients']))],
+            cwd=settings.BASE_DIR,
+        )
+        try:
+            report = asyncio.run(self.run(server.pid, client.cookies['sessionid'].value, orders, options))
+        finally:
+            server.terminate()
+            server.wait()
+            Order.objects.filter(order_number__startswith=prefix).delete()
+            client.logout()
+            user.delete()
+        self.stdout.write('\n'.join(report))
+
+    async def run(self, pid, session_key, orders, options):
+        port, clients = options['port'], options['clients']
+        for _ in range(500):
+            try:
+                _, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.close()
+                break
+            except OSError:
+                await asyncio.sleep(0.02)
+        else:
+            raise CommandError('uvicorn не запустился')
+        threads_before, rss_before = process_status(pid)
+
+        expected = len(orders) * len(STEPS)
+        numbers = {order.order_number for order in orders}
+        published = {}
+        received = [[] for _ in range(clients)]
+        connected = []
+        all_received = asyncio.Event()
+
+        async def screen(index):
+            start = time.perf_counter()
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write((
+                'GET /api/kitchen/feed/ HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n'
+                f'Cookie: sessionid={session_key}\r\n\r\n'
+            ).encode())
+            status = await reader.readline()
+            if b' 200 ' not in status:
+                raise CommandError(f'Лента ответила {status.decode().strip()}')
+            try:
+                while line := await reader.readline():
+                    if line.startswith(b'event: snapshot'):
+                        connected.append(time.perf_counter() - start)
+                    elif line.startswith(b'data: {'):
+                        event = json.loads(line[len(b'data: '):])
+                        key = event['order_number'], event['status']
+                        if event['order_number'] in numbers and key in published:
+                            received[index].append(time.perf_counter() - published[key])
+                            if len(received[index]) == expected and all(len(r) == expected for r in received):
+                                all_received.set()
+            finally:
+                writer.close()
+
+        screens = [asyncio.ensure_future(screen(i)) for i in range(clients)]
+        while len(connected) < clients:
+            await asyncio.sleep(0.05)
+            for task in screens:
+                if task.done() and task.exception():
+                    raise task.exception()
+        threads_idle, rss_idle = process_status(pid)
+
+        # Session auth with a matching CSRF cookie/header pair; Basic auth would time password hashing.
+        csrf_token = get_random_string(32)
+        headers = {
+            'Content-Type': 'application/json', 'X-CSRFToken': csrf_token,
+            'Cookie': f'sessionid={session_key}; csrftoken={csrf_token}',
+        }
+
+        def transition(order, target):
+            request = urllib.request.Request(
+                f'http://127.0.0.1:{port}/api/orders/{order.pk}/transition/',
+                data=json.dumps({'status': target}).encode(), method='POST',
+                headers=headers,
+            )
+            published[order.order_number, target] = time.perf_counter()
+            urllib.request.urlopen(request).close()
+
+        start = time.perf_counter()
+        for target in STEPS:
+            for order in orders:
+                await asyncio.to_thread(transition, order, target)
+                await asyncio.sleep(options['interval'])
+        try:
+            await asyncio.wait_for(all_received.wait(), 30)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - start
+
+        for task in screens:
+            task.cancel()
+        await asyncio.gather(*screens, return_exceptions=True)
+
+        latencies = [latency * 1000 for r in received for latency in r]
+        return [
+            f'{clients} подключений: p50 подключения {percentile(connected, 0.5) * 1000:.1f} мс, '
+            f'p95 {percentile(connected, 0.95) * 1000:.1f} мс',
+            f'сервер: потоков {threads_before} -> {threads_idle} с открытыми лентами, '
+            f'RSS {rss_before} -> {rss_idle} МБ',
+            f'доставлено {len(latencies)} из {clients * expected} событий за {elapsed:.1f} с',
+            f'задержка доставки: p50 {percentile(latencies, 0.5):.1f} мс, p95 {percentile(latencies, 0.95):.1f} мс, '
+            f'max {max(latencies):.1f} мс' if latencies else 'события не доставлены',
+        ]
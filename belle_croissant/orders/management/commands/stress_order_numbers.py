@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+
+from orders.numbering import OrderNumberAllocator, drop_counters
+
+
+def allocate_in_process(barrier, results, store, using, allocations, batch):
+    allocator = OrderNumberAllocator(store, using)
+    numbers = []
+    try:
+        barrier.wait()
+        start = time.perf_counter()
+        while len(numbers) < allocations:
+            numbers.extend(allocator.allocate(min(batch, allocations - len(numbers))))
+        results.put((numbers, time.perf_counter() - start, None))
+    except Exception as exc:
+        results.put((numbers, 0, repr(exc)))
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'N процессов одновременно получают номера заказов: выделений в секунду и проверка на повторы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--allocations', type=int, default=5000, help='номеров на процесс')
+        parser.add_argument('--batch', type=int, default=1, help='номеров за один вызов')
+        parser.add_argument('--block-size', type=int, help='вместо ORDER_NUMBER_BLOCK_SIZE')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('Нужна платформа с fork()')
+        # A store code of its own, so real counters are left alone and this one can be dropped afterwards.
+        store = f'T{os.getpid() % 100000}'
+        using, processes = options['database'], options['processes']
+        overrides = {'ORDER_NUMBER_BLOCK_SIZE': options['block_size']} if options['block_size'] else {}
+
+        context = multiprocessing.get_context('fork')
+        barrier, results = context.Barrier(processes), context.Queue()
+        # Children must open connections of their own rather than share the parent's socket or file handle.
+        connections.close_all()
+        try:
+            with override_settings(**overrides):
+                workers = [
+                    context.Process(target=allocate_in_process, args=(
+                        barrier, results, store, using, options['allocations'], options['batch'],
+                    ))
+                    for _ in range(processes)
+                ]
+                for worker in workers:
+                    worker.start()
+                outcomes = [results.get() for _ in workers]
+                for worker in workers:
+                    worker.join()
+        finally:
+            drop_counters(store, using)
+
+        errors = [error for _, _, error in outcomes if error]
+        if errors:
+            raise CommandError(f'Ошибки в процессах: {errors}')
+        numbers = [number for batch, _, _ in outcomes for number in batch]
+        duplicates = len(numbers) - len(set(numbers))
+        elapsed = max(seconds for _, seconds, _ in outcomes)
+        self.stdout.write(
+            f'{connections[using].vendor}: {len(numbers)} номеров в {processes} процессах за {elapsed:.2f} с, '
+            f'{len(numbers) / elapsed:.0f} в секунду, повторов {duplicates}'
+        )
+        if duplicates:
+            raise CommandError(f'Повторяющихся номеров: {duplicates}')
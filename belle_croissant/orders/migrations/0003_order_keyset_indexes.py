@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_customer_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_type_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='order_created_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_type', '-created_at', '-id'], name='order_type_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='stock_consumed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Ингредиенты списаны'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['completed_at'], name='order_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_completed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store', models.CharField(max_length=6, verbose_name='Магазин')),
+                ('day', models.DateField(verbose_name='День')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Последний номер')),
+            ],
+            options={
+                'verbose_name': 'Счётчик номеров заказов',
+                'verbose_name_plural': 'Счётчики номеров заказов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ordernumbercounter',
+            constraint=models.UniqueConstraint(fields=('store', 'day'), name='order_number_counter_store_day_uniq'),
+        ),
+    ]
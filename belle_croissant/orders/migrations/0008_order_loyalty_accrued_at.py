@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+def mark_accrued_orders(apps, schema_editor):
+    # Orders inside the last completed_at watermark were already accrued.
+    LoyaltyRun = apps.get_model('customers', 'LoyaltyRun')
+    Order = apps.get_model('orders', 'Order')
+    last = LoyaltyRun.objects.order_by('-processed_until').first()
+    if last is not None:
+        Order.objects.filter(status='completed', completed_at__lte=last.processed_until).update(
+            loyalty_accrued_at=last.processed_until
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_loyalty_run'),
+        ('orders', '0007_order_number_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='loyalty_accrued_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Баллы начислены'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['loyalty_accrued_at', 'completed_at'], name='order_loyalty_accrued_idx'),
+        ),
+        migrations.RunPython(mark_accrued_orders, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, router
+from belle_croissant.sqlite import atomic_write
 from customers.models import Customer
 from products.models import Product
 
+ACTIVE_STATUSES = ['pending', 'preparing', 'ready']
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Ожидает'),
@@ -45,15 +48,47 @@ class Order(models.Model):
     created_at = models.DateTimeField('Создан', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлен', auto_now=True)
     completed_at = models.DateTimeField('Завершен', null=True, blank=True)
+    stock_consumed_at = models.DateTimeField('Ингредиенты списаны', null=True, blank=True, editable=False)
+    loyalty_accrued_at = models.DateTimeField('Баллы начислены', null=True, blank=True, editable=False)
     
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_keyset_idx'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_keyset_idx'),
+            models.Index(fields=['order_type', '-created_at', '-id'], name='order_type_keyset_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+            models.Index(fields=['completed_at'], name='order_completed_idx'),
+            models.Index(fields=['loyalty_accrued_at', 'completed_at'], name='order_loyalty_accrued_idx'),
+        ]
     
     def __str__(self):
         return f"Заказ {self.order_number}"
 
+    def save(self, *args, **kwargs):
+        if not self.order_number:
+            from .numbering import next_order_number
+            self.order_number = next_order_number(kwargs.get('using') or router.db_for_write(Order, instance=self))
+        # Receivers maintaining denormalized counters (customers.signals) share this transaction.
+        with atomic_write(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+class OrderNumberCounter(models.Model):
+    """Last order number reserved per store and day (orders.numbering; PostgreSQL uses sequences instead)."""
+    store = models.CharField('Магазин', max_length=6)
+    day = models.DateField('День')
+    last_value = models.PositiveIntegerField('Последний номер', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик номеров заказов'
+        verbose_name_plural = 'Счётчики номеров заказов'
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'day'], name='order_number_counter_store_day_uniq'),
+        ]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(
         Order,
@@ -0,0 +1,160 @@
+"""Human-readable order numbers: ``<store>-<yymmdd>-<sequence>``, e.g. ``BC-261018-00042``.
+
+Every process reserves numbers in blocks of ``ORDER_NUMBER_BLOCK_SIZE`` and
+hands them out from memory, so a checkout neither locks a ``max() + 1``
+query nor retries on the unique constraint: the database is hit once per
+block. Blocks come from a per-store, per-day sequence on PostgreSQL and from
+the ``OrderNumberCounter`` table elsewhere. Numbers are unique, but not
+gap-free and not in checkout order across processes: a process that exits
+drops the rest of its block.
+"""
+import os
+import re
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .models import OrderNumberCounter
+
+STORE_CODE = re.compile(r'^[A-Z0-9]{1,6}$')
+# The shape of every allocated number, whatever the store; clients may not send numbers in it.
+ALLOCATED_NUMBER = re.compile(r'^[A-Z0-9]{1,6}-\d{6}-\d{5,}$')
+
+
+def format_order_number(store, day, number):
+    return f'{store}-{day:%y%m%d}-{number:05d}'
+
+
+def is_allocated_number(value):
+    return bool(ALLOCATED_NUMBER.match(value))
+
+
+def sequence_name(store, day):
+    return f'order_number_{store.lower()}_{day:%y%m%d}'
+
+
+def reserve_from_counter(connection, store, day, count):
+    """Bump the counter row by ``count`` and return the reserved numbers."""
+    table = connection.ops.quote_name(OrderNumberCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (store, day, last_value) VALUES (%s, %s, %s) '
+            f'ON CONFLICT (store, day) DO UPDATE SET last_value = {table}.last_value + excluded.last_value '
+            f'RETURNING last_value',
+            [store, day, count],
+        )
+        last = cursor.fetchone()[0]
+    return range(last - count + 1, last + 1)
+
+
+def create_sequence(connection, name):
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {connection.ops.quote_name(name)}')
+    except IntegrityError:
+        # Two processes creating the same sequence at once: IF NOT EXISTS does not cover that race.
+        pass
+
+
+def reserve_from_sequence(connection, name, count):
+    """``nextval()`` never blocks and is never rolled back, so concurrent processes just interleave."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s) FROM generate_series(1, %s)', [connection.ops.quote_name(name), count])
+        return [number for number, in cursor.fetchall()]
+
+
+def drop_counters(store, using=DEFAULT_DB_ALIAS):
+    """Forget every day's counter of ``store``; numbers handed out before may be reissued."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        OrderNumberCounter.objects.using(using).filter(store=store).delete()
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'S' AND relname ~ %s",
+            [f'^order_number_{store.lower()}_[0-9]{{6}}$'],
+        )
+        for name, in cursor.fetchall():
+            cursor.execute(f'DROP SEQUENCE IF EXISTS {connection.ops.quote_name(name)}')
+
+
+class OrderNumberAllocator:
+    """Hands out today's order numbers of one store from reserved blocks; thread-safe."""
+
+    def __init__(self, store=None, using=DEFAULT_DB_ALIAS):
+        self.store = store or settings.ORDER_NUMBER_STORE
+        if not STORE_CODE.match(self.store):
+            raise ImproperlyConfigured('ORDER_NUMBER_STORE must be 1-6 uppercase letters or digits')
+        self.using = using
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._day = None
+        self._numbers = deque()
+        self._sequence_ready = False
+
+    def allocate(self, count=1):
+        """Return ``count`` new order numbers for today."""
+        if not count:
+            return []
+        day = timezone.localdate()
+        connection = connections[self.using]
+        with self._lock:
+            if day != self._day:
+                self._day, self._numbers, self._sequence_ready = day, deque(), False
+            if connection.vendor != 'postgresql' and connection.in_atomic_block:
+                # The counter row commits or rolls back with the caller's transaction: a cached
+                # remainder could outlive a rollback and be handed out again by another process.
+                take = min(count, len(self._numbers))
+                numbers = [self._numbers.popleft() for _ in range(take)]
+                numbers.extend(reserve_from_counter(connection, self.store, day, count - take))
+            else:
+                while len(self._numbers) < count:
+                    self._numbers.extend(self.reserve(connection, day, max(settings.ORDER_NUMBER_BLOCK_SIZE, count)))
+                numbers = [self._numbers.popleft() for _ in range(count)]
+        return [format_order_number(self.store, day, number) for number in numbers]
+
+    def reserve(self, connection, day, count):
+        if connection.vendor != 'postgresql':
+            return reserve_from_counter(connection, self.store, day, count)
+        name = sequence_name(self.store, day)
+        if not self._sequence_ready:
+            create_sequence(connection, name)
+            # Created inside the caller's transaction, it disappears again if that rolls back.
+            self._sequence_ready = not connection.in_atomic_block
+        return reserve_from_sequence(connection, name, count)
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def allocate_order_numbers(count=1, using=DEFAULT_DB_ALIAS):
+    """``count`` new numbers of ``ORDER_NUMBER_STORE`` from this process's shared allocator."""
+    key = (settings.ORDER_NUMBER_STORE, using)
+    with _allocators_lock:
+        if key not in _allocators:
+            _allocators[key] = OrderNumberAllocator(*key)
+        allocator = _allocators[key]
+    return allocator.allocate(count)
+
+
+def next_order_number(using=DEFAULT_DB_ALIAS):
+    return allocate_order_numbers(1, using)[0]
+
+
+def _forget_blocks():
+    # A forked worker (gunicorn --preload, multiprocessing) must not hand out its parent's block again.
+    global _allocators_lock
+    _allocators_lock = threading.Lock()
+    for allocator in _allocators.values():
+        allocator.reset()
+
+
+os.register_at_fork(after_in_child=_forget_blocks)
@@ -0,0 +1,106 @@
+from django.db import IntegrityError
+from rest_framework import serializers
+from belle_croissant.eager_loading import EagerLoadingMixin
+from customers.models import Customer
+from products.models import Product
+from .models import Order
+from .numbering import is_allocated_number
+from .services import create_orders_bulk
+
+NUMBER_TAKEN = 'Заказ с таким номером уже существует.'
+
+class OrderListSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'order_type', 'status',
+            'final_amount', 'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+class OrderTransitionSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    expected_status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+
+class OrderItemInputSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+class OrderInputSerializer(serializers.Serializer):
+    # Omitted numbers are allocated by orders.numbering.
+    order_number = serializers.CharField(max_length=20, required=False)
+    customer = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    order_type = serializers.ChoiceField(choices=Order.ORDER_TYPE_CHOICES, default='in_store')
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, default='completed')
+    discount_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, default=0)
+    notes = serializers.CharField(allow_blank=True, default='')
+    completed_at = serializers.DateTimeField(required=False, allow_null=True)
+    items = OrderItemInputSerializer(many=True, allow_empty=False)
+
+    def validate_order_number(self, value):
+        # Allocated numbers are handed out later without a uniqueness check of their own.
+        if is_allocated_number(value):
+            raise serializers.ValidationError(
+                'Номера вида <магазин>-<ГГММДД>-<номер> выдаются автоматически; не передавайте номер.'
+            )
+        return value
+
+class BulkOrderSerializer(serializers.Serializer):
+    orders = OrderInputSerializer(many=True, allow_empty=False)
+
+    def validate_orders(self, orders):
+        product_ids = {item['product'] for order in orders for item in order['items']}
+        customer_ids = {order['customer'] for order in orders if order.get('customer')}
+        numbers = [order['order_number'] for order in orders if 'order_number' in order]
+
+        products = Product.objects.in_bulk(product_ids) if product_ids else {}
+        customers = Customer.objects.in_bulk(customer_ids) if customer_ids else {}
+        taken = set(Order.objects.filter(order_number__in=numbers).values_list('order_number', flat=True))
+
+        seen = set()
+        errors = []
+        for order in orders:
+            order_errors = {}
+            number = order.get('order_number')
+            if number is not None and (number in taken or number in seen):
+                order_errors['order_number'] = [NUMBER_TAKEN]
+            seen.add(number)
+
+            if order.get('customer'):
+                if order['customer'] not in customers:
+                    order_errors['customer'] = ['Клиент не найден.']
+                else:
+                    order['customer'] = customers[order['customer']]
+
+            item_errors = []
+            for item in order['items']:
+                if item['product'] in products:
+                    item['product'] = products[item['product']]
+                    item_errors.append({})
+                else:
+                    item_errors.append({'product': ['Продукт не найден.']})
+            if any(item_errors):
+                order_errors['items'] = item_errors
+            else:
+                total = sum(item['product'].price * item['quantity'] for item in order['items'])
+                if order['discount_amount'] > total:
+                    order_errors['discount_amount'] = ['Скидка превышает сумму заказа.']
+            errors.append(order_errors)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return orders
+
+    def create(self, validated_data):
+        orders = validated_data['orders']
+        try:
+            return create_orders_bulk(orders)
+        except IntegrityError:
+            # Another import took one of the numbers between validate_orders() and the insert.
+            numbers = [order['order_number'] for order in orders if 'order_number' in order]
+            taken = set(Order.objects.filter(order_number__in=numbers).values_list('order_number', flat=True))
+            if not taken:
+                raise
+            raise serializers.ValidationError({'orders': [
+                {'order_number': [NUMBER_TAKEN]} if order.get('order_number') in taken else {} for order in orders
+            ]})
@@ -0,0 +1,60 @@
+from django.utils import timezone
+from belle_croissant.sqlite import atomic_write
+from customers.stats import apply_order_changes, order_state
+from .feed import publish_order_events
+from .models import Order, OrderItem
+from .numbering import allocate_order_numbers
+
+BULK_BATCH_SIZE = 1000
+
+
+def create_orders_bulk(orders_data, batch_size=BULK_BATCH_SIZE):
+    """Create validated orders with their items using bulk inserts in one transaction.
+
+    ``orders_data`` items carry resolved ``customer`` and ``product`` instances;
+    prices and totals are always taken from the catalogue, never from the client.
+    Customer statistics and the kitchen feed are updated in the same transaction.
+    """
+    now = timezone.now()
+    # Reserved outside the transaction below, so the counter is not locked for its duration.
+    numbers = iter(allocate_order_numbers(sum('order_number' not in data for data in orders_data)))
+    orders = []
+    items = []
+    for data in orders_data:
+        order = Order(
+            order_number=data.get('order_number') or next(numbers),
+            customer=data.get('customer'),
+            order_type=data['order_type'],
+            status=data['status'],
+            discount_amount=data['discount_amount'],
+            notes=data['notes'],
+            completed_at=data.get('completed_at') or (now if data['status'] == 'completed' else None),
+        )
+        order_items = [
+            OrderItem(
+                order=order,
+                product=item['product'],
+                quantity=item['quantity'],
+                unit_price=item['product'].price,
+                total_price=item['product'].price * item['quantity'],
+            )
+            for item in data['items']
+        ]
+        order.total_amount = sum(item.total_price for item in order_items)
+        order.final_amount = order.total_amount - order.discount_amount
+        orders.append(order)
+        items.extend(order_items)
+
+    with atomic_write():
+        Order.objects.bulk_create(orders, batch_size=batch_size)
+        if orders and orders[0].pk is None:
+            pks = dict(
+                Order.objects.filter(order_number__in=[order.order_number for order in orders])
+                .values_list('order_number', 'pk')
+            )
+            for order in orders:
+                order.pk = pks[order.order_number]
+        OrderItem.objects.bulk_create(items, batch_size=batch_size)
+        apply_order_changes((None, order_state(order)) for order in orders)
+        publish_order_events(orders, 'created')
+    return orders
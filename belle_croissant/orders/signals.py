@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+
+from .feed import publish_order_events
+from .models import Order
+
+
+def order_saved(sender, instance, created, **kwargs):
+    publish_order_events([instance], 'created' if created else 'updated')
+
+
+def order_deleted(sender, instance, **kwargs):
+    publish_order_events([instance], 'deleted')
+
+
+def connect_feed_signals():
+    # queryset.update()/bulk_create() bypass these; orders.transitions and
+    # orders.services publish their own events.
+    post_save.connect(order_saved, sender=Order, dispatch_uid='kitchen-feed-save')
+    post_delete.connect(order_deleted, sender=Order, dispatch_uid='kitchen-feed-delete')
@@ -1,3 +1,571 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from belle_croissant.eager_loading import plan_queryset
+from belle_croissant.exports import export_response
+from belle_croissant.sqlite import atomic_write
+from belle_croissant.pagination import KeysetPagination
+from customers.models import Customer, CustomerStats
+from products.models import Category, Product
+from .feed import CHANNEL, KitchenFeedApp, PostgresBroker, get_broker, order_stream
+from .models import ACTIVE_STATUSES, Order, OrderItem, OrderNumberCounter
+from .numbering import OrderNumberAllocator
+from .services import create_orders_bulk
+from .transitions import TransitionConflict, transition_order
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN parsing is backend specific')
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(
+            first_name='Анна', last_name='Иванова', email='anna@example.com', phone='+77011234567'
+        )
+        category = Category.objects.create(name='Выпечка')
+        cls.product = Product.objects.create(
+            name='Круассан', description='', category=category,
+            price=Decimal('2.50'), cost=Decimal('1.00')
+        )
+        cls.order = Order.objects.create(
+            order_number='P1', customer=cls.customer,
+            total_amount=Decimal('2.50'), final_amount=Decimal('2.50')
+        )
+        OrderItem.objects.create(
+            order=cls.order, product=cls.product, quantity=1,
+            unit_price=Decimal('2.50'), total_price=Decimal('2.50')
+        )
+
+    def hot_queries(self):
+        return {
+            'order list': Order.objects.all()[:20],
+            'order keyset page': Order.objects.filter(
+                KeysetPagination.seek_filter(['-created_at', '-pk'], [self.order.created_at, self.order.pk])
+            ).order_by('-created_at', '-pk')[:21],
+            'customer orders': Order.objects.filter(customer=self.customer)[:20],
+            'customer summary': Order.objects.filter(customer=self.customer).order_by(),
+            'order type list': Order.objects.filter(order_type='online')[:20],
+            'active queue': Order.objects.filter(status__in=ACTIVE_STATUSES).order_by('status', 'created_at'),
+            'order items': OrderItem.objects.filter(order=self.order),
+            'product sales': OrderItem.objects.filter(product=self.product),
+            'loyalty members': Customer.objects.filter(customer_type='loyalty'),
+        }
+
+    def assertNoFullScan(self, name, queryset):
+        plan = queryset.explain()
+        if connection.vendor == 'sqlite':
+            full_scans = [
+                line for line in plan.splitlines()
+                if ' SCAN ' in f' {line} ' and 'INDEX' not in line
+            ]
+        else:
+            full_scans = [line for line in plan.splitlines() if 'Seq Scan' in line]
+        self.assertFalse(full_scans, f'{name}: full table scan\n{plan}')
+
+    def test_hot_queries_use_indexes(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset in self.hot_queries().items():
+                with self.subTest(name):
+                    self.assertNoFullScan(name, queryset)
+
+
+class BulkOrderImportTests(APITestCase):
+    url = '/api/orders/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('pos', password='secret')
+        category = Category.objects.create(name='Выпечка')
+        cls.croissant = Product.objects.create(
+            name='Круассан', description='', category=category,
+            price=Decimal('2.50'), cost=Decimal('1.00')
+        )
+        cls.baguette = Product.objects.create(
+            name='Багет', description='', category=category,
+            price=Decimal('1.20'), cost=Decimal('0.40')
+        )
+        cls.customer = Customer.objects.create(
+            first_name='Анна', last_name='Иванова', email='anna@example.com', phone='+77011234567'
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def payload(self, count):
+        return {'orders': [
+            {
+                'order_number': f'POS-{i}',
+                'customer': self.customer.pk if i % 2 else None,
+                'discount_amount': '0.20',
+                'items': [
+                    {'product': self.croissant.pk, 'quantity': 2},
+                    {'product': self.baguette.pk, 'quantity': 1},
+                ],
+            }
+            for i in range(count)
+        ]}
+
+    def test_totals_are_computed_server_side(self):
+        response = self.client.post(self.url, self.payload(2), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        order = Order.objects.get(order_number='POS-1')
+        self.assertEqual(order.customer, self.customer)
+        self.assertEqual(order.total_amount, Decimal('6.20'))
+        self.assertEqual(order.final_amount, Decimal('6.00'))
+        self.assertEqual(order.status, 'completed')
+        self.assertIsNotNone(order.completed_at)
+        self.assertEqual(
+            sorted(order.items.values_list('unit_price', 'total_price')),
+            [(Decimal('1.20'), Decimal('1.20')), (Decimal('2.50'), Decimal('5.00'))]
+        )
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def count_queries(batch):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(self.url, batch, format='json')
+            self.assertEqual(response.status_code, 201)
+            return len(ctx.captured_queries)
+
+        small = self.payload(3)
+        large = self.payload(60)
+        for order in large['orders']:
+            order['order_number'] += '-L'
+        self.assertEqual(count_queries(small), count_queries(large))
+
+    def test_number_taken_after_validation_is_a_400(self):
+        def racing_import(orders_data):
+            # A second terminal commits the same number between the pre-check and the insert.
+            Order.objects.create(order_number='POS-1', total_amount=0, final_amount=0)
+            return create_orders_bulk(orders_data)
+
+        with mock.patch('orders.serializers.create_orders_bulk', side_effect=racing_import):
+            response = self.client.post(self.url, self.payload(2), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['orders'], [{}, {'order_number': ['Заказ с таким номером уже существует.']}])
+        self.assertEqual(list(Order.objects.values_list('order_number', flat=True)), ['POS-1'])
+
+    def test_invalid_batch_is_rejected_as_a_whole(self):
+        Order.objects.create(order_number='POS-0', total_amount=0, final_amount=0)
+        payload = self.payload(3)
+        payload['orders'][1]['items'][0]['product'] = 999999
+        payload['orders'][2]['order_number'] = 'POS-1'
+        payload['orders'][2]['discount_amount'] = '100.00'
+
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['orders']
+        self.assertIn('order_number', errors[0])
+        self.assertIn('product', errors[1]['items'][0])
+        self.assertEqual(set(errors[2]), {'order_number', 'discount_amount'})
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrderExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('accountant', password='secret')
+        category = Category.objects.create(name='Выпечка')
+        product = Product.objects.create(
+            name='Круассан', description='', category=category,
+            price=Decimal('2.50'), cost=Decimal('1.00')
+        )
+        for number in range(3):
+            order = Order.objects.create(
+                order_number=f'X{number}', status='completed',
+                total_amount=Decimal('5.00'), final_amount=Decimal('5.00')
+            )
+            OrderItem.objects.create(
+                order=order, product=product, quantity=2,
+                unit_price=Decimal('2.50'), total_price=Decimal('5.00')
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_export_streams_one_object_per_line(self):
+        response = self.client.get('/api/orders/export/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['order_number'] for line in lines], ['X0', 'X1', 'X2'])
+        self.assertEqual(json.loads(lines[0])['final_amount'], '5.00')
+
+    def test_csv_item_export_includes_header(self):
+        response = self.client.get('/api/orders/items/export/', {'as': 'csv'})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['id', 'order_id', 'order__order_number'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][4], 'Круассан')
+
+    def test_date_range_and_invalid_params(self):
+        response = self.client.get('/api/orders/export/', {'until': '2000-01-01'})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        self.assertEqual(self.client.get('/api/orders/export/', {'as': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/export/', {'since': 'вчера'}).status_code, 400)
+
+    async def test_asgi_requests_get_an_async_stream(self):
+        request = AsyncRequestFactory().get('/api/orders/export/')
+        response = export_response(request, Order.objects.order_by('pk'), ['order_number'], 'ndjson', 'orders')
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual([json.loads(line)['order_number'] for line in body.splitlines()], ['X0', 'X1', 'X2'])
+        self.assertFalse(export_response(RequestFactory().get('/'), Order.objects.all(), ['id'], 'csv', 'o').is_async)
+
+
+class OrderTransitionTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('kitchen', password='secret')
+        self.client.force_authenticate(self.user)
+        self.customer = Customer.objects.create(
+            first_name='Анна', last_name='Иванова', email='anna@example.com', phone='+77011234567'
+        )
+        self.order = Order.objects.create(
+            order_number='K1', customer=self.customer, total_amount=Decimal('8.00'), final_amount=Decimal('8.00')
+        )
+        self.url = f'/api/orders/{self.order.pk}/transition/'
+
+    def test_walks_the_kitchen_queue(self):
+        for target in ('preparing', 'ready', 'completed'):
+            response = self.client.post(self.url, {'status': target})
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertEqual(response.data['status'], target)
+        self.order.refresh_from_db()
+        self.assertIsNotNone(self.order.completed_at)
+        self.assertGreater(self.order.updated_at, self.order.created_at)
+        self.assertEqual(CustomerStats.objects.get(customer=self.customer).orders_count, 1)
+
+    def test_invalid_transition_and_conflict_are_reported(self):
+        response = self.client.post(self.url, {'status': 'completed'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['allowed'], ['preparing', 'cancelled'])
+
+        self.client.post(self.url, {'status': 'preparing'})
+        # A second screen still showing "pending" tries to cancel.
+        response = self.client.post(self.url, {'status': 'cancelled', 'expected_status': 'pending'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], 'preparing')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'preparing')
+
+        self.assertEqual(self.client.post('/api/orders/0/transition/', {'status': 'ready'}).status_code, 404)
+        self.assertEqual(self.client.post(self.url, {'status': 'lost'}).status_code, 400)
+
+
+class ConcurrentTransitionTests(TransactionTestCase):
+    orders = 5
+    workers = 8
+
+    def test_racing_screens_move_each_order_once_per_step(self):
+        order_ids = [
+            Order.objects.create(order_number=f'R{i}', total_amount=Decimal('1.00'), final_amount=Decimal('1.00')).pk
+            for i in range(self.orders)
+        ]
+        outcomes = Counter()
+        completed_at = {}
+        lock = threading.Lock()
+
+        def screen(worker):
+            try:
+                # Half the screens cancel instead of finishing the order.
+                path = ['preparing', 'ready', 'cancelled' if worker % 2 else 'completed']
+                for order_id in order_ids:
+                    for expected, target in zip(['pending'] + path, path):
+                        for _ in range(200):
+                            try:
+                                order = transition_order(order_id, target, expected)
+                                result = 'ok'
+                                if target == 'completed':
+                                    completed_at[order_id] = order.completed_at
+                                break
+                            except TransitionConflict:
+                                result = 'conflict'
+                                break
+                            except OperationalError:
+                                # SQLite reports lock contention instead of waiting; retry.
+                                time.sleep(0.005)
+                        else:
+                            result = 'gave up'
+                        with lock:
+                            outcomes[result, target] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=screen, args=(worker,)) for worker in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes['gave up', 'preparing'] + outcomes['gave up', 'ready'], 0)
+        self.assertEqual(outcomes['ok', 'preparing'], self.orders)
+        self.assertEqual(outcomes['ok', 'ready'], self.orders)
+        self.assertEqual(outcomes['ok', 'completed'] + outcomes['ok', 'cancelled'], self.orders)
+        for order in Order.objects.filter(pk__in=order_ids):
+            self.assertIn(order.status, ('completed', 'cancelled'))
+            if order.status == 'completed':
+                self.assertEqual(order.completed_at, completed_at[order.pk])
+            else:
+                self.assertIsNone(order.completed_at)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite tuning')
+class SqliteWriteTransactionTests(TransactionTestCase):
+    def test_connections_are_tuned_and_writes_begin_immediate(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+        with CaptureQueriesContext(connection) as ctx:
+            Order.objects.create(order_number='W1', total_amount=Decimal('1.00'), final_amount=Decimal('1.00'))
+            with atomic_write():
+                with atomic_write():
+                    Order.objects.filter(order_number='W1').update(status='preparing')
+        statements = [query['sql'] for query in ctx.captured_queries]
+        self.assertEqual(statements.count('BEGIN IMMEDIATE'), 2)
+        self.assertEqual(sum(sql.startswith('SAVEPOINT') for sql in statements), 1)
+
+
+@override_settings(ORDER_NUMBER_STORE='K1')
+class OrderNumberTests(APITestCase):
+    def test_orders_without_a_number_get_one(self):
+        pattern = rf'^K1-{timezone.localdate():%y%m%d}-\d{{5}}$'
+        first = Order.objects.create(total_amount=Decimal('1.00'), final_amount=Decimal('1.00'))
+        second = Order.objects.create(total_amount=Decimal('1.00'), final_amount=Decimal('1.00'))
+        self.assertRegex(first.order_number, pattern)
+        self.assertNotEqual(first.order_number, second.order_number)
+
+        user = get_user_model().objects.create_user('pos')
+        category = Category.objects.create(name='Выпечка')
+        product = Product.objects.create(
+            name='Круассан', description='', category=category, price=Decimal('2.50'), cost=Decimal('1.00')
+        )
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/orders/bulk/', {'orders': [
+            {'items': [{'product': product.pk, 'quantity': 1}]},
+            {'order_number': 'POS-1', 'items': [{'product': product.pk, 'quantity': 1}]},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        allocated, given = [order['order_number'] for order in response.data['orders']]
+        self.assertRegex(allocated, pattern)
+        self.assertEqual(given, 'POS-1')
+
+        # A client number in the allocated shape could collide with a later handout.
+        response = self.client.post('/api/orders/bulk/', {'orders': [
+            {'order_number': f'K1-{timezone.localdate():%y%m%d}-99999', 'items': [{'product': product.pk, 'quantity': 1}]},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('order_number', response.data['orders'][0])
+
+
+@override_settings(ORDER_NUMBER_BLOCK_SIZE=10)
+class OrderNumberBlockTests(TransactionTestCase):
+    def test_blocks_are_reserved_per_round_trip_and_restart_daily(self):
+        today = timezone.localdate()
+        allocator = OrderNumberAllocator('K2')
+        with self.assertNumQueries(1):
+            numbers = [allocator.allocate()[0] for _ in range(10)]
+        self.assertEqual(numbers, [f'K2-{today:%y%m%d}-{n:05d}' for n in range(1, 11)])
+        # Another process gets the next block.
+        self.assertEqual(OrderNumberAllocator('K2').allocate(), [f'K2-{today:%y%m%d}-00011'])
+
+        tomorrow = today + timedelta(days=1)
+        with mock.patch('orders.numbering.timezone.localdate', return_value=tomorrow):
+            self.assertEqual(allocator.allocate(), [f'K2-{tomorrow:%y%m%d}-00001'])
+        self.assertEqual(OrderNumberCounter.objects.filter(store='K2').count(), 2)
+
+    @skipUnless(connection.vendor == 'sqlite', 'counter table')
+    def test_numbers_reserved_in_a_rolled_back_transaction_are_not_cached(self):
+        allocator = OrderNumberAllocator('K3')
+        with transaction.atomic():
+            reserved = allocator.allocate(2)
+            transaction.set_rollback(True)
+        self.assertEqual(allocator.allocate(2), reserved)
+
+
+@skipUnless(
+    connection.vendor == 'sqlite' and 'fork' in multiprocessing.get_all_start_methods(),
+    'forked processes need a database file',
+)
+class OrderNumberStressTests(SimpleTestCase):
+    alias = 'order_numbers_stress'
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.settings[self.alias] = {**connections.settings['default'], 'NAME': os.path.join(directory, 'db')}
+        self.addCleanup(connections.settings.pop, self.alias)
+        self.addCleanup(connections.__delitem__, self.alias)
+        self.addCleanup(connections[self.alias].close)
+        with connections[self.alias].schema_editor() as editor:
+            editor.create_model(OrderNumberCounter)
+
+    def test_processes_never_hand_out_the_same_number(self):
+        out = io.StringIO()
+        call_command(
+            'stress_order_numbers', processes=4, allocations=300, block_size=7, database=self.alias, stdout=out,
+        )
+        self.assertIn('1200 номеров в 4 процессах', out.getvalue())
+        self.assertIn('повторов 0', out.getvalue())
+
+
+class KitchenFeedTests(TestCase):
+    def commit(self, func, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            return func(*args)
+
+    async def test_stream_sends_snapshot_then_committed_changes(self):
+        order = await sync_to_async(self.commit)(
+            lambda: Order.objects.create(order_number='F1', total_amount=Decimal('3.00'), final_amount=Decimal('3.00'))
+        )
+        stream = order_stream(heartbeat=0.05, max_age=5)
+        self.assertEqual(await anext(stream), 'retry: 3000\n\n')
+        event, data = (await anext(stream)).split('\n', 1)
+        self.assertEqual(event, 'event: snapshot')
+        self.assertEqual([row['order_number'] for row in json.loads(data[len('data: '):])], ['F1'])
+
+        self.assertEqual(await anext(stream), ': ping\n\n')
+        await sync_to_async(self.commit)(transition_order, order.pk, 'preparing')
+        event, data = (await anext(stream)).split('\n', 1)
+        self.assertEqual(event, 'event: status')
+        self.assertEqual(json.loads(data[len('data: '):])['status'], 'preparing')
+
+        await stream.aclose()
+        self.assertEqual(get_broker().subscriptions, set())
+
+    def test_bulk_import_publishes_only_active_orders(self):
+        with mock.patch.object(get_broker(), 'send') as send:
+            create_orders_bulk([
+                {'order_number': f'FB{i}', 'order_type': 'in_store', 'status': order_status,
+                 'discount_amount': Decimal('0'), 'notes': '', 'items': []}
+                for i, order_status in enumerate(['completed', 'pending', 'cancelled', 'preparing'])
+            ])
+        [(events,), _] = send.call_args
+        self.assertEqual([event['order_number'] for event in events], ['FB1', 'FB3'])
+
+    def test_postgres_broker_notifies_a_batch_in_one_statement(self):
+        events = [{'id': 1, 'event': 'created'}, {'id': 2, 'event': 'created'}]
+        with mock.patch('orders.feed.connections') as conns:
+            PostgresBroker().send(events)
+        cursor = conns['default'].cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with(
+            'SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload',
+            [CHANNEL, [json.dumps(event) for event in events]],
+        )
+
+    def test_endpoint_requires_login_and_streams(self):
+        self.assertEqual(self.client.get('/api/kitchen/feed/').status_code, 403)
+        self.client.force_login(get_user_model().objects.create_user('kitchen', password='secret'))
+        self.commit(
+            lambda: Order.objects.create(order_number='F2', total_amount=Decimal('3.00'), final_amount=Decimal('3.00'))
+        )
+        response = self.client.get('/api/kitchen/feed/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        # Chunks arrive one at a time, not collected until the stream ends.
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b'retry: 3000\n\n')
+        self.assertIn(b'"order_number": "F2"', next(chunks))
+        self.assertEqual(len(get_broker().subscriptions), 1)
+        response.close()
+        self.assertEqual(get_broker().subscriptions, set())
+        self.assertEqual(self.client.post('/api/kitchen/feed/').status_code, 405)
+
+    async def test_asgi_app_streams_until_the_client_disconnects(self):
+        async def django_app(scope, receive, send):
+            sent.append('django')
+
+        app, sent, inbox = KitchenFeedApp(django_app), [], asyncio.Queue()
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/kitchen/feed/', 'headers': []}
+
+        async def send(message):
+            sent.append(message)
+
+        await app({**scope, 'path': '/api/orders/'}, inbox.get, send)
+        await app(scope, inbox.get, send)
+        self.assertEqual(sent[0], 'django')
+        self.assertEqual(sent[1]['status'], 403)
+
+        await sync_to_async(self.client.force_login)(
+            await get_user_model().objects.acreate(username='kitchen')
+        )
+        cookie = f'sessionid={self.client.cookies["sessionid"].value}'.encode()
+        sent.clear()
+        task = asyncio.ensure_future(app({**scope, 'headers': [(b'cookie', cookie)]}, inbox.get, send))
+        while len(sent) < 3:
+            await asyncio.sleep(0.01)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertTrue(sent[2]['body'].startswith(b'event: snapshot'))
+        self.assertEqual(len(get_broker().subscriptions), 1)
+
+        await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(get_broker().subscriptions, set())
+
+
+class NestedItemSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name')
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product_name', 'quantity', 'total_price']
+
+
+class NestedOrderSerializer(serializers.ModelSerializer):
+    items = NestedItemSerializer(many=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'order_number', 'customer', 'items']
+
+
+class EagerLoadingPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Выпечка')
+        products = [
+            Product.objects.create(
+                name=f'Продукт {i}', description='', category=category,
+                price=Decimal('1.00'), cost=Decimal('0.50')
+            )
+            for i in range(3)
+        ]
+        for number in range(4):
+            order = Order.objects.create(order_number=f'N{number}', total_amount=0, final_amount=0)
+            for product in products:
+                OrderItem.objects.create(
+                    order=order, product=product, quantity=1,
+                    unit_price=Decimal('1.00'), total_price=Decimal('1.00')
+                )
+
+    def test_nested_to_many_and_dotted_sources_are_planned(self):
+        queryset = plan_queryset(Order.objects.all(), NestedOrderSerializer)
+        with self.assertNumQueries(2):
+            data = NestedOrderSerializer(queryset, many=True).data
+        self.assertEqual(len(data), 4)
+        self.assertEqual(len(data[0]['items']), 3)
+        self.assertTrue(data[0]['items'][0]['product_name'].startswith('Продукт'))
\ No newline at end of file
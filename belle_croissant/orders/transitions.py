@@ -0,0 +1,78 @@
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+
+from belle_croissant.sqlite import atomic_write
+from customers.stats import apply_order_changes, order_state
+from .feed import publish_order_events
+from .models import Order
+
+# Allowed moves of Order.status; completed and cancelled are final.
+TRANSITIONS = {
+    'pending': ('preparing', 'cancelled'),
+    'preparing': ('ready', 'cancelled'),
+    'ready': ('completed', 'cancelled'),
+    'completed': (),
+    'cancelled': (),
+}
+
+
+class InvalidTransition(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'invalid_transition'
+
+    def __init__(self, current, target):
+        super().__init__({
+            'detail': f'Нельзя перевести заказ из статуса «{current}» в «{target}».',
+            'status': current,
+            'allowed': list(TRANSITIONS[current]),
+        })
+
+
+class TransitionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_code = 'conflict'
+
+    def __init__(self, expected, current):
+        super().__init__({
+            'detail': f'Статус заказа уже изменён: ожидался «{expected}», сейчас «{current}».',
+            'expected': expected,
+            'status': current,
+        })
+
+
+def _current_status(order_id):
+    current = Order.objects.filter(pk=order_id).values_list('status', flat=True).first()
+    if current is None:
+        raise NotFound('Заказ не найден.')
+    return current
+
+
+def transition_order(order_id, target, expected=None):
+    """Move order ``order_id`` to ``target`` with ``UPDATE ... WHERE status = expected``.
+
+    ``expected`` is the status the caller saw (a kitchen screen sends what it
+    displays); without it the current status is read first. No row lock is
+    held: if another writer moved the order in between, the UPDATE matches
+    nothing and ``TransitionConflict`` (409) reports the status that won.
+    ``completed_at`` is written only by the transition into ``completed``;
+    customer statistics and the kitchen feed are updated in the same
+    transaction. Returns the updated order.
+    """
+    if expected is None:
+        expected = _current_status(order_id)
+    if target not in TRANSITIONS.get(expected, ()):
+        raise InvalidTransition(expected, target)
+
+    now = timezone.now()
+    changes = {'status': target, 'updated_at': now}
+    if target == 'completed':
+        changes['completed_at'] = now
+    with atomic_write():
+        if not Order.objects.filter(pk=order_id, status=expected).update(**changes):
+            raise TransitionConflict(expected, _current_status(order_id))
+        order = Order.objects.get(pk=order_id)
+        before = (order.customer_id, expected, order.final_amount, order.created_at)
+        apply_order_changes([(before, order_state(order))])
+        publish_order_events([order], 'status')
+    return order
@@ -1,3 +1,80 @@
-from django.shortcuts import render
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from belle_croissant.async_views import AsyncReadView
+from belle_croissant.eager_loading import EagerLoadingViewSetMixin
+from belle_croissant.exports import export_response, parse_export_params
+from .exports import order_items_export, orders_export
+from .feed import sync_order_stream
+from .models import Order
+from .serializers import BulkOrderSerializer, OrderListSerializer, OrderTransitionSerializer
+from .transitions import transition_order
 
-# Create your views here.
+class OrderViewSet(EagerLoadingViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Order.objects.all()
+    serializer_class = OrderListSerializer
+    # transition: status read, conditional UPDATE, reload, stats upsert (2) plus savepoints.
+    query_budget = {'list': 2, 'retrieve': 1, 'transition': 9}
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        serializer = BulkOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        orders = serializer.save()
+        return Response(
+            {
+                'created': len(orders),
+                'orders': [
+                    {'id': order.pk, 'order_number': order.order_number, 'final_amount': order.final_amount}
+                    for order in orders
+                ],
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['post'])
+    def transition(self, request, pk=None):
+        params = OrderTransitionSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        if not str(pk).isdigit():
+            raise NotFound('Заказ не найден.')
+        order = transition_order(int(pk), params.validated_data['status'], params.validated_data.get('expected_status'))
+        return Response(OrderListSerializer(order).data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        fmt, since, until = parse_export_params(request.query_params)
+        queryset, columns = orders_export(since, until)
+        return export_response(request, queryset, columns, fmt, 'orders')
+
+    @action(detail=False, methods=['get'], url_path='items/export')
+    def export_items(self, request):
+        fmt, since, until = parse_export_params(request.query_params)
+        queryset, columns = order_items_export(since, until)
+        return export_response(request, queryset, columns, fmt, 'order_items')
+
+
+class OrderAsyncView(AsyncReadView):
+    queryset = Order.objects.all()
+    serializer_class = OrderListSerializer
+
+
+@require_GET
+def kitchen_feed(request):
+    """Server-sent events for kitchen screens (``EventSource('/api/kitchen/feed/')``).
+
+    Under ``belle_croissant.asgi`` this path is served by
+    :class:`orders.feed.KitchenFeedApp`, which holds hundreds of idle screens
+    per worker without a thread each. This view covers ``runserver``/WSGI,
+    where every open stream occupies a worker thread.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Учетные данные не были предоставлены.'}, status=403)
+    response = StreamingHttpResponse(sync_order_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from belle_croissant.db_routers import read_from_replicas
+from .images import variant_urls
+from .models import Category, Product
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses a version whose body is still cached.
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        return catalog_version()
+
+
+def invalidate_catalog():
+    """Bump the version once the current transaction commits.
+
+    Bumping earlier would let a concurrent request rebuild the new version
+    from rows that are not committed yet and cache the stale menu under it.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_etag(version):
+    return f'"catalog-{version}"'
+
+
+def build_catalog():
+    categories = {
+        category['id']: {**category, 'products': []}
+        for category in Category.objects.order_by('name').values('id', 'name', 'description')
+    }
+    products = Product.objects.order_by('category', 'name').values_list(
+        'id', 'category_id', 'name', 'description', 'price', 'is_available', 'preparation_time', 'image',
+        'image_variants',
+    )
+    for pk, category_id, name, description, price, is_available, preparation_time, image, variants in products:
+        categories[category_id]['products'].append({
+            'id': pk,
+            'name': name,
+            'description': description,
+            'price': price,
+            'is_available': is_available,
+            'preparation_time': preparation_time,
+            'image': default_storage.url(image) if image else None,
+            'image_variants': variant_urls(image, variants),
+        })
+    return {'categories': list(categories.values())}
+
+
+def get_catalog():
+    """Return ``(version, json_bytes)`` for the current menu, building it on a miss.
+
+    The body is built from the primary: a lagging replica would cache the menu
+    from before the change under the version bumped for it.
+    """
+    version = catalog_version()
+    key = f'catalog:body:{version}'
+    body = cache.get(key)
+    if body is None:
+        with read_from_replicas(False):
+            body = DjangoJSONEncoder(ensure_ascii=False).encode(build_catalog()).encode('utf-8')
+        cache.set(key, body, settings.CATALOG_CACHE_TIMEOUT)
+    return version, body
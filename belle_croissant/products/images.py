@@ -0,0 +1,154 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+from belle_croissant.sqlite import atomic_write
+from .models import Product
+from .thumbnails import FORMATS, render_variants
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'products/variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def process_pool(workers):
+    # spawn, not fork: a child forked from a threaded server can inherit a lock held by another thread and hang.
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def get_executor(replace=None):
+    """The shared pool; pass a broken pool as ``replace`` to start a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor is replace:
+            _executor = process_pool(settings.PRODUCT_IMAGE_WORKERS)
+        return _executor
+
+
+def variant_urls(image, variants):
+    """Public URLs of the variants, or None while they are missing or were rendered from another image."""
+    if not image or not variants or variants.get('source') != image:
+        return None
+    return {
+        name: {key: default_storage.url(value) if key in FORMATS else value for key, value in variant.items()}
+        for name, variant in variants['variants'].items()
+    }
+
+
+def store_variants(rendered):
+    """Write the rendered files under content-hashed names; returns the ``variants`` mapping."""
+    variants = {}
+    for name, variant in rendered.items():
+        stored = {'width': variant['width'], 'height': variant['height']}
+        for fmt, (digest, data) in variant['files'].items():
+            path = f'{VARIANTS_DIR}/{name}-{digest}.{FORMATS[fmt][0]}'
+            # Same name means same bytes, so an existing file is reused as is.
+            stored[fmt] = path if default_storage.exists(path) else default_storage.save(path, ContentFile(data))
+        variants[name] = stored
+    return variants
+
+
+def save_variants(pk, source, rendered):
+    variants = {'source': source, 'variants': store_variants(rendered)}
+    with atomic_write():
+        # Skip the result if the image was replaced while it was rendering; that upload has its own job.
+        product = Product.objects.select_for_update().filter(pk=pk, image=source).first()
+        if product is None:
+            return False
+        product.image_variants = variants
+        # Through save() so the catalog signals see it.
+        product.save(update_fields=['image_variants'])
+    return True
+
+
+def read_source(name):
+    with default_storage.open(name, 'rb') as file:
+        return file.read()
+
+
+def generate_variants(pk, source):
+    """Render and store the variants of one product image in this process."""
+    return save_variants(pk, source, render_variants(read_source(source), settings.PRODUCT_IMAGE_VARIANTS))
+
+
+def schedule_variants(pk, source):
+    """Render in the worker pool and store the result when it is ready.
+
+    With ``PRODUCT_IMAGE_WORKERS = 0`` the variants are rendered right away
+    in the calling thread.
+    """
+    if not settings.PRODUCT_IMAGE_WORKERS:
+        generate_variants(pk, source)
+        return
+
+    def done(future):
+        # Runs on the pool's result thread, which has its own database connection.
+        try:
+            save_variants(pk, source, future.result())
+        except Exception:
+            logger.exception('Could not generate image variants of product %s (%s)', pk, source)
+        finally:
+            connections.close_all()
+
+    data, executor = read_source(source), get_executor()
+    try:
+        future = executor.submit(render_variants, data, settings.PRODUCT_IMAGE_VARIANTS)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory on a huge upload); later jobs get a new pool.
+        future = get_executor(replace=executor).submit(render_variants, data, settings.PRODUCT_IMAGE_VARIANTS)
+    future.add_done_callback(done)
+
+
+def image_changed(product):
+    return bool(product.image) and (product.image_variants or {}).get('source') != product.image.name
+
+
+def queue_variants(product):
+    """Schedule variants for a newly uploaded image once the upload commits."""
+    if image_changed(product):
+        pk, source = product.pk, product.image.name
+        transaction.on_commit(lambda: schedule_variants(pk, source))
+
+
+def regenerate_variants(products, workers):
+    """Render the variants of ``(pk, image name)`` pairs on ``workers`` processes.
+
+    Yields ``(pk, error)`` per product as it finishes; ``error`` is None on
+    success. At most two images per worker are held in memory at a time.
+    """
+    products = iter(products)
+    pending, exhausted = {}, False
+    with process_pool(workers) as pool:
+        while True:
+            while not exhausted and len(pending) < workers * 2:
+                item = next(products, None)
+                if item is None:
+                    exhausted = True
+                    break
+                try:
+                    data = read_source(item[1])
+                except OSError as exc:
+                    yield item[0], exc
+                    continue
+                pending[pool.submit(render_variants, data, settings.PRODUCT_IMAGE_VARIANTS)] = item
+            if not pending:
+                return
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pk, source = pending.pop(future)
+                try:
+                    save_variants(pk, source, future.result())
+                except Exception as exc:
+                    yield pk, exc
+                else:
+                    yield pk, None
@@ -0,0 +1,35 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.images import regenerate_variants
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Пересоздать варианты изображений продуктов (thumb, card, full) параллельно на всех ядрах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='процессов (по умолчанию все ядра)')
+        parser.add_argument('--all', action='store_true', help='в том числе продукты с актуальными вариантами')
+        parser.add_argument('--product', type=int, nargs='+', help='только эти продукты')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').order_by('pk')
+        if options['product']:
+            products = products.filter(pk__in=options['product'])
+        jobs = [
+            (pk, image) for pk, image, variants in products.values_list('pk', 'image', 'image_variants')
+            if options['all'] or (variants or {}).get('source') != image
+        ]
+
+        start = time.perf_counter()
+        failed = 0
+        for pk, error in regenerate_variants(jobs, max(1, options['workers'])):
+            if error is not None:
+                failed += 1
+                self.stderr.write(f'Продукт {pk}: {error}')
+        self.stdout.write(f'Обработано изображений: {len(jobs) - failed} за {time.perf_counter() - start:.1f} с')
+        if failed:
+            raise CommandError(f'Не удалось обработать: {failed}')
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:08
+
+from django.db import migrations, models
+from django.db.models.functions import Round
+
+
+def fill_margin(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Product.objects.using(schema_editor.connection.alias).update(margin=Round(models.F('price') - models.F('cost'), 2))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='margin',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Маржа'),
+        ),
+        migrations.RunPython(fill_margin, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['margin', 'id'], name='product_margin_keyset_idx'),
+        ),
+    ]
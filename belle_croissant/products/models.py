@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.db import models
 
 class Category(models.Model):
@@ -21,8 +23,12 @@ class Product(models.Model):
         verbose_name='Категория'
     )
     price = models.DecimalField('Цена', max_digits=10, decimal_places=2)
+    # Recomputed from the recipe by inventory.costing for products that have one.
     cost = models.DecimalField('Себестоимость', max_digits=10, decimal_places=2)
+    margin = models.DecimalField('Маржа', max_digits=10, decimal_places=2, default=0, editable=False)
     image = models.ImageField('Изображение', upload_to='products/', blank=True)
+    # {'source': image name, 'variants': {name: {'width', 'height', format: file name}}}, see products.images.
+    image_variants = models.JSONField('Варианты изображения', default=dict, blank=True, editable=False)
     is_available = models.BooleanField('В наличии', default=True)
     preparation_time = models.IntegerField('Время приготовления (мин)', default=0)
     created_at = models.DateTimeField('Создано', auto_now_add=True)
@@ -32,6 +38,16 @@ class Product(models.Model):
         verbose_name = 'Продукт'
         verbose_name_plural = 'Продукты'
         ordering = ['category', 'name']
+        indexes = [
+            models.Index(fields=['margin', 'id'], name='product_margin_keyset_idx'),
+        ]
     
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.margin = Decimal(self.price) - Decimal(self.cost)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'cost'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'margin'}
+        super().save(*args, **kwargs)
\ No newline at end of file
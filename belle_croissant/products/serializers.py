@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+from rest_framework import serializers
+from belle_croissant.eager_loading import EagerLoadingMixin
+from .images import variant_urls
+from .models import Category, Product
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'description']
+
+class ProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'description', 'category', 'price', 'cost', 'image', 'image_variants',
+            'is_available', 'preparation_time', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def get_image_variants(self, product):
+        return variant_urls(product.image.name, product.image_variants)
+
+
+class ProductMarginSerializer(serializers.ModelSerializer):
+    margin_percent = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'category', 'price', 'cost', 'margin', 'margin_percent']
+        read_only_fields = fields
+
+    def get_margin_percent(self, product):
+        return (product.margin * 100 / product.price).quantize(Decimal('0.1')) if product.price else None
+
+
+class MarginParamsSerializer(serializers.Serializer):
+    ordering = serializers.ChoiceField(choices=['margin', '-margin'], default='margin')
+    category = serializers.IntegerField(min_value=1, required=False)
+    max_margin = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
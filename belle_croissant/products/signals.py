@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+
+from inventory.models import ProductIngredient
+from .catalog import invalidate_catalog
+from .images import queue_variants
+from .models import Category, Product
+
+
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+def product_saved(sender, instance, **kwargs):
+    queue_variants(instance)
+
+
+def connect_catalog_signals():
+    # queryset.update()/bulk_create() bypass these; call invalidate_catalog() after them.
+    for model in (Category, Product, ProductIngredient):
+        post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog-save-{model.__name__}')
+        post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog-delete-{model.__name__}')
+    post_save.connect(product_saved, sender=Product, dispatch_uid='product-image-variants')
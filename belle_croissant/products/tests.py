@@ -1,3 +1,190 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from inventory.models import Ingredient, ProductIngredient
+from .catalog import catalog_version
+from .images import save_variants
+from .models import Category, Product
+from .thumbnails import render_variants
+
+
+class CatalogCacheTestsMixin:
+    url = '/api/catalog/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bread = Category.objects.create(name='Хлеб')
+        cls.pastry = Category.objects.create(name='Выпечка')
+        cls.croissant = Product.objects.create(
+            name='Круассан', description='', category=cls.pastry,
+            price=Decimal('2.50'), cost=Decimal('1.00')
+        )
+        Product.objects.create(
+            name='Багет', description='', category=cls.bread,
+            price=Decimal('1.20'), cost=Decimal('0.40'), is_available=False
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_menu_is_grouped_and_served_from_cache(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        categories = response.json()['categories']
+        self.assertEqual([c['name'] for c in categories], ['Выпечка', 'Хлеб'])
+        self.assertEqual(categories[0]['products'][0]['price'], '2.50')
+        self.assertIs(categories[1]['products'][0]['is_available'], False)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_bump_version_after_commit(self):
+        first = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.croissant.price = Decimal('2.70')
+            self.croissant.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()['categories'][0]['products'][0]['price'], '2.70')
+
+    def test_recipe_and_category_changes_invalidate(self):
+        ingredient = Ingredient.objects.create(
+            name='Масло', unit='kg', current_stock=10, min_stock=1, max_stock=20, cost_per_unit=5
+        )
+        for change in (
+            lambda: ProductIngredient.objects.create(product=self.croissant, ingredient=ingredient, quantity=Decimal('0.05')),
+            lambda: Category.objects.create(name='Напитки'),
+            lambda: Product.objects.filter(name='Багет').get().delete(),
+        ):
+            version = catalog_version()
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertGreater(catalog_version(), version)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class LocMemCatalogCacheTests(CatalogCacheTestsMixin, APITestCase):
+    pass
+
+
+class FileBasedCatalogCacheTests(CatalogCacheTestsMixin, APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.cache_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cls.cache_dir,
+        }})
+        cls.cache_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.cache_override.disable()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+
+def png_bytes(size, color=(200, 120, 40, 128)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(PRODUCT_IMAGE_WORKERS=0)
+class ProductImageVariantTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('baker')
+        cls.category = Category.objects.create(name='Выпечка')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_upload_renders_variants_exposed_by_api_and_catalog(self):
+        upload = SimpleUploadedFile('croissant.png', png_bytes((800, 600)), content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/products/', {
+                'name': 'Круассан', 'description': 'Слоёный', 'category': self.category.pk,
+                'price': '2.50', 'cost': '1.00', 'image': upload,
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        product = self.client.get(f"/api/products/{response.json()['id']}/").json()
+        variants = product['image_variants']
+        self.assertEqual(
+            {name: (v['width'], v['height']) for name, v in variants.items()},
+            {'thumb': (160, 120), 'card': (480, 360), 'full': (800, 600)},
+        )
+        self.assertRegex(variants['thumb']['webp'], r'^/media/products/variants/thumb-[0-9a-f]{16}\.webp$')
+        with default_storage.open(variants['card']['jpeg'].removeprefix('/media/')) as file:
+            image = Image.open(file)
+            self.assertEqual((image.format, image.mode, image.size), ('JPEG', 'RGB', (480, 360)))
+
+        catalog = self.client.get('/api/catalog/').json()
+        self.assertEqual(catalog['categories'][0]['products'][0]['image_variants'], variants)
+
+    def test_result_for_a_replaced_image_is_discarded(self):
+        product = Product.objects.create(
+            name='Багет', description='', category=self.category, price=Decimal('1.20'), cost=Decimal('0.40'),
+            image=ContentFile(png_bytes((100, 100)), 'old.png'),
+        )
+        old = product.image.name
+        product.image = ContentFile(png_bytes((100, 100), (0, 0, 0, 255)), 'new.png')
+        product.save()
+
+        self.assertFalse(save_variants(product.pk, old, render_variants(png_bytes((100, 100)), {'thumb': (50, 50)})))
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants, {})
+        self.assertIsNone(self.client.get(f'/api/products/{product.pk}/').json()['image_variants'])
+
+    def test_regenerate_thumbnails_uses_worker_processes(self):
+        products = [
+            Product.objects.create(
+                name=f'Хлеб {i}', description='', category=self.category, price=Decimal('1.00'),
+                cost=Decimal('0.50'), image=ContentFile(png_bytes((300, 200 + i)), f'bread{i}.png'),
+            )
+            for i in range(3)
+        ]
+        call_command('regenerate_thumbnails', workers=2, stdout=StringIO())
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.image_variants['source'], product.image.name)
+            self.assertEqual(product.image_variants['variants']['full']['width'], 300)
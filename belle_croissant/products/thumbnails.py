@@ -0,0 +1,53 @@
+"""Rendering of product image variants.
+
+Runs in worker processes started with ``spawn``, which import this module
+without setting Django up, so it must not import models or touch settings.
+"""
+import hashlib
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# format -> (file extension, Pillow encoder, encoder options)
+FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def encode(image, fmt):
+    _, encoder, options = FORMATS[fmt]
+    if encoder == 'JPEG' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, encoder, **options)
+    return buffer.getvalue()
+
+
+def render_variants(source, sizes):
+    """Resize the image bytes ``source`` into every ``{variant: (width, height)}`` box.
+
+    Images are never upscaled. Returns ``{variant: {'width', 'height',
+    'files': {format: (digest, bytes)}}}``; the digest of the encoded bytes
+    names the stored file.
+    """
+    with Image.open(BytesIO(source)) as original:
+        # JPEG decoders can downscale by 1/2-1/8 while decoding, far cheaper than resampling the full image.
+        scale = min(1, max(min(width / original.width, height / original.height) for width, height in sizes.values()))
+        original.draft('RGB', (round(original.width * scale), round(original.height * scale)))
+        image = ImageOps.exif_transpose(original)
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    variants = {}
+    # Largest box first, each smaller variant resampled from the previous one rather than from the original.
+    for name, size in sorted(sizes.items(), key=lambda item: item[1][0] * item[1][1], reverse=True):
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        files = {}
+        for fmt in FORMATS:
+            data = encode(image, fmt)
+            files[fmt] = (hashlib.sha256(data).hexdigest()[:16], data)
+        variants[name] = {'width': image.width, 'height': image.height, 'files': files}
+    return variants
@@ -1,3 +1,58 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+from belle_croissant.async_views import AsyncReadView
+from belle_croissant.eager_loading import EagerLoadingViewSetMixin
+from .catalog import catalog_etag, catalog_version, get_catalog
+from .models import Category, Product
+from .serializers import CategorySerializer, MarginParamsSerializer, ProductMarginSerializer, ProductSerializer
 
-# Create your views here.
+class CategoryViewSet(viewsets.ModelViewSet):
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+
+class ProductViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    query_budget = {'list': 2, 'retrieve': 1, 'margins': 1}
+
+    @action(detail=False)
+    def margins(self, request):
+        """Products by margin (``price - cost``), lowest first; a keyset seek on ``product_margin_keyset_idx``."""
+        params = MarginParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        queryset = Product.objects.only('name', 'category', 'price', 'cost', 'margin').order_by(params['ordering'])
+        if 'category' in params:
+            queryset = queryset.filter(category_id=params['category'])
+        if 'max_margin' in params:
+            queryset = queryset.filter(margin__lte=params['max_margin'])
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(ProductMarginSerializer(page, many=True).data)
+
+class ProductAsyncView(AsyncReadView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+
+class CatalogView(APIView):
+    """Full menu grouped by category, served from the cache.
+
+    The ETag is the catalog version, so a matching ``If-None-Match`` is
+    answered with 304 after a single cache lookup.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        etag = catalog_etag(catalog_version())
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=304)
+        else:
+            version, body = get_catalog()
+            etag = catalog_etag(version)
+            response = HttpResponse(body, content_type='application/json; charset=utf-8')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response